@@ -10,6 +10,7 @@ import time
 import uuid
 from datetime import datetime, timedelta
 import os
+import tempfile
 from pathlib import Path
 
 # Import custom modules
@@ -145,15 +146,13 @@ async def analyze_prescription(
         # Process uploaded file if provided
         prescription_content = prescription_text
         if file:
-            # Save uploaded file temporarily
-            file_path = f"/tmp/{uuid.uuid4()}_{file.filename}"
-            with open(file_path, "wb") as buffer:
-                content = await file.read()
-                buffer.write(content)
-            
-            # Extract text from file (OCR for images, text extraction for PDFs)
-            prescription_content = await extract_text_from_file(file_path)
-            os.unlink(file_path)  # Clean up temp file
+            # Save uploaded file temporarily, streaming it in chunks
+            file_path = await save_upload(file)
+            try:
+                # Extract text from file (OCR for images, text extraction for PDFs)
+                prescription_content = await extract_text_from_file(file_path)
+            finally:
+                os.unlink(file_path)  # Clean up temp file
 
         if not prescription_content:
             raise HTTPException(status_code=400, detail="No prescription content provided")
@@ -185,6 +184,8 @@ async def analyze_prescription(
             "timestamp": datetime.now().isoformat()
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
@@ -307,6 +308,24 @@ async def get_drug_info(drug_name: str, user = Depends(get_current_user)):
     }
 
 # Utility functions
+MAX_UPLOAD_BYTES = int(float(os.getenv("MAX_UPLOAD_MB", "25")) * 1024 * 1024)
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+async def save_upload(file: UploadFile) -> str:
+    """Copy an upload to a temp file in chunks; 413 if it exceeds MAX_UPLOAD_BYTES"""
+    fd, file_path = tempfile.mkstemp(suffix=f"_{Path(file.filename or 'upload').name}")
+    size = 0
+    with os.fdopen(fd, "wb") as buffer:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            size += len(chunk)
+            if size > MAX_UPLOAD_BYTES:
+                break
+            buffer.write(chunk)
+    if size > MAX_UPLOAD_BYTES:
+        os.unlink(file_path)
+        raise HTTPException(status_code=413, detail=f"Upload exceeds {MAX_UPLOAD_BYTES} bytes")
+    return file_path
+
 async def extract_text_from_file(file_path: str) -> str:
     """Extract text from uploaded file using OCR or text extraction"""
     # Placeholder for file processing
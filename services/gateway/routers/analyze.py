@@ -7,6 +7,8 @@ Endpoints:
     - Accepts: prescription image, patient_id
     - Pipeline: OCR → NER → FeatureGen → Risk-Engine
     - Returns: unified risk response
+    - Uploads are streamed to OCR from Starlette's spooled temp file (never
+      read fully into memory); larger than GATEWAY_MAX_UPLOAD_MB -> 413
 """
 
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
@@ -21,6 +23,16 @@ OCR_URL = os.getenv("OCR_URL", "http://ocr:8000/ocr")
 NER_URL = os.getenv("NER_URL", "http://ner:8000/extract")
 FEATUREGEN_URL = os.getenv("FEATUREGEN_URL", "http://featuregen:8000/features")
 RISK_URL = os.getenv("RISK_URL", "http://risk:8000/predict/risk")
+MAX_UPLOAD_BYTES = int(float(os.getenv("GATEWAY_MAX_UPLOAD_MB", "25")) * 1024 * 1024)
+
+def upload_size(file: UploadFile) -> int:
+  """Size of the spooled upload, without reading it."""
+  if file.size is not None:
+    return file.size
+  file.file.seek(0, os.SEEK_END)
+  size = file.file.tell()
+  file.file.seek(0)
+  return size
 
 async def default_http_client():
   async with httpx.AsyncClient() as client:
@@ -41,7 +53,14 @@ async def analyze_prescription(
     4. Risk-Engine: get risk assessment
   Returns unified response.
   """
-  ocr_resp = await http_client.post(OCR_URL, files={"file": (file.filename, await file.read(), file.content_type)})
+  size = upload_size(file)
+  if size > MAX_UPLOAD_BYTES:
+    raise HTTPException(status_code=413, detail=f"Upload is {size} bytes; limit is {MAX_UPLOAD_BYTES}")
+  # httpx streams the multipart body from the file object in chunks
+  await file.seek(0)
+  ocr_resp = await http_client.post(OCR_URL, files={"file": (file.filename, file.file, file.content_type)})
+  if ocr_resp.status_code == 413:
+    raise HTTPException(status_code=413, detail="Upload too large for OCR service")
   if ocr_resp.status_code != 200:
     raise HTTPException(status_code=502, detail="OCR service error")
   ocr_text = ocr_resp.json().get("text")
@@ -25,6 +25,9 @@ from services.gateway.routers import analyze as analyze_router
 class MockHttpClient:
     async def post(self, url, *args, **kwargs):
         if "ocr" in url:
+            # The upload is forwarded as a file object, not buffered bytes
+            name, upload, content_type = kwargs["files"]["file"]
+            assert hasattr(upload, "read") and name == "rx.png"
             return DummyResp({"text": "Take Aspirin 100mg OD 5d"})
         elif "ner" in url:
             return DummyResp({"drugs": [{"drug_id": "drugA", "name": "Aspirin", "dose": "100mg", "freq": "OD", "duration": "5d"}]})
@@ -51,3 +54,10 @@ def test_analyze_prescription():
     assert data["risk"]["level"] == "HIGH"
     # Clean up override
     app.dependency_overrides = {}
+
+def test_analyze_prescription_too_large(monkeypatch):
+    app.dependency_overrides[analyze_router.default_http_client] = override_http_client
+    monkeypatch.setattr(analyze_router, "MAX_UPLOAD_BYTES", 1024)
+    response = client.post("/analyze/prescription", data={"patient_id": "patient123"}, files={"file": ("rx.png", b"x" * 2048, "image/png")})
+    assert response.status_code == 413
+    app.dependency_overrides = {}
@@ -1,17 +1,27 @@
 """
 FastAPI app for DDI link prediction inference.
 POST /predict {drug1, drug2} → returns probability + supporting paths
+POST /predict/batch {drugs} → returns the pairwise probability matrix
+POST /embeddings/refresh → recomputes the in-memory embedding table
+
+Node embeddings are computed once (at startup or on refresh) into a contiguous
+float32 table, so each prediction is a row lookup plus a dot product.
 """
 
 import os
+import threading
+import logging
+import numpy as np
 import torch
+from contextlib import asynccontextmanager
+from typing import List
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 from neo4j import GraphDatabase
 from torch_geometric.data import Data
-from torch_geometric.nn import GraphSAGE
+from features import DDIEncoder, encode, load_checkpoint, node_features
 
-app = FastAPI()
+logger = logging.getLogger(__name__)
 
 NEO4J_URI = os.getenv("NEO4J_URI", "bolt://localhost:7687")
 NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
@@ -22,6 +32,9 @@ class PredictRequest(BaseModel):
 	drug1: str
 	drug2: str
 
+class BatchPredictRequest(BaseModel):
+	drugs: List[str]
+
 def get_node_ids():
 	driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASS))
 	with driver.session() as session:
@@ -31,20 +44,13 @@ def get_node_ids():
 	driver.close()
 	return node_ids, node_id_map
 
-def build_pyg_data(node_ids):
-	x = torch.eye(len(node_ids))
-	data = Data(x=x)
-	return data
-
-def load_model(num_nodes):
-	model = GraphSAGE(
-		in_channels=num_nodes,
-		hidden_channels=32,
-		num_layers=2
-	)
-	model.load_state_dict(torch.load(MODEL_PATH, map_location="cpu"))
-	model.eval()
-	return model
+def build_pyg_data(num_nodes, mode):
+	# Embeddings are computed without message-passing edges
+	edge_index = torch.empty((2,0), dtype=torch.long)
+	return Data(x=node_features(mode, num_nodes), edge_index=edge_index, num_nodes=num_nodes)
+
+def load_model():
+	return load_checkpoint(MODEL_PATH)
 
 def find_supporting_paths(drug1, drug2, max_paths=3):
 	driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASS))
@@ -58,17 +64,102 @@ def find_supporting_paths(drug1, drug2, max_paths=3):
 	driver.close()
 	return paths
 
+def _sigmoid(x):
+	return 1.0 / (1.0 + np.exp(-x))
+
+class EmbeddingTable:
+	"""Read-only node embeddings: a contiguous float32 matrix plus an id → row index."""
+
+	def __init__(self, node_ids, embeddings):
+		self.node_ids = list(node_ids)
+		self.index = {id_: i for i, id_ in enumerate(self.node_ids)}
+		self.embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+
+	def __contains__(self, drug_id):
+		return drug_id in self.index
+
+	def __len__(self):
+		return len(self.node_ids)
+
+	def score(self, drug1, drug2):
+		emb = self.embeddings
+		return float(_sigmoid(np.dot(emb[self.index[drug1]], emb[self.index[drug2]])))
+
+	def pairwise(self, drug_ids):
+		# All pairwise link probabilities in one matmul: sigmoid(E · Eᵀ)
+		emb = self.embeddings[[self.index[d] for d in drug_ids]]
+		return _sigmoid(emb @ emb.T)
+
+def compute_embedding_table():
+	model, node_ids = load_model()
+	if node_ids is None:
+		# Legacy onehot checkpoints do not record their node order
+		node_ids, _ = get_node_ids()
+	mode = "embedding" if isinstance(model, DDIEncoder) else "onehot"
+	data = build_pyg_data(len(node_ids), mode)
+	with torch.no_grad():
+		out = encode(model, data)
+	return EmbeddingTable(node_ids, out.numpy())
+
+_embedding_table = None
+_refresh_lock = threading.Lock()
+
+def refresh_embedding_table():
+	global _embedding_table
+	with _refresh_lock:
+		table = compute_embedding_table()
+		# Swap in one assignment so in-flight requests keep their old table
+		_embedding_table = table
+	return table
+
+def get_embedding_table():
+	table = _embedding_table
+	if table is None:
+		try:
+			table = refresh_embedding_table()
+		except Exception as e:
+			raise HTTPException(status_code=503, detail=f"Embeddings not available: {e}")
+	return table
+
+@asynccontextmanager
+async def lifespan(app):
+	try:
+		refresh_embedding_table()
+	except Exception as e:
+		# Keep serving; the table is built lazily on the first request instead
+		logger.warning("Could not precompute GNN embeddings at startup: %s", e)
+	yield
+
+app = FastAPI(lifespan=lifespan)
+
 @app.post("/predict")
 def predict_ddi(req: PredictRequest):
-	node_ids, node_id_map = get_node_ids()
-	if req.drug1 not in node_id_map or req.drug2 not in node_id_map:
+	table = get_embedding_table()
+	if req.drug1 not in table or req.drug2 not in table:
 		raise HTTPException(status_code=404, detail="Drug not found in KG")
-	data = build_pyg_data(node_ids)
-	model = load_model(len(node_ids))
-	with torch.no_grad():
-		out = model(data.x, torch.empty((2,0), dtype=torch.long))
-		emb1 = out[node_id_map[req.drug1]]
-		emb2 = out[node_id_map[req.drug2]]
-		score = torch.sigmoid((emb1 * emb2).sum()).item()
+	score = table.score(req.drug1, req.drug2)
 	paths = find_supporting_paths(req.drug1, req.drug2)
 	return {"probability": score, "supporting_paths": paths}
+
+@app.post("/predict/batch")
+def predict_ddi_batch(req: BatchPredictRequest):
+	"""
+	Score every pair in a drug list with a single embedding lookup.
+	Drugs unknown to the KG are listed in `missing` and left out of the matrix;
+	`probabilities[i][j]` is the DDI probability for `drugs[i]`, `drugs[j]`.
+	"""
+	table = get_embedding_table()
+	drugs = list(dict.fromkeys(req.drugs))
+	known = [d for d in drugs if d in table]
+	missing = [d for d in drugs if d not in table]
+	probs = table.pairwise(known) if known else np.empty((0, 0), dtype=np.float32)
+	return {"drugs": known, "probabilities": probs.tolist(), "missing": missing}
+
+@app.post("/embeddings/refresh")
+def refresh_embeddings():
+	"""Reload the model and drug list and recompute the embedding table."""
+	try:
+		table = refresh_embedding_table()
+	except Exception as e:
+		raise HTTPException(status_code=503, detail=f"Embedding refresh failed: {e}")
+	return {"num_drugs": len(table), "dim": int(table.embeddings.shape[1])}
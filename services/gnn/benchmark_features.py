@@ -0,0 +1,83 @@
+"""
+Measure memory and wall time of GNN node-feature modes on a generated graph.
+
+Each mode runs in a fresh subprocess (so peak RSS is per mode) and times
+build_pyg_data, one full-graph training step and one inference pass. The dense
+"onehot" mode is skipped when torch.eye(N) alone would exceed --max-dense-gb.
+
+Usage:
+    python benchmark_features.py --nodes 100000 --edges 500000
+"""
+import argparse
+import multiprocessing as mp
+import resource
+import time
+
+import torch
+
+from features import FEATURE_MODES, build_model, encode
+from train import build_pyg_data
+
+
+def peak_rss_mb():
+	return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_mode(mode, num_nodes, num_edges, queue):
+	gen = torch.Generator().manual_seed(0)
+	node_ids = [f"DB{i:06d}" for i in range(num_nodes)]
+	atc_codes = [f"{'ABCDGJLMNR'[i % 10]}{i % 17:02d}XX01" for i in range(num_nodes)]
+	edges = torch.randint(0, num_nodes, (num_edges, 2), generator=gen).tolist()
+	edge_conf = [0.5] * num_edges
+	base_rss = peak_rss_mb()
+
+	timings = {}
+	start = time.perf_counter()
+	data = build_pyg_data(node_ids, edges, edge_conf, atc_codes, mode=mode)
+	timings["build"] = time.perf_counter() - start
+
+	model = build_model(mode, num_nodes, node_class=data.get('node_class'), num_classes=data.get('num_classes', 0))
+	optimizer = torch.optim.Adam(model.parameters(), lr=0.01)
+	start = time.perf_counter()
+	out = encode(model, data)
+	src, dst = data.edge_index
+	loss = -torch.nn.functional.logsigmoid((out[src] * out[dst]).sum(dim=1)).mean()
+	loss.backward()
+	optimizer.step()
+	timings["train_step"] = time.perf_counter() - start
+
+	model.eval()
+	start = time.perf_counter()
+	with torch.no_grad():
+		encode(model, data)
+	timings["inference"] = time.perf_counter() - start
+	queue.put((timings, peak_rss_mb() - base_rss, peak_rss_mb()))
+
+
+def main():
+	parser = argparse.ArgumentParser()
+	parser.add_argument("--nodes", type=int, default=100000)
+	parser.add_argument("--edges", type=int, default=500000)
+	parser.add_argument("--max-dense-gb", type=float, default=4.0)
+	args = parser.parse_args()
+
+	ctx = mp.get_context("spawn")
+	print(f"{args.nodes} nodes, {args.edges} edges")
+	for mode in FEATURE_MODES:
+		dense_gb = args.nodes * args.nodes * 4 / 1e9
+		if mode == "onehot" and dense_gb > args.max_dense_gb:
+			print(f"  {mode:<9} skipped: torch.eye({args.nodes}) needs {dense_gb:.1f} GB")
+			continue
+		queue = ctx.Queue()
+		proc = ctx.Process(target=run_mode, args=(mode, args.nodes, args.edges, queue))
+		proc.start()
+		timings, rss_delta, rss_peak = queue.get()
+		proc.join()
+		print(
+			f"  {mode:<9} build {timings['build']:6.2f}s  train step {timings['train_step']:6.2f}s  "
+			f"inference {timings['inference']:6.2f}s  peak RSS {rss_peak:8.1f} MB (+{rss_delta:.1f} MB)"
+		)
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,83 @@
+"""
+Benchmark DDI inference throughput on synthetic drug graphs.
+
+Compares the old per-request path (identity features → model load → full
+GraphSAGE forward) with the precomputed embedding table served by app.py.
+The drug list comes from a synthetic generator instead of Neo4j, and a randomly
+initialised model is written to a temp file in place of graphsage_ddi.pt.
+
+Usage:
+    python benchmark_inference.py --drugs 1000 10000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import torch
+from fastapi.testclient import TestClient
+from torch_geometric.nn import GraphSAGE
+
+import app as gnn_app
+
+
+def synthetic_graph(num_drugs, model_dir):
+	node_ids = [f"DB{i:06d}" for i in range(num_drugs)]
+	model = GraphSAGE(in_channels=num_drugs, hidden_channels=32, num_layers=2)
+	model_path = os.path.join(model_dir, f"graphsage_{num_drugs}.pt")
+	torch.save(model.state_dict(), model_path)
+	gnn_app.MODEL_PATH = model_path
+	gnn_app.get_node_ids = lambda: (node_ids, {id_: i for i, id_ in enumerate(node_ids)})
+	return node_ids
+
+
+def rate(fn, seconds):
+	count = 0
+	start = time.perf_counter()
+	while time.perf_counter() - start < seconds:
+		fn()
+		count += 1
+	return count / (time.perf_counter() - start)
+
+
+def bench(num_drugs, seconds, model_dir):
+	node_ids = synthetic_graph(num_drugs, model_dir)
+	pick = lambda: random.sample(node_ids, 2)
+
+	def per_request_forward():
+		d1, d2 = pick()
+		gnn_app.compute_embedding_table().score(d1, d2)
+
+	start = time.perf_counter()
+	table = gnn_app.refresh_embedding_table()
+	build_s = time.perf_counter() - start
+
+	def table_lookup():
+		d1, d2 = pick()
+		table.score(d1, d2)
+
+	client = TestClient(gnn_app.app)
+
+	def http_batch():
+		resp = client.post("/predict/batch", json={"drugs": pick()})
+		resp.raise_for_status()
+
+	print(f"{num_drugs} drugs (table build {build_s:.2f}s, {table.embeddings.nbytes / 1e6:.1f} MB)")
+	print(f"  per-request forward : {rate(per_request_forward, seconds):10.1f} req/s")
+	print(f"  table lookup        : {rate(table_lookup, seconds):10.1f} req/s")
+	print(f"  HTTP /predict/batch : {rate(http_batch, seconds):10.1f} req/s")
+
+
+def main():
+	parser = argparse.ArgumentParser()
+	parser.add_argument("--drugs", type=int, nargs="+", default=[1000, 10000])
+	parser.add_argument("--seconds", type=float, default=3.0)
+	args = parser.parse_args()
+	with tempfile.TemporaryDirectory() as model_dir:
+		for num_drugs in args.drugs:
+			bench(num_drugs, args.seconds, model_dir)
+
+
+if __name__ == "__main__":
+	main()
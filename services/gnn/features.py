@@ -0,0 +1,118 @@
+"""
+Node features for the DDI GNN, shared by train.py and app.py.
+
+Feature modes:
+- "onehot": dense identity matrix as x (original behaviour; O(N²) memory)
+- "embedding": learnable per-drug nn.Embedding plus an ATC-class embedding;
+  O(N·d) memory, equivalent to sparse one-hot × first-layer weights
+
+Checkpoints written by save_checkpoint() carry the feature mode, model config
+and training node order; plain GraphSAGE state_dicts still load as "onehot".
+"""
+import os
+import torch
+from torch import nn
+from torch_geometric.nn import GraphSAGE
+
+FEATURE_MODES = ("onehot", "embedding")
+FEATURE_MODE = os.getenv("GNN_FEATURE_MODE", "embedding")
+EMBEDDING_DIM = int(os.getenv("GNN_EMBEDDING_DIM", "64"))
+CLASS_DIM = 8
+HIDDEN_CHANNELS = 32
+NUM_LAYERS = 2
+
+def atc_class(code):
+	# Therapeutic subgroup, e.g. "B01AC06" → "B01"
+	return code[:3].upper() if code else None
+
+def build_class_index(atc_codes):
+	"""Map each drug's ATC code to a class row; row 0 is reserved for unknown."""
+	classes = sorted({c for c in map(atc_class, atc_codes) if c})
+	class_map = {c: i + 1 for i, c in enumerate(classes)}
+	index = torch.tensor([class_map.get(atc_class(c), 0) for c in atc_codes], dtype=torch.long)
+	return index, len(classes) + 1
+
+class DDIEncoder(nn.Module):
+	"""GraphSAGE over learnable drug embeddings (+ optional ATC-class embeddings)."""
+
+	def __init__(self, num_nodes, embedding_dim=EMBEDDING_DIM, num_classes=0, class_dim=CLASS_DIM,
+			hidden_channels=HIDDEN_CHANNELS, num_layers=NUM_LAYERS):
+		super().__init__()
+		self.config = dict(num_nodes=num_nodes, embedding_dim=embedding_dim, num_classes=num_classes,
+			class_dim=class_dim, hidden_channels=hidden_channels, num_layers=num_layers)
+		self.node_emb = nn.Embedding(num_nodes, embedding_dim)
+		in_channels = embedding_dim
+		if num_classes:
+			self.class_emb = nn.Embedding(num_classes, class_dim)
+			self.register_buffer("node_class", torch.zeros(num_nodes, dtype=torch.long))
+			in_channels += class_dim
+		else:
+			self.class_emb = None
+		self.gnn = GraphSAGE(in_channels=in_channels, hidden_channels=hidden_channels, num_layers=num_layers)
+
+	def node_features(self, n_id=None):
+		if n_id is None:
+			n_id = torch.arange(self.node_emb.num_embeddings)
+		x = self.node_emb(n_id)
+		if self.class_emb is not None:
+			x = torch.cat([x, self.class_emb(self.node_class[n_id])], dim=1)
+		return x
+
+	def forward(self, edge_index, n_id=None):
+		return self.gnn(self.node_features(n_id), edge_index)
+
+def build_model(mode, num_nodes, node_class=None, num_classes=0):
+	if mode == "onehot":
+		return GraphSAGE(in_channels=num_nodes, hidden_channels=HIDDEN_CHANNELS, num_layers=NUM_LAYERS)
+	if mode == "embedding":
+		model = DDIEncoder(num_nodes, num_classes=num_classes if node_class is not None else 0)
+		if node_class is not None:
+			model.node_class.copy_(node_class)
+		return model
+	raise ValueError(f"Unknown feature mode {mode!r}; expected one of {FEATURE_MODES}")
+
+def node_features(mode, num_nodes):
+	# Only the onehot mode needs an explicit x; embeddings live inside DDIEncoder
+	return torch.eye(num_nodes) if mode == "onehot" else None
+
+def encode(model, data, n_id=None):
+	if isinstance(model, DDIEncoder):
+		return model(data.edge_index, n_id)
+	return model(data.x, data.edge_index)
+
+def check_node_ids(mode, num_nodes, node_ids):
+	"""Embedding checkpoints map rows to drugs by node_ids; refuse to train or save one without them."""
+	if mode != "embedding":
+		return
+	if node_ids is None:
+		raise ValueError("node_ids are required in embedding mode (the checkpoint maps embedding rows to drug ids)")
+	if len(node_ids) != num_nodes:
+		raise ValueError(f"Got {len(node_ids)} node_ids for {num_nodes} embedding rows")
+
+def save_checkpoint(model, node_ids, path):
+	if isinstance(model, DDIEncoder):
+		check_node_ids("embedding", model.config["num_nodes"], node_ids)
+		torch.save({
+			"feature_mode": "embedding",
+			"config": model.config,
+			"node_ids": list(node_ids),
+			"state_dict": model.state_dict(),
+		}, path)
+	else:
+		torch.save(model.state_dict(), path)
+
+def load_checkpoint(path):
+	"""Return (model, node_ids); node_ids is None for legacy onehot checkpoints."""
+	ckpt = torch.load(path, map_location="cpu")
+	if isinstance(ckpt, dict) and ckpt.get("feature_mode") == "embedding":
+		model = DDIEncoder(**ckpt["config"])
+		model.load_state_dict(ckpt["state_dict"])
+		node_ids = ckpt["node_ids"]
+	else:
+		# Legacy GraphSAGE state_dict: in_channels == number of drugs
+		num_nodes = ckpt["convs.0.lin_l.weight"].shape[1]
+		model = build_model("onehot", num_nodes)
+		model.load_state_dict(ckpt)
+		node_ids = None
+	model.eval()
+	return model, node_ids
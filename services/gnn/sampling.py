@@ -0,0 +1,86 @@
+"""
+Neighbor-sampled link batches for mini-batch GNN training.
+
+Mirrors the batches PyG's LinkNeighborLoader produces (n_id, local edge_index,
+edge_label_index, edge_label) but samples in plain torch, so it runs without
+pyg-lib / torch-sparse. Batches are built in the DataLoader collate function,
+so sampling runs in worker processes and negatives are redrawn every epoch.
+"""
+import torch
+from torch.utils.data import DataLoader
+from torch_geometric.data import Data
+
+class NeighborSampler:
+	"""Uniform (with replacement) k-hop in-neighbor sampler over a CSR index."""
+
+	def __init__(self, edge_index, num_nodes, num_neighbors=(10, 5)):
+		src, dst = edge_index
+		order = torch.argsort(dst)
+		self.col = src[order].contiguous()
+		deg = torch.bincount(dst, minlength=num_nodes)
+		self.rowptr = torch.zeros(num_nodes + 1, dtype=torch.long)
+		torch.cumsum(deg, 0, out=self.rowptr[1:])
+		self.num_nodes = num_nodes
+		self.num_neighbors = list(num_neighbors)
+
+	def sample(self, seeds):
+		"""Return (n_id, local edge_index) for the sampled computation graph of `seeds`."""
+		visited = torch.unique(seeds)
+		frontier = visited
+		srcs, dsts = [], []
+		for k in self.num_neighbors:
+			start = self.rowptr[frontier]
+			deg = self.rowptr[frontier + 1] - start
+			mask = deg > 0
+			frontier, start, deg = frontier[mask], start[mask], deg[mask]
+			if frontier.numel() == 0:
+				break
+			offsets = (torch.rand(frontier.numel(), k) * deg.unsqueeze(1)).long()
+			nbrs = self.col[start.unsqueeze(1) + offsets].flatten()
+			srcs.append(nbrs)
+			dsts.append(frontier.repeat_interleave(k))
+			new = torch.unique(nbrs)
+			frontier = new[~torch.isin(new, visited)]
+			visited = torch.cat([visited, frontier])
+		n_id = torch.unique(visited)
+		if srcs:
+			# Drop duplicate draws, then relabel global ids to rows of n_id
+			key = torch.unique(torch.cat(srcs) * self.num_nodes + torch.cat(dsts))
+			pairs = torch.stack([key // self.num_nodes, key % self.num_nodes])
+			edge_index = torch.searchsorted(n_id, pairs)
+		else:
+			edge_index = torch.empty((2, 0), dtype=torch.long)
+		return n_id, edge_index
+
+class LinkBatchCollate:
+	"""Turn a list of positive edge ids into a sampled batch with fresh negatives."""
+
+	def __init__(self, sampler, edge_index, neg_ratio=1):
+		self.sampler = sampler
+		self.edge_index = edge_index
+		self.neg_ratio = neg_ratio
+
+	def __call__(self, edge_ids):
+		pos = self.edge_index[:, torch.as_tensor(edge_ids, dtype=torch.long)]
+		neg = torch.randint(0, self.sampler.num_nodes, (2, pos.size(1) * self.neg_ratio), dtype=torch.long)
+		label_index = torch.cat([pos, neg], dim=1)
+		edge_label = torch.cat([torch.ones(pos.size(1)), torch.zeros(neg.size(1))])
+		n_id, edge_index = self.sampler.sample(label_index.flatten())
+		return Data(
+			n_id=n_id,
+			edge_index=edge_index,
+			edge_label_index=torch.searchsorted(n_id, label_index),
+			edge_label=edge_label,
+			num_nodes=n_id.numel(),
+		)
+
+def link_neighbor_loader(data, num_neighbors=(10, 5), batch_size=1024, neg_ratio=1, num_workers=0, shuffle=True):
+	sampler = NeighborSampler(data.edge_index, data.num_nodes, num_neighbors)
+	return DataLoader(
+		range(data.edge_index.size(1)),
+		batch_size=batch_size,
+		shuffle=shuffle,
+		collate_fn=LinkBatchCollate(sampler, data.edge_index, neg_ratio),
+		num_workers=num_workers,
+		persistent_workers=num_workers > 0,
+	)
@@ -1,17 +1,25 @@
 """
 Train a GNN (GraphSAGE/RGCN) for DDI link prediction.
 - Exports KG from Neo4j
-- Converts to PyTorch-Geometric Data
-- Trains for INTERACTS_WITH edge prediction
+- Converts to PyTorch-Geometric Data (node features per GNN_FEATURE_MODE, see features.py)
+- Trains for INTERACTS_WITH edge prediction (full-graph or neighbor-sampled mini-batches)
 - Saves model to models/gnn/
+
+Usage:
+    python train.py
+    python train.py --mode minibatch --batch_size 4096 --num_neighbors 10,5 --workers 4 --threads 4
 """
 
+import argparse
 import os
+import resource
+import time
 import torch
 from neo4j import GraphDatabase
 from torch_geometric.data import Data
-from torch_geometric.nn import GraphSAGE
 import numpy as np
+from features import FEATURE_MODE, DDIEncoder, build_class_index, build_model, check_node_ids, encode, node_features, save_checkpoint
+from sampling import link_neighbor_loader
 
 NEO4J_URI = os.getenv("NEO4J_URI", "bolt://localhost:7687")
 NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
@@ -22,41 +30,58 @@ def export_ddi_kg():
 	driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASS))
 	with driver.session() as session:
 		# Get all drugs
-		nodes = session.run("MATCH (d:Drug) RETURN d.id AS id").data()
+		nodes = session.run("MATCH (d:Drug) RETURN d.id AS id, d.ATC AS atc").data()
 		node_ids = [n['id'] for n in nodes]
+		atc_codes = [n['atc'] for n in nodes]
 		node_id_map = {id_: i for i, id_ in enumerate(node_ids)}
 		# Get DDI edges
 		rels = session.run("MATCH (a:Drug)-[r:HAS_DDI]->(b:Drug) RETURN a.id AS src, b.id AS dst, r.confidence AS conf").data()
 		edges = [(node_id_map[r['src']], node_id_map[r['dst']]) for r in rels]
 	edge_conf = [float(r['conf']) if r['conf'] is not None else 0.5 for r in rels]
 	driver.close()
-	return node_ids, edges, edge_conf
+	return node_ids, edges, edge_conf, atc_codes
 
 # 2. Convert to PyG Data
-def build_pyg_data(node_ids, edges, edge_conf):
-	x = torch.eye(len(node_ids))  # One-hot for demo; replace with real features
+def build_pyg_data(node_ids, edges, edge_conf, atc_codes=None, mode=FEATURE_MODE):
+	# "onehot" materializes torch.eye(N); "embedding" keeps features inside the model
+	x = node_features(mode, len(node_ids))
 	edge_index = torch.tensor(edges, dtype=torch.long).t().contiguous()
 	edge_attr = torch.tensor(edge_conf, dtype=torch.float).unsqueeze(1)
-	data = Data(x=x, edge_index=edge_index, edge_attr=edge_attr)
+	data = Data(x=x, edge_index=edge_index, edge_attr=edge_attr, num_nodes=len(node_ids))
+	data.feature_mode = mode
+	if atc_codes is not None:
+		data.node_class, data.num_classes = build_class_index(atc_codes)
 	return data
 
 # 3. Train GraphSAGE for link prediction
-def train_gnn(data, save_path):
-	model = GraphSAGE(
-		in_channels=data.num_node_features,
-		hidden_channels=32,
-		num_layers=2
+def new_model(data):
+	return build_model(
+		data.feature_mode,
+		data.num_nodes,
+		node_class=data.get('node_class'),
+		num_classes=data.get('num_classes', 0)
 	)
+
+def peak_rss_mb():
+	# Includes finished sampling workers (RUSAGE_CHILDREN)
+	own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+	return (own + children) / 1024
+
+def train_gnn(data, save_path, node_ids=None, epochs=20):
+	# Fail before training rather than when saving an unusable checkpoint
+	check_node_ids(data.feature_mode, data.num_nodes, node_ids)
+	model = new_model(data)
 	optimizer = torch.optim.Adam(model.parameters(), lr=0.01)
 	criterion = torch.nn.BCEWithLogitsLoss()
-	# Create positive and negative edge samples
 	pos_edge_index = data.edge_index
-	neg_edge_index = torch.randint(0, data.num_nodes, pos_edge_index.size(), dtype=torch.long)
 	# Training loop (simplified)
-	for epoch in range(20):
+	for epoch in range(epochs):
+		# Fresh negatives every epoch
+		neg_edge_index = torch.randint(0, data.num_nodes, pos_edge_index.size(), dtype=torch.long)
 		model.train()
 		optimizer.zero_grad()
-		out = model(data.x, data.edge_index)
+		out = encode(model, data)
 		pos_score = (out[pos_edge_index[0]] * out[pos_edge_index[1]]).sum(dim=1)
 		neg_score = (out[neg_edge_index[0]] * out[neg_edge_index[1]]).sum(dim=1)
 		pos_label = torch.ones(pos_score.size(0))
@@ -66,11 +91,68 @@ def train_gnn(data, save_path):
 		optimizer.step()
 		if epoch % 5 == 0:
 			print(f"Epoch {epoch} Loss: {loss.item():.4f}")
-	torch.save(model.state_dict(), save_path)
+	save_checkpoint(model, node_ids, save_path)
 	print(f"Model saved to {save_path}")
 
+# 3b. Neighbor-sampled mini-batch training for large graphs
+def train_gnn_minibatch(data, save_path, node_ids=None, epochs=20, batch_size=1024,
+		num_neighbors=(10, 5), num_workers=0, neg_ratio=1, max_batches=None):
+	check_node_ids(data.feature_mode, data.num_nodes, node_ids)
+	model = new_model(data)
+	optimizer = torch.optim.Adam(model.parameters(), lr=0.01)
+	criterion = torch.nn.BCEWithLogitsLoss()
+	# Negatives are drawn per batch inside the loader, so every epoch sees new ones
+	loader = link_neighbor_loader(data, num_neighbors, batch_size, neg_ratio, num_workers)
+	stats = {}
+	for epoch in range(epochs):
+		model.train()
+		total_loss, seen, batches, start = 0.0, 0, 0, time.perf_counter()
+		for batch in loader:
+			if max_batches is not None and batches >= max_batches:
+				break
+			optimizer.zero_grad()
+			if isinstance(model, DDIEncoder):
+				out = model(batch.edge_index, batch.n_id)
+			else:
+				out = model(data.x[batch.n_id], batch.edge_index)
+			src, dst = batch.edge_label_index
+			score = (out[src] * out[dst]).sum(dim=1)
+			loss = criterion(score, batch.edge_label)
+			loss.backward()
+			optimizer.step()
+			total_loss += loss.item()
+			seen += int(batch.edge_label.sum())
+			batches += 1
+		elapsed = time.perf_counter() - start
+		stats = {"edges_per_sec": seen / elapsed, "peak_rss_mb": peak_rss_mb()}
+		print(f"Epoch {epoch} Loss: {total_loss / max(1, batches):.4f} "
+			f"Edges/sec: {stats['edges_per_sec']:.0f} Peak RSS: {stats['peak_rss_mb']:.0f} MB")
+	save_checkpoint(model, node_ids, save_path)
+	print(f"Model saved to {save_path}")
+	return stats
+
 if __name__ == "__main__":
-	node_ids, edges, edge_conf = export_ddi_kg()
-	data = build_pyg_data(node_ids, edges, edge_conf)
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--mode', choices=['full', 'minibatch'], default='full')
+	parser.add_argument('--epochs', type=int, default=20)
+	parser.add_argument('--batch_size', type=int, default=1024)
+	parser.add_argument('--num_neighbors', type=str, default='10,5')
+	parser.add_argument('--workers', type=int, default=0, help='Sampling worker processes')
+	parser.add_argument('--threads', type=int, default=None, help='torch intra-op threads')
+	args = parser.parse_args()
+	if args.threads:
+		torch.set_num_threads(args.threads)
+
+	node_ids, edges, edge_conf, atc_codes = export_ddi_kg()
+	data = build_pyg_data(node_ids, edges, edge_conf, atc_codes)
 	os.makedirs("models/gnn", exist_ok=True)
-	train_gnn(data, "models/gnn/graphsage_ddi.pt")
+	if args.mode == 'minibatch':
+		train_gnn_minibatch(
+			data, "models/gnn/graphsage_ddi.pt", node_ids,
+			epochs=args.epochs,
+			batch_size=args.batch_size,
+			num_neighbors=[int(k) for k in args.num_neighbors.split(',')],
+			num_workers=args.workers
+		)
+	else:
+		train_gnn(data, "models/gnn/graphsage_ddi.pt", node_ids, epochs=args.epochs)
@@ -0,0 +1,88 @@
+"""
+FAISS index construction and query-time tuning for MedLM retrieval.
+
+Index types:
+- flat:     exact IndexFlatL2 (default; linear in corpus size)
+- ivf_flat: inverted file over k-means cells, exact vectors within a cell
+- ivf_pq:   inverted file + product-quantized vectors (smallest memory)
+- hnsw:     graph-based HNSW (no training, larger memory, fast queries)
+
+IVF indexes are trained on a random sample of the corpus. At query time,
+`nprobe` (IVF cells visited) and `efSearch` (HNSW candidate list) trade recall
+for latency.
+"""
+import math
+import os
+import warnings
+
+import faiss
+import numpy as np
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+
+def default_nlist(n_vectors):
+	# ~4·sqrt(N) cells, but keep ≥39 training points per centroid
+	return max(1, min(int(4 * math.sqrt(max(n_vectors, 1))), n_vectors // 39 or 1))
+
+def make_index(dim, index_type="flat", n_vectors=0, nlist=None, pq_m=16, pq_bits=8, hnsw_m=32, ef_construction=200):
+	if index_type == "flat":
+		return faiss.IndexFlatL2(dim)
+	if index_type == "hnsw":
+		index = faiss.IndexHNSWFlat(dim, hnsw_m)
+		index.hnsw.efConstruction = ef_construction
+		return index
+	if index_type == "ivf_pq" and n_vectors < 2 ** pq_bits:
+		# PQ codebooks need at least 2**pq_bits training points
+		warnings.warn(f"{n_vectors} vectors is too few to train ivf_pq; building a flat index")
+		return faiss.IndexFlatL2(dim)
+	nlist = nlist or default_nlist(n_vectors)
+	quantizer = faiss.IndexFlatL2(dim)
+	if index_type == "ivf_flat":
+		return faiss.IndexIVFFlat(quantizer, dim, nlist)
+	if index_type == "ivf_pq":
+		return faiss.IndexIVFPQ(quantizer, dim, nlist, pq_m, pq_bits)
+	raise ValueError(f"Unknown index type {index_type!r}; expected one of {INDEX_TYPES}")
+
+def train_index(index, vectors, train_size=100000, seed=0):
+	"""Train IVF/PQ indexes on a random sample of `vectors`; no-op for flat/HNSW."""
+	if index.is_trained:
+		return index
+	if len(vectors) > train_size:
+		rows = np.sort(np.random.default_rng(seed).choice(len(vectors), train_size, replace=False))
+		vectors = vectors[rows]
+	index.train(np.ascontiguousarray(vectors, dtype=np.float32))
+	return index
+
+def describe_index(index):
+	"""(index type, build params) of an index from make_index, unwrapping an IDMap."""
+	base = faiss.downcast_index(index)
+	if isinstance(base, faiss.IndexIDMap):
+		base = faiss.downcast_index(base.index)
+	if isinstance(base, faiss.IndexHNSWFlat):
+		return "hnsw", {"hnsw_m": base.hnsw.nb_neighbors(1), "ef_construction": base.hnsw.efConstruction}
+	if isinstance(base, faiss.IndexIVFPQ):
+		return "ivf_pq", {"nlist": base.nlist, "pq_m": base.pq.M, "pq_bits": base.pq.nbits}
+	if isinstance(base, faiss.IndexIVFFlat):
+		return "ivf_flat", {"nlist": base.nlist}
+	if isinstance(base, faiss.IndexFlatL2):
+		return "flat", {}
+	return type(base).__name__, {}
+
+def set_search_params(index, nprobe=None, ef_search=None):
+	"""Apply query-time knobs; parameters that do not apply to the index type are ignored."""
+	ivf = faiss.try_extract_index_ivf(index)
+	if ivf is not None and nprobe:
+		ivf.nprobe = int(nprobe)
+	base = faiss.downcast_index(index)
+	if isinstance(base, faiss.IndexIDMap):
+		base = faiss.downcast_index(base.index)
+	hnsw = getattr(base, "hnsw", None)
+	if hnsw is not None and ef_search:
+		hnsw.efSearch = int(ef_search)
+	return index
+
+def search_params_from_env():
+	return {
+		"nprobe": int(os.getenv("FAISS_NPROBE", "16")),
+		"ef_search": int(os.getenv("FAISS_EF_SEARCH", "64")),
+	}
@@ -1,67 +1,257 @@
 """
 FastAPI app for MedLM QA (RAG pipeline).
-- Uses FAISS vector store of KG triples + docs
+- Uses FAISS vector store of KG triples + docs, loaded once and kept resident
 - POST /qa {question, context} returns answer with evidence
+- POST /qa/batch {questions} answers many questions with one encode + one search
+- GET /qa/cache reports question-embedding cache hit rate
+- POST /index/reload hot-swaps in a rebuilt index
 """
 
 import os
+import json
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 import faiss
 import numpy as np
-from typing import List
-
-app = FastAPI()
+from typing import List, Optional
+from ann_index import search_params_from_env, set_search_params
+from build_faiss import PLACEHOLDER_TEXT, write_placeholder
 
 VECTOR_DIM = 384  # Example dimension for embeddings
 FAISS_INDEX_PATH = "models/medlm/faiss.index"
 DOCS_PATH = "models/medlm/docs.npy"
-METADATA_PATH = "models/medlm/meta.npy"
+METADATA_PATH = "models/medlm/meta.jsonl"
+LEGACY_METADATA_PATH = "models/medlm/meta.npy"
+# /index/reload only loads files from here
+MODELS_DIR = os.path.dirname(FAISS_INDEX_PATH)
+# /qa/batch request bounds; larger requests are rejected with 422
+QA_MAX_TOP_K = int(os.getenv("QA_MAX_TOP_K", "50"))
+QA_MAX_BATCH = int(os.getenv("QA_MAX_BATCH", "256"))
 
 class QARequest(BaseModel):
 	question: str
 	context: str = ""
 
+class BatchQARequest(BaseModel):
+	questions: List[str] = Field(..., max_length=QA_MAX_BATCH)
+	top_k: int = Field(3, ge=1, le=QA_MAX_TOP_K)
+
+class ReloadRequest(BaseModel):
+	index_path: Optional[str] = None
+	docs_path: Optional[str] = None
+	meta_path: Optional[str] = None
+
 from sentence_transformers import SentenceTransformer
 _st_model = None
-def embed_text(text: str) -> np.ndarray:
+def encode_texts(texts: List[str]) -> np.ndarray:
+	# One forward pass for the whole list
 	global _st_model
 	if _st_model is None:
 		_st_model = SentenceTransformer("all-MiniLM-L6-v2")
-	emb = _st_model.encode([text], normalize_embeddings=True)
-	return np.array(emb[0], dtype=np.float32)
-
-def load_faiss_index():
-	if not os.path.exists(FAISS_INDEX_PATH):
-		# Build dummy index for demo
-		index = faiss.IndexFlatL2(VECTOR_DIM)
-		docs = np.zeros((1, VECTOR_DIM), dtype=np.float32)
-		meta = np.array(["No evidence available"])
-		index.add(docs)
-		np.save(DOCS_PATH, docs)
-		np.save(METADATA_PATH, meta)
-		faiss.write_index(index, FAISS_INDEX_PATH)
-	index = faiss.read_index(FAISS_INDEX_PATH)
-	docs = np.load(DOCS_PATH)
-	meta = np.load(METADATA_PATH, allow_pickle=True)
+	emb = _st_model.encode(texts, normalize_embeddings=True)
+	return np.asarray(emb, dtype=np.float32)
+
+def normalize_question(text: str) -> str:
+	return " ".join(text.lower().split())
+
+class EmbeddingCache:
+	"""Thread-safe LRU of question embeddings keyed by normalized text."""
+
+	def __init__(self, maxsize=4096):
+		self.maxsize = maxsize
+		self._data = OrderedDict()
+		self._lock = threading.Lock()
+		self.hits = 0
+		self.misses = 0
+
+	def get(self, key):
+		with self._lock:
+			emb = self._data.get(key)
+			if emb is None:
+				self.misses += 1
+				return None
+			self._data.move_to_end(key)
+			self.hits += 1
+			return emb
+
+	def put(self, key, emb):
+		with self._lock:
+			self._data[key] = emb
+			self._data.move_to_end(key)
+			while len(self._data) > self.maxsize:
+				self._data.popitem(last=False)
+
+	def stats(self):
+		with self._lock:
+			total = self.hits + self.misses
+			return {
+				"hits": self.hits,
+				"misses": self.misses,
+				"hit_rate": self.hits / total if total else 0.0,
+				"size": len(self._data),
+				"maxsize": self.maxsize,
+			}
+
+_embedding_cache = EmbeddingCache(int(os.getenv("QA_EMBED_CACHE_SIZE", "4096")))
+
+def embed_texts(texts: List[str]) -> np.ndarray:
+	keys = [normalize_question(t) for t in texts]
+	found = {}
+	for key in keys:
+		if key not in found:
+			found[key] = _embedding_cache.get(key)
+	missing = [k for k, emb in found.items() if emb is None]
+	if missing:
+		for key, emb in zip(missing, encode_texts(missing)):
+			_embedding_cache.put(key, emb)
+			found[key] = emb
+	return np.stack([found[k] for k in keys]) if keys else np.empty((0, VECTOR_DIM), dtype=np.float32)
+
+def embed_text(text: str) -> np.ndarray:
+	return embed_texts([text])[0]
+
+def _load_array(path):
+	# Memory-mapped, never unpickled: object arrays are refused (rebuild such stores into meta.jsonl)
+	return np.load(path, mmap_mode="r", allow_pickle=False)
+
+def load_metadata(path):
+	"""meta.jsonl → {id: text} (written by build_faiss.py); legacy meta.npy → array indexed by position."""
+	if path.endswith(".jsonl"):
+		meta = {}
+		with open(path) as f:
+			for line in f:
+				if line.strip():
+					record = json.loads(line)
+					meta[record["id"]] = record["text"]
+		return meta
+	return _load_array(path)
+
+def default_meta_path():
+	return METADATA_PATH if os.path.exists(METADATA_PATH) or not os.path.exists(LEGACY_METADATA_PATH) else LEGACY_METADATA_PATH
+
+def load_faiss_index(index_path=FAISS_INDEX_PATH, docs_path=DOCS_PATH, meta_path=None):
+	meta_path = meta_path or default_meta_path()
+	if not os.path.exists(index_path):
+		# Placeholder store in the builder's format, so a later incremental build replaces it cleanly
+		if not meta_path.endswith(".jsonl"):
+			meta_path = METADATA_PATH
+		write_placeholder(index_path, meta_path, VECTOR_DIM)
+	try:
+		index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP)
+	except RuntimeError:
+		# Not every index type supports mmap
+		index = faiss.read_index(index_path)
+	# nprobe / efSearch for IVF / HNSW indexes (FAISS_NPROBE, FAISS_EF_SEARCH)
+	set_search_params(index, **search_params_from_env())
+	# Raw vectors are optional; the streaming builder keeps them only in the index
+	docs = _load_array(docs_path) if os.path.exists(docs_path) else None
+	meta = load_metadata(meta_path)
 	return index, docs, meta
 
+class VectorStore:
+	"""A loaded index with its docs/metadata; replaced as a whole, never mutated."""
+
+	def __init__(self, index, docs, meta, source):
+		self.index = index
+		self.docs = docs
+		self.meta = meta
+		self.source = source
+		self.loaded_at = time.time()
+
+	@classmethod
+	def load(cls, index_path=FAISS_INDEX_PATH, docs_path=DOCS_PATH, meta_path=None):
+		meta_path = meta_path or default_meta_path()
+		index, docs, meta = load_faiss_index(index_path, docs_path, meta_path)
+		if index.ntotal < len(meta):
+			raise ValueError(f"Index has {index.ntotal} vectors but metadata has {len(meta)} entries")
+		return cls(index, docs, meta, {"index_path": index_path, "docs_path": docs_path, "meta_path": meta_path})
+
+	def text(self, vector_id):
+		# Ids without metadata (-1 padding, or an interrupted build) are skipped
+		if isinstance(self.meta, dict):
+			return self.meta.get(int(vector_id))
+		return str(self.meta[vector_id]) if 0 <= vector_id < len(self.meta) else None
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_store():
+	global _store
+	if _store is None:
+		with _store_lock:
+			if _store is None:
+				_store = VectorStore.load()
+	return _store
+
+def swap_store(store):
+	global _store
+	with _store_lock:
+		_store = store
+	return store
+
 def retrieve_evidence(question: str, top_k=3):
-	index, docs, meta = load_faiss_index()
-	q_emb = embed_text(question)
-	D, I = index.search(np.expand_dims(q_emb, 0), top_k)
-	evidences = [meta[i] for i in I[0] if i < len(meta)]
-	return evidences
+	return retrieve_evidence_batch([question], top_k)[0]
+
+def retrieve_evidence_batch(questions: List[str], top_k=3):
+	store = get_store()
+	q_emb = embed_texts(questions)
+	D, I = store.index.search(q_emb, top_k)
+	return [[t for t in (store.text(i) for i in row) if t is not None] for row in I]
 
 def generate_answer(question: str, evidences: List[str]) -> str:
 	# Prompt template: always cite evidence or answer “I don’t know”
-	if evidences and any(e for e in evidences if e != "No evidence available"):
+	if evidences and any(e for e in evidences if e != PLACEHOLDER_TEXT):
 		return f"Answer: Based on the following evidence: {evidences[0]}"
 	else:
 		return "I don't know."
 
+@asynccontextmanager
+async def lifespan(app):
+	get_store()
+	yield
+
+app = FastAPI(lifespan=lifespan)
+
 @app.post("/qa")
 def qa_endpoint(req: QARequest):
 	evidences = retrieve_evidence(req.question)
 	answer = generate_answer(req.question, evidences)
 	return {"answer": answer, "evidence": evidences}
+
+@app.post("/qa/batch")
+def qa_batch_endpoint(req: BatchQARequest):
+	if not req.questions:
+		return {"results": []}
+	evidence_lists = retrieve_evidence_batch(req.questions, req.top_k)
+	return {"results": [
+		{"question": q, "answer": generate_answer(q, evidences), "evidence": evidences}
+		for q, evidences in zip(req.questions, evidence_lists)
+	]}
+
+@app.get("/qa/cache")
+def qa_cache_stats():
+	return _embedding_cache.stats()
+
+def inside_models_dir(path):
+	root = os.path.realpath(MODELS_DIR)
+	return os.path.commonpath([root, os.path.realpath(path)]) == root
+
+@app.post("/index/reload")
+def reload_index(req: Optional[ReloadRequest] = None):
+	"""Load a rebuilt index off to the side, then swap it in; /qa never sees a partial load."""
+	req = req or ReloadRequest()
+	current = get_store().source
+	paths = {k: getattr(req, k) or v for k, v in current.items()}
+	for key, path in paths.items():
+		if getattr(req, key) and not inside_models_dir(path):
+			raise HTTPException(status_code=400, detail=f"{key} must be inside {MODELS_DIR}")
+	try:
+		store = VectorStore.load(**paths)
+	except Exception as e:
+		raise HTTPException(status_code=400, detail=f"Index reload failed: {e}")
+	swap_store(store)
+	return {"ntotal": store.index.ntotal, "loaded_at": store.loaded_at, **store.source}
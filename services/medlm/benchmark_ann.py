@@ -0,0 +1,93 @@
+"""
+Recall@k vs. latency for MedLM index types on a synthetic corpus.
+
+Generates a clustered corpus of unit vectors (default 1M × 384, roughly
+embedding-shaped), computes exact top-k with IndexFlatL2 as ground truth, then
+builds each ANN index type and sweeps its query-time knob (nprobe / efSearch).
+Latency is measured one query at a time, as /qa issues them.
+
+Usage:
+    python benchmark_ann.py --vectors 1000000 --queries 1000 --k 10
+    python benchmark_ann.py --vectors 200000 --types ivf_flat ivf_pq
+"""
+import argparse
+import time
+
+import faiss
+import numpy as np
+
+from ann_index import INDEX_TYPES, make_index, set_search_params, train_index
+
+SWEEPS = {
+	"flat": [None],
+	"ivf_flat": [1, 4, 16, 64],
+	"ivf_pq": [1, 4, 16, 64],
+	"hnsw": [16, 64, 256],
+}
+
+
+def synthetic_corpus(n, dim, n_clusters=1000, seed=0, chunk=100000):
+	rng = np.random.default_rng(seed)
+	centers = rng.standard_normal((n_clusters, dim)).astype(np.float32)
+	out = np.empty((n, dim), dtype=np.float32)
+	for start in range(0, n, chunk):
+		stop = min(n, start + chunk)
+		labels = rng.integers(0, n_clusters, stop - start)
+		block = centers[labels] + 0.5 * rng.standard_normal((stop - start, dim)).astype(np.float32)
+		out[start:stop] = block / np.linalg.norm(block, axis=1, keepdims=True)
+	return out
+
+
+def recall_at_k(found, truth):
+	k = truth.shape[1]
+	return float(np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)]))
+
+
+def per_query_latency_ms(index, queries, k):
+	start = time.perf_counter()
+	for q in queries:
+		index.search(q[None, :], k)
+	return (time.perf_counter() - start) * 1000 / len(queries)
+
+
+def main():
+	parser = argparse.ArgumentParser()
+	parser.add_argument("--vectors", type=int, default=1000000)
+	parser.add_argument("--dim", type=int, default=384)
+	parser.add_argument("--queries", type=int, default=1000)
+	parser.add_argument("--latency-queries", type=int, default=200)
+	parser.add_argument("--k", type=int, default=10)
+	parser.add_argument("--train-size", type=int, default=100000)
+	parser.add_argument("--types", nargs="+", choices=INDEX_TYPES, default=list(INDEX_TYPES))
+	args = parser.parse_args()
+
+	corpus = synthetic_corpus(args.vectors, args.dim)
+	rng = np.random.default_rng(1)
+	queries = corpus[rng.choice(args.vectors, args.queries, replace=False)]
+	queries = queries + 0.05 * rng.standard_normal(queries.shape).astype(np.float32)
+	queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+	exact = faiss.IndexFlatL2(args.dim)
+	exact.add(corpus)
+	_, truth = exact.search(queries, args.k)
+	del exact
+
+	print(f"{args.vectors} vectors × {args.dim}, {args.queries} queries, recall@{args.k}")
+	print(f"{'index':<10} {'param':>8} {'recall':>8} {'ms/query':>10} {'build s':>9}")
+	for index_type in args.types:
+		start = time.perf_counter()
+		index = make_index(args.dim, index_type, n_vectors=args.vectors)
+		train_index(index, corpus, args.train_size)
+		index.add(corpus)
+		build_s = time.perf_counter() - start
+		for param in SWEEPS[index_type]:
+			set_search_params(index, nprobe=param, ef_search=param)
+			_, found = index.search(queries, args.k)
+			latency = per_query_latency_ms(index, queries[:args.latency_queries], args.k)
+			label = "-" if param is None else str(param)
+			print(f"{index_type:<10} {label:>8} {recall_at_k(found, truth):8.3f} {latency:10.3f} {build_s:9.1f}")
+		del index
+
+
+if __name__ == "__main__":
+	main()
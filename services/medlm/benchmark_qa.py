@@ -0,0 +1,92 @@
+"""
+Latency benchmark for POST /qa: index re-read on every request vs. resident.
+
+Builds a synthetic FAISS index in a temp dir, then times /qa through the
+FastAPI test client with (a) the old behaviour of reading faiss.index,
+docs.npy and meta.npy per request and (b) the resident, memory-mapped store.
+--stub-embeddings swaps the SentenceTransformer for random unit vectors, so
+the numbers isolate retrieval cost (and the script runs without the model).
+
+Usage:
+    python benchmark_qa.py --vectors 100000 --requests 200
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+import faiss
+import numpy as np
+from fastapi.testclient import TestClient
+
+import app as medlm_app
+
+
+def build_synthetic_store(tmp, n_vectors):
+	rng = np.random.default_rng(0)
+	vectors = rng.standard_normal((n_vectors, medlm_app.VECTOR_DIM)).astype(np.float32)
+	vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+	index = faiss.IndexFlatL2(medlm_app.VECTOR_DIM)
+	index.add(vectors)
+	paths = {
+		"index_path": os.path.join(tmp, "faiss.index"),
+		"docs_path": os.path.join(tmp, "docs.npy"),
+		"meta_path": os.path.join(tmp, "meta.npy"),
+	}
+	faiss.write_index(index, paths["index_path"])
+	np.save(paths["docs_path"], vectors)
+	np.save(paths["meta_path"], np.array([f"Synthetic evidence #{i}" for i in range(n_vectors)]))
+	return paths
+
+
+def load_eager(index_path, docs_path, meta_path):
+	# The pre-resident code path: full reads on every request
+	return medlm_app.VectorStore(
+		faiss.read_index(index_path), np.load(docs_path), np.load(meta_path, allow_pickle=True), {}
+	)
+
+
+def time_requests(client, n_requests):
+	latencies = []
+	for i in range(n_requests):
+		start = time.perf_counter()
+		resp = client.post("/qa", json={"question": f"warfarin interaction {i % 10}"})
+		latencies.append((time.perf_counter() - start) * 1000)
+		resp.raise_for_status()
+	ordered = sorted(latencies)
+	return statistics.median(ordered), ordered[int(0.99 * (len(ordered) - 1))]
+
+
+def main():
+	parser = argparse.ArgumentParser()
+	parser.add_argument("--vectors", type=int, default=100000)
+	parser.add_argument("--requests", type=int, default=200)
+	parser.add_argument("--stub-embeddings", action="store_true")
+	args = parser.parse_args()
+
+	if args.stub_embeddings:
+		rng = np.random.default_rng(1)
+		def stub_encode(texts):
+			v = rng.standard_normal((len(texts), medlm_app.VECTOR_DIM)).astype(np.float32)
+			return v / np.linalg.norm(v, axis=1, keepdims=True)
+		medlm_app.encode_texts = stub_encode
+
+	with tempfile.TemporaryDirectory() as tmp:
+		paths = build_synthetic_store(tmp, args.vectors)
+		client = TestClient(medlm_app.app)
+		print(f"/qa over {args.vectors} vectors, {args.requests} requests")
+
+		resident_get_store = medlm_app.get_store
+		medlm_app.get_store = lambda: load_eager(**paths)
+		p50, p99 = time_requests(client, args.requests)
+		print(f"  reload per request : p50={p50:8.2f} ms  p99={p99:8.2f} ms")
+
+		medlm_app.get_store = resident_get_store
+		medlm_app.swap_store(medlm_app.VectorStore.load(**paths))
+		p50, p99 = time_requests(client, args.requests)
+		print(f"  resident (mmap)    : p50={p50:8.2f} ms  p99={p99:8.2f} ms")
+
+
+if __name__ == "__main__":
+	main()
@@ -1,43 +1,248 @@
 """
 Build FAISS index for MedLM QA from KG triples and medical docs using SentenceTransformers.
+
+The build streams the corpus: lines are read lazily, encoded in bounded-size
+chunks and appended to the existing index under stable integer ids
+(IndexIDMap2). Metadata lives in meta.jsonl, one {"id", "text", "source",
+"hash"} record per vector, which doubles as the content-hash manifest:
+documents whose hash is already present are skipped on later runs.
+
+Usage:
+    python build_faiss.py
+    python build_faiss.py --chunk-size 512 --checkpoint-every 20
+    python build_faiss.py --rebuild --index-type ivf_pq --nlist 1024 --pq-m 16 --train-size 100000
+    python build_faiss.py --rebuild --index-type hnsw --hnsw-m 32
+
+Index type and parameters of an existing store are kept on incremental runs;
+asking for different ones without --rebuild is an error.
 """
+import argparse
+import hashlib
+import itertools
+import json
 import os
 import numpy as np
 import faiss
-from sentence_transformers import SentenceTransformer
+from ann_index import INDEX_TYPES, describe_index, make_index, train_index
 
 VECTOR_DIM = 384
+MODEL_NAME = "all-MiniLM-L6-v2"
 FAISS_INDEX_PATH = "models/medlm/faiss.index"
-DOCS_PATH = "models/medlm/docs.npy"
-METADATA_PATH = "models/medlm/meta.npy"
+METADATA_PATH = "models/medlm/meta.jsonl"
 KG_TRIPLES_PATH = "data/manual/example_kg_triples.txt"  # One triple per line
 DOCS_TEXT_PATH = "data/manual/example_med_docs.txt"      # One doc per line
+# Single-record store the API writes when it starts before the first build
+PLACEHOLDER_TEXT = "No evidence available"
+PLACEHOLDER_SOURCE = "placeholder"
+
+
+def content_hash(text):
+    return hashlib.sha256(text.strip().encode("utf-8")).hexdigest()
+
+
+def iter_corpus(paths=(KG_TRIPLES_PATH, DOCS_TEXT_PATH)):
+    """Yield (source, text) one line at a time."""
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    yield os.path.basename(path), line.strip()
+
+
+def iter_meta(meta_path=METADATA_PATH):
+    if not os.path.exists(meta_path):
+        return
+    with open(meta_path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def write_placeholder(index_path=FAISS_INDEX_PATH, meta_path=METADATA_PATH, dim=VECTOR_DIM):
+    """One zero vector in the builder's format (IDMap2 + hashed meta.jsonl); the next build replaces it."""
+    index = faiss.IndexIDMap2(make_index(dim, "flat"))
+    index.add_with_ids(np.zeros((1, dim), dtype=np.float32), np.array([0], dtype=np.int64))
+    faiss.write_index(index, index_path)
+    record = {"id": 0, "text": PLACEHOLDER_TEXT, "source": PLACEHOLDER_SOURCE, "hash": content_hash(PLACEHOLDER_TEXT)}
+    with open(meta_path, "w") as f:
+        f.write(json.dumps(record) + "\n")
+
+
+def chunked(iterable, size):
+    it = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class StreamingIndexBuilder:
+    """Append-only index writer: encode chunks, add with stable ids, checkpoint atomically."""
+
+    def __init__(self, encode, index_path=FAISS_INDEX_PATH, meta_path=METADATA_PATH, rebuild=False,
+                 index_type=None, train_size=100000, dim=VECTOR_DIM, **index_params):
+        # index_type/index_params left as None keep an existing store's settings
+        # (make_index defaults for a new one); explicit values must match it
+        self.encode = encode
+        self.index_path = index_path
+        self.meta_path = meta_path
+        self.train_size = train_size
+        self.dim = dim
+        self.requested_type = index_type
+        self.index_type = index_type or "flat"
+        self.index_params = {k: v for k, v in index_params.items() if v is not None}
+        self.pending_meta = []
+        self.added = 0
+        self.skipped = 0
+        self.seen = set()
+        self.next_id = 0
+        # IVF/PQ indexes are created once their first train_size vectors
+        # (the training sample) have been buffered; flat/HNSW start right away.
+        self.index = None
+        self.train_buffer = []
+        if not rebuild and os.path.exists(index_path) and os.path.exists(meta_path):
+            rebuild = not self._resume()
+            if rebuild:
+                print(f"{index_path} is a placeholder or predates incremental builds; rebuilding it")
+            else:
+                self._check_index_settings()
+        else:
+            rebuild = True
+        if rebuild:
+            for path in (index_path, meta_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            self.index = self._new_index(0) if self.index_type in ("flat", "hnsw") else None
+            self.seen = set()
+            self.next_id = 0
+
+    def _resume(self):
+        """Load the existing store to append to; False if it can't be appended to (needs a full rebuild)."""
+        # The API's placeholder, and stores from older builds (positional ids, no
+        # content hashes), are replaced rather than extended
+        self.index = faiss.read_index(self.index_path)
+        if not isinstance(self.index, faiss.IndexIDMap2):
+            return False
+        for record in iter_meta(self.meta_path):
+            if "hash" not in record or record.get("source") == PLACEHOLDER_SOURCE:
+                return False
+            self.seen.add(record["hash"])
+            self.next_id = max(self.next_id, record["id"] + 1)
+        return True
+
+    def _check_index_settings(self):
+        """Refuse to append to a store built with a different index type or parameters."""
+        index_type, params = describe_index(self.index)
+        wanted = {k: v for k, v in self.index_params.items() if k in params}
+        mismatched = (self.requested_type not in (None, index_type)) or any(params[k] != v for k, v in wanted.items())
+        if mismatched:
+            requested = {"index_type": self.requested_type or index_type, **wanted}
+            raise ValueError(
+                f"{self.index_path} is a {index_type} index {params}, not {requested}; "
+                "pass --rebuild (rebuild=True) to re-index with the new settings"
+            )
+        self.index_type = index_type
+
+    def _new_index(self, n_vectors):
+        return faiss.IndexIDMap2(make_index(self.dim, self.index_type, n_vectors=n_vectors, **self.index_params))
+
+    def add_chunk(self, records):
+        fresh = []
+        for source, text in records:
+            h = content_hash(text)
+            if h in self.seen:
+                self.skipped += 1
+                continue
+            self.seen.add(h)
+            fresh.append({"id": self.next_id, "text": text, "source": source, "hash": h})
+            self.next_id += 1
+        if not fresh:
+            return
+        vectors = np.ascontiguousarray(self.encode([r["text"] for r in fresh]), dtype=np.float32)
+        if self.index is None:
+            self.train_buffer.append((vectors, fresh))
+            if sum(len(v) for v, _ in self.train_buffer) >= self.train_size:
+                self._train_and_flush_buffer()
+            return
+        self._add(vectors, fresh)
+
+    def _add(self, vectors, records):
+        ids = np.array([r["id"] for r in records], dtype=np.int64)
+        self.index.add_with_ids(vectors, ids)
+        self.pending_meta.extend(records)
+        self.added += len(records)
+
+    def _train_and_flush_buffer(self):
+        sample = np.concatenate([v for v, _ in self.train_buffer]) if self.train_buffer else np.empty((0, self.dim), dtype=np.float32)
+        self.index = self._new_index(len(sample))
+        if len(sample):
+            train_index(self.index, sample, self.train_size)
+        buffered, self.train_buffer = self.train_buffer, []
+        for vectors, records in buffered:
+            self._add(vectors, records)
+
+    def checkpoint(self):
+        # Index first (atomic replace), then metadata: a crash in between can only
+        # leave vectors without metadata, which retrieval ignores, never the reverse.
+        if not self.pending_meta and os.path.exists(self.index_path):
+            return
+        tmp_path = self.index_path + ".tmp"
+        faiss.write_index(self.index, tmp_path)
+        os.replace(tmp_path, self.index_path)
+        with open(self.meta_path, "a") as f:
+            for record in self.pending_meta:
+                f.write(json.dumps(record) + "\n")
+        self.pending_meta = []
+
+    def finish(self):
+        if self.index is None:
+            self._train_and_flush_buffer()
+        self.checkpoint()
+        return self.index
 
-os.makedirs("models/medlm", exist_ok=True)
 
-model = SentenceTransformer("all-MiniLM-L6-v2")
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunk-size", type=int, default=256, help="Documents encoded per chunk")
+    parser.add_argument("--batch-size", type=int, default=64, help="Encoder batch size")
+    parser.add_argument("--checkpoint-every", type=int, default=50, help="Chunks between index writes")
+    parser.add_argument("--rebuild", action="store_true", help="Discard the existing index and start over")
+    # Index settings default to the existing store's (flat and make_index defaults for a new one);
+    # changing them on an existing store requires --rebuild
+    parser.add_argument("--index-type", choices=INDEX_TYPES, default=os.getenv("FAISS_INDEX_TYPE"))
+    parser.add_argument("--nlist", type=int, default=None, help="IVF cells (default ~4*sqrt(train size))")
+    parser.add_argument("--pq-m", type=int, default=None, help="IVF-PQ sub-quantizers (default 16)")
+    parser.add_argument("--pq-bits", type=int, default=None, help="default 8")
+    parser.add_argument("--hnsw-m", type=int, default=None, help="default 32")
+    parser.add_argument("--ef-construction", type=int, default=None, help="default 200")
+    parser.add_argument("--train-size", type=int, default=100000, help="Vectors sampled to train IVF/PQ")
+    args = parser.parse_args()
 
-# Load triples and docs
-triples = []
-if os.path.exists(KG_TRIPLES_PATH):
-    with open(KG_TRIPLES_PATH) as f:
-        triples = [line.strip() for line in f if line.strip()]
+    from sentence_transformers import SentenceTransformer
+    os.makedirs("models/medlm", exist_ok=True)
+    model = SentenceTransformer(MODEL_NAME)
 
-docs = []
-if os.path.exists(DOCS_TEXT_PATH):
-    with open(DOCS_TEXT_PATH) as f:
-        docs = [line.strip() for line in f if line.strip()]
+    def encode(texts):
+        return model.encode(texts, batch_size=args.batch_size, normalize_embeddings=True)
 
-corpus = triples + docs
-if not corpus:
-    corpus = ["No evidence available"]
+    try:
+        builder = StreamingIndexBuilder(
+            encode, rebuild=args.rebuild, index_type=args.index_type, train_size=args.train_size,
+            nlist=args.nlist, pq_m=args.pq_m, pq_bits=args.pq_bits,
+            hnsw_m=args.hnsw_m, ef_construction=args.ef_construction,
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    for i, chunk in enumerate(chunked(iter_corpus(), args.chunk_size), start=1):
+        builder.add_chunk(chunk)
+        if i % args.checkpoint_every == 0:
+            builder.checkpoint()
+    index = builder.finish()
+    print(f"Indexed {builder.added} new items ({builder.skipped} unchanged skipped); {index.ntotal} total in FAISS.")
 
-embeddings = model.encode(corpus, show_progress_bar=True, normalize_embeddings=True)
-embeddings = np.array(embeddings, dtype=np.float32)
 
-index = faiss.IndexFlatL2(embeddings.shape[1])
-index.add(embeddings)
-faiss.write_index(index, FAISS_INDEX_PATH)
-np.save(DOCS_PATH, embeddings)
-np.save(METADATA_PATH, np.array(corpus))
-print(f"Indexed {len(corpus)} items to FAISS.")
+if __name__ == "__main__":
+    main()
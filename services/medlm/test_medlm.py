@@ -0,0 +1,74 @@
+import numpy as np
+from services.medlm.app import VectorStore, load_faiss_index
+from build_faiss import StreamingIndexBuilder
+
+def fake_encode(texts):
+    # Deterministic unit vectors; the builder only needs the right shape
+    vectors = np.stack([np.random.default_rng(len(t)).standard_normal(384) for t in texts]).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def test_incremental_build_after_service_start(tmp_path):
+    index_path, meta_path = str(tmp_path / "faiss.index"), str(tmp_path / "meta.jsonl")
+    docs_path = str(tmp_path / "docs.npy")
+    # The service starts before any build and writes its placeholder store
+    index, _, meta = load_faiss_index(index_path, docs_path, meta_path)
+    assert index.ntotal == 1 and meta == {0: "No evidence available"}
+
+    # A default (incremental) build replaces the placeholder instead of appending to it
+    builder = StreamingIndexBuilder(fake_encode, index_path, meta_path)
+    builder.add_chunk([("docs.txt", "Warfarin interacts with aspirin"), ("docs.txt", "Take metformin with food")])
+    builder.finish()
+    store = VectorStore.load(index_path, docs_path, meta_path)
+    assert store.index.ntotal == 2
+    assert sorted(store.meta.values()) == ["Take metformin with food", "Warfarin interacts with aspirin"]
+
+    # ...and the next run appends to it, skipping unchanged documents
+    builder = StreamingIndexBuilder(fake_encode, index_path, meta_path)
+    builder.add_chunk([("docs.txt", "Warfarin interacts with aspirin"), ("docs.txt", "Avoid grapefruit with statins")])
+    builder.finish()
+    assert (builder.added, builder.skipped) == (1, 1)
+    assert VectorStore.load(index_path, docs_path, meta_path).meta[2] == "Avoid grapefruit with statins"
+
+def test_changing_index_type_requires_rebuild(tmp_path):
+    import pytest
+    from ann_index import describe_index
+    index_path, meta_path = str(tmp_path / "faiss.index"), str(tmp_path / "meta.jsonl")
+    builder = StreamingIndexBuilder(fake_encode, index_path, meta_path, index_type="flat")
+    builder.add_chunk([("docs.txt", "Warfarin interacts with aspirin")])
+    builder.finish()
+    with pytest.raises(ValueError, match="--rebuild"):
+        StreamingIndexBuilder(fake_encode, index_path, meta_path, index_type="hnsw", hnsw_m=16)
+    # Unspecified settings keep the existing store's; --rebuild switches type
+    assert describe_index(StreamingIndexBuilder(fake_encode, index_path, meta_path).index)[0] == "flat"
+    builder = StreamingIndexBuilder(fake_encode, index_path, meta_path, rebuild=True, index_type="hnsw", hnsw_m=16)
+    builder.add_chunk([("docs.txt", "Warfarin interacts with aspirin")])
+    builder.finish()
+    assert describe_index(builder.index) == ("hnsw", {"hnsw_m": 16, "ef_construction": 200})
+    assert describe_index(StreamingIndexBuilder(fake_encode, index_path, meta_path, index_type="hnsw").index)[0] == "hnsw"
+
+def test_reload_rejects_paths_outside_models_dir(tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+    from services.medlm import app as medlm_app
+    monkeypatch.setattr(medlm_app, "_store", VectorStore(None, None, {}, {"index_path": "i", "docs_path": "d", "meta_path": "m"}))
+    client = TestClient(medlm_app.app)
+    for body in ({"index_path": str(tmp_path / "faiss.index")}, {"meta_path": "models/medlm/../../etc/meta.jsonl"}):
+        response = client.post("/index/reload", json=body)
+        assert response.status_code == 400 and "must be inside" in response.json()["detail"]
+
+def test_pickled_metadata_is_refused(tmp_path):
+    import pytest
+    from services.medlm.app import load_metadata
+    np.save(tmp_path / "meta.npy", np.array([{"text": "x"}], dtype=object), allow_pickle=True)
+    with pytest.raises(ValueError):
+        load_metadata(str(tmp_path / "meta.npy"))
+
+def test_batch_qa_rejects_out_of_range_requests():
+    from fastapi.testclient import TestClient
+    from services.medlm import app as medlm_app
+    client = TestClient(medlm_app.app)
+    for body in (
+        {"questions": ["warfarin?"], "top_k": 0},
+        {"questions": ["warfarin?"], "top_k": medlm_app.QA_MAX_TOP_K + 1},
+        {"questions": ["warfarin?"] * (medlm_app.QA_MAX_BATCH + 1)},
+    ):
+        assert client.post("/qa/batch", json=body).status_code == 422
@@ -0,0 +1,116 @@
+"""
+Dynamic micro-batching for model inference.
+
+Concurrent callers `await batcher.submit(item)`; a collector task groups queued
+items into batches of up to `max_batch_size`, waiting at most `max_wait_ms`
+after the first item, and runs `batch_fn(items) -> results` on a thread pool
+so the event loop is never blocked by the model. If a batch fails, its items
+are retried one at a time, so one bad input only fails its own caller.
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class MicroBatcher:
+    def __init__(self, batch_fn, max_batch_size=16, max_wait_ms=10, workers=1):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ner-batch")
+        self._slots = None
+        self._queue = None
+        self._task = None
+        self._loop = None
+        self.batches = 0
+        self.items = 0
+        self.split_batches = 0
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._task is None or self._task.done():
+            # (Re)bind to the running loop, e.g. after a test client spun up a new one
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.workers)
+            self._task = loop.create_task(self._collect())
+
+    async def submit(self, item):
+        self._ensure_started()
+        future = self._loop.create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def submit_many(self, items):
+        return await asyncio.gather(*(self.submit(item) for item in items))
+
+    async def _collect(self):
+        running = set()
+        while True:
+            # Wait for a free worker before collecting, so the queue keeps
+            # filling (and batches grow) while all workers are busy
+            await self._slots.acquire()
+            batch = [await self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            task = asyncio.create_task(self._run(batch))
+            running.add(task)
+            task.add_done_callback(running.discard)
+
+    def _run_isolated(self, items):
+        """[(ok, result or exception)] per item; a failed batch is retried item by item."""
+        try:
+            return [(True, result) for result in self.batch_fn(items)]
+        except Exception as e:
+            if len(items) == 1:
+                return [(False, e)]
+        self.split_batches += 1
+        outcomes = []
+        for item in items:
+            try:
+                outcomes.append((True, self.batch_fn([item])[0]))
+            except Exception as e:
+                outcomes.append((False, e))
+        return outcomes
+
+    async def _run(self, batch):
+        items = [item for item, _ in batch]
+        try:
+            outcomes = await self._loop.run_in_executor(self._executor, self._run_isolated, items)
+        except Exception as e:
+            outcomes = [(False, e)] * len(batch)
+        finally:
+            self.batches += 1
+            self.items += len(batch)
+            self._slots.release()
+        for (_, future), (ok, value) in zip(batch, outcomes):
+            if future.done():
+                continue
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+            "split_batches": self.split_batches,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "workers": self.workers,
+        }
+
+    async def aclose(self):
+        if self._task is not None:
+            self._task.cancel()
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,78 @@
+"""
+CPU latency/throughput of the NER pipeline per model backend.
+
+Runs the same HuggingFace NER pipeline over a set of clinical sentences with
+the PyTorch model, the ONNX Runtime fp32 export and the int8 dynamically
+quantized export, at several batch sizes, and reports p50 batch latency,
+documents/sec and entity agreement with the first backend listed.
+Usage:
+    python export_onnx.py --model_dir ./model --output_dir ./model/onnx
+    python benchmark_backends.py --model_dir ./model --onnx_dir ./model/onnx --batch_sizes 1 16
+"""
+import argparse
+import time
+
+import torch
+from transformers import AutoTokenizer, pipeline
+
+from onnx_backend import BACKENDS, load_model
+from load_test import SAMPLE_TEXTS
+
+
+def entity_set(outputs):
+    return [{(e["entity_group"], e["start"], e["end"]) for e in out} for out in outputs]
+
+
+def agreement(reference, candidate):
+    # Micro-averaged F1 of candidate entity spans against the reference backend
+    tp = sum(len(r & c) for r, c in zip(reference, candidate))
+    n_ref = sum(len(r) for r in reference)
+    n_cand = sum(len(c) for c in candidate)
+    return 2 * tp / (n_ref + n_cand) if n_ref + n_cand else 1.0
+
+
+def run_backend(ner, texts, batch_size, repeats):
+    ner(texts[:batch_size], batch_size=batch_size)  # warm-up
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for i in range(0, len(texts), batch_size):
+            t0 = time.perf_counter()
+            ner(texts[i:i + batch_size], batch_size=batch_size)
+            latencies.append((time.perf_counter() - t0) * 1000)
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return latencies[len(latencies) // 2], repeats * len(texts) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model_dir", default="./model", help="PyTorch model (fine-tuned checkpoint)")
+    parser.add_argument("--onnx_dir", default="./model/onnx", help="export_onnx.py output directory")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--batch_sizes", type=int, nargs="+", default=[1, 16])
+    parser.add_argument("--docs", type=int, default=64)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--threads", type=int, default=None, help="Intra-op threads for torch and onnxruntime")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    texts = [SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)] for i in range(args.docs)]
+    reference = None
+    print(f"{'backend':<10} {'batch':>5} {'p50 ms/batch':>13} {'docs/s':>8} {'agreement':>10}")
+    for backend in args.backends:
+        model_dir = args.model_dir if backend == "pytorch" else args.onnx_dir
+        model = load_model(model_dir, backend, threads=args.threads)
+        tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        ner = pipeline("ner", model=model, tokenizer=tokenizer, aggregation_strategy="simple")
+        entities = entity_set(ner(texts, batch_size=16))
+        if reference is None:
+            reference = entities
+        for batch_size in args.batch_sizes:
+            p50, throughput = run_backend(ner, texts, batch_size, args.repeats)
+            print(f"{backend:<10} {batch_size:>5} {p50:13.1f} {throughput:8.1f} {agreement(reference, entities):10.3f}")
+
+
+if __name__ == "__main__":
+    main()
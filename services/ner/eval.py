@@ -2,12 +2,14 @@
 Evaluate a trained NER model on validation set. Outputs Precision, Recall, F1.
 Usage:
     python eval.py --model_dir ./model
+    python eval.py --model_dir ./model/onnx --backend onnx-int8
 """
 
 import os
 import argparse
 import torch
-from transformers import AutoTokenizer, AutoModelForTokenClassification, Trainer
+import numpy as np
+from transformers import AutoTokenizer, DataCollatorForTokenClassification
 from datasets import Dataset, DatasetDict
 try:
     from datasets import load_metric
@@ -16,6 +18,7 @@ except ImportError:
 from labels import LABELS, LABEL2ID
 import pandas as pd
 from train import read_iob_csv
+from onnx_backend import BACKENDS, load_model
 
 def load_validation_dataset(data_dir):
     valid_sents, valid_labels = read_iob_csv(os.path.join(data_dir, 'valid.csv'))
@@ -43,13 +46,28 @@ def tokenize_and_align_labels(examples, tokenizer):
     tokenized_inputs["labels"] = labels
     return tokenized_inputs
 
+def predict_in_batches(model, dataset, tokenizer, batch_size=32):
+    # Same loop for every backend (Trainer.predict only drives PyTorch models)
+    collator = DataCollatorForTokenClassification(tokenizer, return_tensors="pt")
+    features = dataset.remove_columns(["tokens"])
+    predictions, label_ids = [], []
+    with torch.no_grad():
+        for start in range(0, len(features), batch_size):
+            batch = collator([features[i] for i in range(start, min(start + batch_size, len(features)))])
+            labels = batch.pop("labels")
+            logits = model(**batch).logits
+            predictions.extend(logits.numpy())
+            label_ids.extend(labels.numpy())
+    return predictions, label_ids
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('--model_dir', type=str, required=True)
     parser.add_argument('--data_dir', type=str, default='data/annotated')
+    parser.add_argument('--backend', type=str, choices=BACKENDS, default='pytorch')
     args = parser.parse_args()
 
-    model = AutoModelForTokenClassification.from_pretrained(args.model_dir)
+    model = load_model(args.model_dir, args.backend)
     tokenizer = AutoTokenizer.from_pretrained(args.model_dir)
 
     valid_dataset = load_validation_dataset(args.data_dir)
@@ -59,7 +77,7 @@ def main():
 
     def compute_metrics(p):
         predictions, labels = p
-        predictions = predictions.argmax(-1)
+        predictions = [np.asarray(prediction).argmax(-1) for prediction in predictions]
         true_labels = [[LABELS[l] for l in label if l != -100] for label in labels]
         true_preds = [
             [LABELS[pred] for (pred, lab) in zip(prediction, label) if lab != -100]
@@ -73,13 +91,9 @@ def main():
             "accuracy": results["overall_accuracy"],
         }
 
-    trainer = Trainer(
-        model=model,
-        tokenizer=tokenizer,
-    )
-    outputs = trainer.predict(tokenized_valid)
-    metrics = compute_metrics((outputs.predictions, outputs.label_ids))
-    print("Evaluation Results:")
+    model.eval()
+    metrics = compute_metrics(predict_in_batches(model, tokenized_valid, tokenizer))
+    print(f"Evaluation Results ({args.backend}):")
     for k, v in metrics.items():
         print(f"{k}: {v:.4f}")
 
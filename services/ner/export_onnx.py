@@ -0,0 +1,72 @@
+"""
+Export a trained NER model to ONNX and an int8 dynamically-quantized ONNX model.
+Writes model.onnx, model.int8.onnx, the tokenizer and config to --output_dir,
+which can then be served with MODEL_BACKEND=onnx or MODEL_BACKEND=onnx-int8.
+Usage:
+    python export_onnx.py --model_dir ./model --output_dir ./model/onnx
+    python eval.py --model_dir ./model/onnx --backend onnx-int8
+"""
+import argparse
+import os
+import torch
+from transformers import AutoTokenizer, AutoModelForTokenClassification
+from onnx_backend import ONNX_FILENAME, QUANTIZED_FILENAME
+
+
+class LogitsOnly(torch.nn.Module):
+    # Trace a plain tuple output instead of the ModelOutput dataclass
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask, token_type_ids):
+        return self.model(input_ids=input_ids, attention_mask=attention_mask, token_type_ids=token_type_ids).logits
+
+
+def export_onnx(model_dir, output_dir, opset=17):
+    model = AutoModelForTokenClassification.from_pretrained(model_dir).eval()
+    tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    dummy = tokenizer(["Metformin 500mg twice daily", "Aspirin"], padding=True, return_tensors="pt")
+    inputs = (dummy["input_ids"], dummy["attention_mask"], dummy.get("token_type_ids", torch.zeros_like(dummy["input_ids"])))
+    path = os.path.join(output_dir, ONNX_FILENAME)
+    axes = {0: "batch", 1: "sequence"}
+    with torch.no_grad():
+        torch.onnx.export(
+            LogitsOnly(model), inputs, path,
+            input_names=["input_ids", "attention_mask", "token_type_ids"],
+            output_names=["logits"],
+            dynamic_axes={"input_ids": axes, "attention_mask": axes, "token_type_ids": axes, "logits": axes},
+            opset_version=opset,
+            dynamo=False,
+        )
+    tokenizer.save_pretrained(output_dir)
+    model.config.save_pretrained(output_dir)
+    return path
+
+
+def quantize_onnx(output_dir):
+    # Dynamic quantization: int8 weights for MatMul/Gemm, activations quantized at runtime
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    src = os.path.join(output_dir, ONNX_FILENAME)
+    dst = os.path.join(output_dir, QUANTIZED_FILENAME)
+    quantize_dynamic(src, dst, weight_type=QuantType.QInt8)
+    return dst
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model_dir', type=str, default='./model')
+    parser.add_argument('--output_dir', type=str, default='./model/onnx')
+    parser.add_argument('--opset', type=int, default=17)
+    parser.add_argument('--skip_quantize', action='store_true')
+    args = parser.parse_args()
+
+    path = export_onnx(args.model_dir, args.output_dir, args.opset)
+    print(f"Exported {path} ({os.path.getsize(path) / 1e6:.1f} MB)")
+    if not args.skip_quantize:
+        qpath = quantize_onnx(args.output_dir)
+        print(f"Quantized {qpath} ({os.path.getsize(qpath) / 1e6:.1f} MB)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Load test for the NER service: throughput and latency at several concurrency levels.
+
+Each level runs `--requests` POST /ner/parse calls spread over N concurrent
+clients and reports requests/sec and p50/p99 latency, plus the server's
+micro-batching stats (GET /ner/stats).
+Usage:
+    uvicorn main:app --port 8000 &
+    python load_test.py --url http://localhost:8000 --concurrency 1 8 64 --requests 256
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+SAMPLE_TEXTS = [
+    "Patient is allergic to penicillin and takes metformin 500mg twice daily for type 2 diabetes.",
+    "Start warfarin 5mg once daily; avoid aspirin and NSAIDs due to bleeding risk.",
+    "Atorvastatin 20mg at night for hyperlipidemia. History of asthma, uses salbutamol inhaler PRN.",
+    "Amoxicillin 250mg three times a day for 7 days for acute otitis media.",
+]
+
+
+async def run_level(url, concurrency, n_requests):
+    latencies = []
+    counter = iter(range(n_requests))
+
+    async def client_loop(client):
+        for i in counter:
+            payload = {"text": SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)], "ingest_id": f"load-{i}"}
+            start = time.perf_counter()
+            resp = await client.post(f"{url}/ner/parse", json=payload)
+            latencies.append((time.perf_counter() - start) * 1000)
+            resp.raise_for_status()
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=120) as client:
+        before = (await client.get(f"{url}/ner/stats")).json()
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        after = (await client.get(f"{url}/ner/stats")).json()
+    batches = after["batches"] - before["batches"]
+    avg_batch = (after["items"] - before["items"]) / batches if batches else 0.0
+    ordered = sorted(latencies)
+    p50 = ordered[len(ordered) // 2]
+    p99 = ordered[int(0.99 * (len(ordered) - 1))]
+    print(
+        f"concurrency {concurrency:>3}: {n_requests / elapsed:8.1f} req/s  "
+        f"p50={p50:8.1f} ms  p99={p99:8.1f} ms  avg batch={avg_batch:.1f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 64])
+    parser.add_argument("--requests", type=int, default=256, help="Requests per concurrency level")
+    args = parser.parse_args()
+    for concurrency in args.concurrency:
+        asyncio.run(run_level(args.url, concurrency, args.requests))
+
+
+if __name__ == "__main__":
+    main()
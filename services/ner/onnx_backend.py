@@ -0,0 +1,80 @@
+"""
+ONNX Runtime backend for the token-classification model.
+
+`export_onnx.py` writes `model.onnx` (fp32) and `model.int8.onnx` (int8
+dynamically quantized weights) next to the tokenizer and config.
+`OnnxTokenClassifier` wraps an onnxruntime session behind the
+PreTrainedModel interface the HuggingFace pipeline expects, so tokenization
+and entity aggregation are identical across backends.
+"""
+import os
+
+import numpy as np
+import torch
+from transformers import AutoConfig, PreTrainedModel
+from transformers.modeling_outputs import TokenClassifierOutput
+
+BACKENDS = ("pytorch", "onnx", "onnx-int8")
+ONNX_FILENAME = "model.onnx"
+QUANTIZED_FILENAME = "model.int8.onnx"
+
+
+def onnx_path(model_dir, backend):
+    return os.path.join(model_dir, QUANTIZED_FILENAME if backend == "onnx-int8" else ONNX_FILENAME)
+
+
+class OnnxTokenClassifier(PreTrainedModel):
+    config_class = AutoConfig
+    main_input_name = "input_ids"
+
+    def __init__(self, config, session):
+        super().__init__(config)
+        self.session = session
+        self.input_names = {i.name for i in session.get_inputs()}
+
+    @property
+    def device(self):
+        # No torch parameters; onnxruntime runs on the CPU execution provider
+        return torch.device("cpu")
+
+    def forward(self, input_ids=None, attention_mask=None, token_type_ids=None, **kwargs):
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask, "token_type_ids": token_type_ids}
+        feeds = {
+            name: np.asarray(value.cpu().numpy() if torch.is_tensor(value) else value, dtype=np.int64)
+            for name, value in feeds.items()
+            if name in self.input_names and value is not None
+        }
+        if "token_type_ids" in self.input_names and "token_type_ids" not in feeds:
+            feeds["token_type_ids"] = np.zeros_like(feeds["input_ids"])
+        (logits,) = self.session.run(["logits"], feeds)
+        return TokenClassifierOutput(logits=torch.from_numpy(logits))
+
+
+def session_options(threads=None):
+    import onnxruntime as ort
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    threads = int(os.getenv("ORT_NUM_THREADS", "0")) if threads is None else threads
+    if threads:
+        options.intra_op_num_threads = threads
+    return options
+
+
+def load_onnx_model(model_dir, backend="onnx", threads=None):
+    import onnxruntime as ort
+    path = onnx_path(model_dir, backend)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{path} not found; run export_onnx.py --output_dir {model_dir}")
+    session = ort.InferenceSession(path, session_options(threads), providers=["CPUExecutionProvider"])
+    config = AutoConfig.from_pretrained(model_dir)
+    return OnnxTokenClassifier(config, session).eval()
+
+
+def load_model(model_dir, backend="pytorch", threads=None):
+    """Load a token-classification model for `backend` (one of BACKENDS)."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown MODEL_BACKEND {backend!r}; expected one of {BACKENDS}")
+    if backend == "pytorch":
+        from transformers import AutoModelForTokenClassification
+        return AutoModelForTokenClassification.from_pretrained(model_dir)
+    return load_onnx_model(model_dir, backend, threads)
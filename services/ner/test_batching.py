@@ -0,0 +1,111 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from batching import MicroBatcher
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_concurrent_submits_are_coalesced():
+    calls = []
+
+    def batch_fn(items):
+        calls.append(list(items))
+        return [item.upper() for item in items]
+
+    async def main():
+        batcher = MicroBatcher(batch_fn, max_batch_size=8, max_wait_ms=50)
+        try:
+            return await asyncio.gather(*(batcher.submit(t) for t in ["a", "b", "c", "d"])), batcher.stats()
+        finally:
+            await batcher.aclose()
+
+    results, stats = run(main())
+    assert results == ["A", "B", "C", "D"]
+    assert calls == [["a", "b", "c", "d"]]
+    assert stats["batches"] == 1 and stats["avg_batch_size"] == 4
+
+
+def test_batch_size_cap_splits_batches():
+    calls = []
+
+    def batch_fn(items):
+        calls.append(len(items))
+        return items
+
+    async def main():
+        batcher = MicroBatcher(batch_fn, max_batch_size=3, max_wait_ms=50)
+        try:
+            return await batcher.submit_many(list(range(7)))
+        finally:
+            await batcher.aclose()
+
+    assert run(main()) == list(range(7))
+    assert calls == [3, 3, 1]
+
+
+def test_lone_item_is_flushed_after_max_wait():
+    async def main():
+        batcher = MicroBatcher(lambda items: items, max_batch_size=16, max_wait_ms=20)
+        try:
+            start = time.monotonic()
+            result = await batcher.submit("x")
+            return result, time.monotonic() - start
+        finally:
+            await batcher.aclose()
+
+    result, elapsed = run(main())
+    # A partial batch does not wait for max_batch_size items, only for max_wait_ms
+    assert result == "x"
+    assert 0.015 <= elapsed < 1.0
+
+
+def test_failing_item_only_fails_its_own_caller():
+    calls = []
+    lock = threading.Lock()
+
+    def batch_fn(items):
+        with lock:
+            calls.append(list(items))
+        if "bad" in items:
+            raise ValueError("cannot parse")
+        return [len(item) for item in items]
+
+    async def main():
+        batcher = MicroBatcher(batch_fn, max_batch_size=8, max_wait_ms=50)
+        try:
+            results = await asyncio.gather(*(batcher.submit(t) for t in ["ok", "bad", "fine"]), return_exceptions=True)
+            return results, batcher.stats()
+        finally:
+            await batcher.aclose()
+
+    results, stats = run(main())
+    assert results[0] == 2 and results[2] == 4
+    assert isinstance(results[1], ValueError)
+    # One failed batch, then each item retried on its own
+    assert calls == [["ok", "bad", "fine"], ["ok"], ["bad"], ["fine"]]
+    assert stats["split_batches"] == 1
+
+
+def test_single_item_failure_is_not_retried():
+    calls = []
+
+    def batch_fn(items):
+        calls.append(list(items))
+        raise RuntimeError("model error")
+
+    async def main():
+        batcher = MicroBatcher(batch_fn, max_batch_size=8, max_wait_ms=1)
+        try:
+            with pytest.raises(RuntimeError):
+                await batcher.submit("x")
+        finally:
+            await batcher.aclose()
+
+    run(main())
+    assert calls == [["x"]]
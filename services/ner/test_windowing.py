@@ -0,0 +1,39 @@
+import re
+
+from windowing import merge_window_entities, token_windows, window_texts
+
+
+def whitespace_offsets(text):
+    return [(m.start(), m.end()) for m in re.finditer(r"\S+", text)]
+
+
+def fake_ner(text):
+    # Tag every word starting with "drug" as a DRUG entity
+    return [
+        {"start": m.start(), "end": m.end(), "entity_group": "DRUG", "word": m.group(), "score": 0.9}
+        for m in re.finditer(r"drug\w*", text)
+    ]
+
+
+def test_short_text_is_a_single_window():
+    text = "aspirin twice daily"
+    windows = token_windows(whitespace_offsets(text), max_tokens=8, overlap=2)
+    assert window_texts(text, windows) == [text]
+
+
+def test_windows_cover_text_and_merge_without_duplicates():
+    words = [f"drug{i}" if i % 7 == 0 else f"w{i}" for i in range(200)]
+    text = " ".join(words)
+    windows = token_windows(whitespace_offsets(text), max_tokens=32, overlap=8)
+    assert len(windows) > 1
+    # Each window stays within the token budget and neighbours overlap
+    for chunk in window_texts(text, windows):
+        assert len(chunk.split()) <= 32
+    for a, b in zip(windows, windows[1:]):
+        assert b["start"] < a["end"]
+        assert a["core_end"] == b["core_start"]
+
+    merged = merge_window_entities(windows, [fake_ner(chunk) for chunk in window_texts(text, windows)])
+    assert merged == fake_ner(text)
+    for ent in merged:
+        assert text[ent["start"]:ent["end"]] == ent["word"]
@@ -0,0 +1,77 @@
+"""
+Sliding-window NER for documents longer than the model's context.
+
+A document is cut into overlapping windows of at most `max_tokens` tokens
+(`overlap` tokens shared between neighbours); windows from all documents in a
+batch go through the pipeline together, and entity offsets are shifted back to
+document character positions. Each window owns a "core" span (its range minus
+half the overlap on every interior side); cores tile the document, so keeping
+only entities that start inside their window's core removes the duplicates
+found twice in an overlap while every entity is still seen with context on
+both sides.
+"""
+
+# A single window covering the whole text
+WHOLE_TEXT = {"start": 0, "end": None, "core_start": 0, "core_end": None}
+
+
+def token_windows(offsets, max_tokens=256, overlap=64):
+    """
+    Split a token sequence into overlapping windows.
+
+    `offsets` are (char_start, char_end) per token, as returned by a fast
+    tokenizer's offset mapping. Returns a list of dicts with the window's
+    character range (`start`, `end`) and its core (`core_start`, `core_end`).
+    """
+    if max_tokens <= 0 or len(offsets) <= max_tokens:
+        return [WHOLE_TEXT]
+    if not 0 <= overlap < max_tokens:
+        raise ValueError("overlap must be smaller than max_tokens")
+    step = max_tokens - overlap
+    starts = list(range(0, len(offsets) - overlap, step))
+    windows = []
+    for n, first in enumerate(starts):
+        last = min(first + max_tokens, len(offsets)) - 1
+        # Core boundaries sit at the middle token of each overlap
+        core_first = first + overlap // 2 if n > 0 else 0
+        core_last = last - (overlap - overlap // 2) if n < len(starts) - 1 else len(offsets) - 1
+        windows.append({
+            "start": offsets[first][0],
+            "end": offsets[last][1],
+            "core_start": offsets[core_first][0] if n > 0 else 0,
+            "core_end": offsets[core_last + 1][0] if n < len(starts) - 1 else None,
+        })
+    return windows
+
+
+def window_texts(text, windows):
+    return [text[w["start"]:w["end"]] for w in windows]
+
+
+def merge_window_entities(windows, window_results):
+    """
+    Map per-window pipeline entities back to document offsets and de-duplicate.
+
+    Entities are kept only if they start inside their window's core; any
+    remaining overlaps (an entity straddling a core boundary) keep the
+    higher-scoring span.
+    """
+    merged = []
+    for window, entities in zip(windows, window_results):
+        for ent in entities:
+            start = ent["start"] + window["start"]
+            end = ent["end"] + window["start"]
+            if start < window["core_start"]:
+                continue
+            if window["core_end"] is not None and start >= window["core_end"]:
+                continue
+            merged.append({**ent, "start": start, "end": end})
+    merged.sort(key=lambda e: (e["start"], -e["end"]))
+    result = []
+    for ent in merged:
+        if result and ent["start"] < result[-1]["end"]:
+            if float(ent["score"]) > float(result[-1]["score"]):
+                result[-1] = ent
+            continue
+        result.append(ent)
+    return result
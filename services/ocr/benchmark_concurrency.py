@@ -0,0 +1,94 @@
+"""
+Concurrency benchmark for the OCR service.
+
+Uploads the sample images under data/uploads (*.png, *.jpg, *.pdf) to
+POST /ocr/upload from N concurrent clients and reports throughput, p50/p99
+latency and how many uploads were refused with 429. While uploads run, a probe
+polls GET /ocr/stats to show the event loop stays responsive (before the
+process pool, one Tesseract call blocked every other request).
+
+Each upload gets a unique trailer after the file data so the result cache
+does not answer it; pass --repeat to send identical bytes and measure cache
+hits instead.
+Usage:
+	uvicorn main:app --port 8000 &
+	python benchmark_concurrency.py --url http://localhost:8000 --concurrency 1 4 16 --requests 32
+"""
+import argparse
+import asyncio
+import glob
+import os
+import time
+
+import httpx
+
+UPLOAD_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../data/uploads'))
+
+def sample_files(root=UPLOAD_ROOT):
+	paths = []
+	for pattern in ("*.png", "*.jpg", "*.jpeg", "*.pdf"):
+		paths.extend(glob.glob(os.path.join(root, "*", pattern)))
+	return sorted(paths)
+
+def percentile(values, q):
+	ordered = sorted(values)
+	return ordered[int(q * (len(ordered) - 1))] if ordered else 0.0
+
+async def run_level(url, files, concurrency, n_requests, repeat=False):
+	payloads = [(os.path.basename(p), open(p, "rb").read()) for p in files]
+	latencies, statuses, probe, cached = [], [], [], []
+	counter = iter(range(n_requests))
+	done = asyncio.Event()
+
+	async def client_loop(client):
+		for i in counter:
+			name, data = payloads[i % len(payloads)]
+			if not repeat:
+				# Image and PDF readers ignore bytes after the end marker
+				data += f"\n{time.time_ns()}-{i}\n".encode()
+			start = time.perf_counter()
+			resp = await client.post(f"{url}/ocr/upload", files={"file": (name, data)})
+			statuses.append(resp.status_code)
+			if resp.status_code == 200:
+				latencies.append((time.perf_counter() - start) * 1000)
+				cached.append(resp.json().get("cached", False))
+
+	async def probe_loop(client):
+		while not done.is_set():
+			start = time.perf_counter()
+			await client.get(f"{url}/ocr/stats")
+			probe.append((time.perf_counter() - start) * 1000)
+			await asyncio.sleep(0.05)
+
+	limits = httpx.Limits(max_connections=concurrency + 1)
+	async with httpx.AsyncClient(limits=limits, timeout=300) as client:
+		probe_task = asyncio.create_task(probe_loop(client))
+		start = time.perf_counter()
+		await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+		elapsed = time.perf_counter() - start
+		done.set()
+		await probe_task
+	ok = statuses.count(200)
+	print(
+		f"concurrency {concurrency:>3}: {ok / elapsed:7.2f} docs/s  p50={percentile(latencies, 0.5):8.1f} ms  "
+		f"p99={percentile(latencies, 0.99):8.1f} ms  429s={statuses.count(429):>3}  cached={sum(cached):>3}  "
+		f"stats probe p99={percentile(probe, 0.99):6.1f} ms"
+	)
+
+def main():
+	parser = argparse.ArgumentParser()
+	parser.add_argument("--url", default="http://localhost:8000")
+	parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+	parser.add_argument("--requests", type=int, default=32, help="Uploads per concurrency level")
+	parser.add_argument("--repeat", action="store_true", help="Send identical bytes so repeats hit the result cache")
+	parser.add_argument("--samples", default=UPLOAD_ROOT, help="Directory holding <id>/<file> sample uploads")
+	args = parser.parse_args()
+	files = sample_files(args.samples)
+	if not files:
+		raise SystemExit(f"No sample images under {args.samples}")
+	print(f"{len(files)} sample files")
+	for concurrency in args.concurrency:
+		asyncio.run(run_level(args.url, files, concurrency, args.requests, args.repeat))
+
+if __name__ == "__main__":
+	main()
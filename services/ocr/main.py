@@ -1,24 +1,77 @@
 # OCR Service main.py
+import asyncio
+import hashlib
+import json
+import logging
 import os
+import time
 import uuid
 import shutil
+from contextlib import asynccontextmanager
 from datetime import datetime
 from fastapi import FastAPI, UploadFile, File, HTTPException
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-import pytesseract
-from PIL import Image
+from typing import Optional
+from ocr_engine import assemble_pages, ocr_image, ocr_pdf_page, pdf_page_count
+from ocr_pool import OCRPool, PoolBusy
+from upload_cache import UploadCache
 
-app = FastAPI(title="OCR Service", description="Extracts text and bounding boxes from prescription images or PDFs.")
+logger = logging.getLogger(__name__)
+
+# Tesseract runs on a bounded process pool sized to the machine's cores;
+# beyond OCR_MAX_QUEUE waiting jobs (PDF pages count one each), uploads are refused with 429
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(os.cpu_count() or 1)))
+OCR_MAX_QUEUE = int(os.getenv("OCR_MAX_QUEUE", str(4 * OCR_WORKERS)))
+ocr_pool = OCRPool(OCR_WORKERS, OCR_MAX_QUEUE)
+# PDF rasterization resolution, and Tesseract's own OpenMP threads per worker
+# (pages already run in parallel across workers, so 1 avoids oversubscription)
+OCR_PDF_DPI = int(os.getenv("OCR_PDF_DPI", "200"))
+os.environ.setdefault("OMP_THREAD_LIMIT", os.getenv("OCR_TESSERACT_THREADS", "1"))
+
+@asynccontextmanager
+async def lifespan(app):
+	# Index uploads OCR'd before the cache existed, and trim the directory to size
+	await asyncio.to_thread(upload_cache.backfill)
+	await asyncio.to_thread(upload_cache.evict)
+	yield
+	ocr_pool.shutdown()
+
+app = FastAPI(title="OCR Service", description="Extracts text and bounding boxes from prescription images or PDFs.", lifespan=lifespan)
 
 UPLOAD_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../data/uploads'))
 os.makedirs(UPLOAD_ROOT, exist_ok=True)
+# Identical uploads (by sha256 of their bytes) reuse the stored ocr_result.json
+upload_cache = UploadCache(UPLOAD_ROOT, max_bytes=int(float(os.getenv("OCR_CACHE_MAX_MB", "1024")) * 1024 * 1024))
+UPLOAD_CHUNK_SIZE = 1 << 20
+MAX_UPLOAD_BYTES = int(float(os.getenv("OCR_MAX_UPLOAD_MB", "25")) * 1024 * 1024)
+
+def save_upload(src, file_path):
+	"""Copy `src` to `file_path` chunk by chunk, hashing on the way: (size, sha256 hex).
+	Stops early once MAX_UPLOAD_BYTES is exceeded, in which case size > MAX_UPLOAD_BYTES."""
+	digest = hashlib.sha256()
+	size = 0
+	with open(file_path, "wb") as buffer:
+		for chunk in iter(lambda: src.read(UPLOAD_CHUNK_SIZE), b""):
+			size += len(chunk)
+			if size > MAX_UPLOAD_BYTES:
+				break
+			digest.update(chunk)
+			buffer.write(chunk)
+	return size, digest.hexdigest()
+
+def queue_full(detail):
+	return HTTPException(status_code=429, detail=detail, headers={"Retry-After": os.getenv("OCR_RETRY_AFTER", "1")})
 
 class OCRResponse(BaseModel):
 	ingest_id: str
 	raw_text: str
 	blocks: list
+	pages: list = []
 	timestamp: str
+	timing_ms: dict = {}
+	cached: bool = False
+	cached_from: Optional[str] = None
 
 @app.post("/ocr/upload", response_model=OCRResponse)
 async def upload_ocr(file: UploadFile = File(...)):
@@ -27,46 +80,69 @@ async def upload_ocr(file: UploadFile = File(...)):
 	upload_dir = os.path.join(UPLOAD_ROOT, ingest_id)
 	os.makedirs(upload_dir, exist_ok=True)
 	file_path = os.path.join(upload_dir, file.filename)
-	# Save uploaded file
-	with open(file_path, "wb") as buffer:
-		shutil.copyfileobj(file.file, buffer)
-
-	# Open image (handle PDF/image)
+	# Save and hash the upload in a worker thread so large files never block the event loop
 	try:
-		if file.filename.lower().endswith(".pdf"):
-			from pdf2image import convert_from_path
-			images = convert_from_path(file_path)
-			image = images[0]  # Only first page for now
-		else:
-			image = Image.open(file_path)
-	except Exception as e:
-		raise HTTPException(status_code=400, detail=f"Invalid image/PDF: {e}")
+		size, digest = await asyncio.to_thread(save_upload, file.file, file_path)
+	except BaseException:
+		shutil.rmtree(upload_dir, ignore_errors=True)
+		raise
+	if size > MAX_UPLOAD_BYTES:
+		shutil.rmtree(upload_dir, ignore_errors=True)
+		raise HTTPException(status_code=413, detail=f"Upload exceeds {MAX_UPLOAD_BYTES} bytes")
 
-	# OCR with bounding boxes
-	ocr_data = pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT)
-	blocks = []
-	for i in range(len(ocr_data['text'])):
-		if ocr_data['text'][i].strip():
-			blocks.append({
-				'text': ocr_data['text'][i],
-				'left': ocr_data['left'][i],
-				'top': ocr_data['top'][i],
-				'width': ocr_data['width'][i],
-				'height': ocr_data['height'][i],
-				'conf': ocr_data['conf'][i]
-			})
-	raw_text = " ".join([b['text'] for b in blocks])
-	timestamp = datetime.utcnow().isoformat()
+	# Previously seen bytes: return the stored result instead of re-running Tesseract.
+	# Hits never wait for (or get refused by) the OCR pool; the duplicate file is
+	# dropped and the original ingest (whose directory holds the upload and result)
+	# is returned, so the ingest_id always points at something on disk.
+	cached = upload_cache.lookup(digest)
+	if cached is not None:
+		shutil.rmtree(upload_dir, ignore_errors=True)
+		return {**cached, "cached": True, "cached_from": cached["ingest_id"]}
 
-	# Save OCR result as JSON
-	import json
-	result = {
-		'ingest_id': ingest_id,
-		'raw_text': raw_text,
-		'blocks': blocks,
-		'timestamp': timestamp
-	}
-	with open(os.path.join(upload_dir, "ocr_result.json"), "w") as f:
-		json.dump(result, f, indent=2)
+	# Decode and OCR (image or every PDF page) with bounding boxes in worker processes.
+	# Any failure from here on drops the upload directory before answering.
+	start = time.perf_counter()
+	try:
+		async with ocr_pool.slot() as reservation:
+			if file.filename.lower().endswith(".pdf"):
+				page_count = await ocr_pool.run(pdf_page_count, file_path)
+				# Every page is a job: reserve the rest before queueing them (PoolBusy -> 429)
+				reservation.grow(page_count - reservation.jobs)
+				# One job per page: each worker rasterizes only its own page, pages run in parallel
+				pages = await asyncio.gather(*(
+					ocr_pool.run(ocr_pdf_page, file_path, page, OCR_PDF_DPI) for page in range(1, page_count + 1)
+				))
+			else:
+				pages = [await ocr_pool.run(ocr_image, file_path)]
+		raw_text, blocks = assemble_pages(pages)
+		timestamp = datetime.utcnow().isoformat()
+
+		# Save OCR result as JSON
+		result = {
+			'ingest_id': ingest_id,
+			'raw_text': raw_text,
+			'blocks': blocks,
+			'pages': pages,
+			'timestamp': timestamp,
+			'timing_ms': {'total': (time.perf_counter() - start) * 1000},
+		}
+		with open(os.path.join(upload_dir, "ocr_result.json"), "w") as f:
+			json.dump(result, f, indent=2)
+	except BaseException as e:
+		shutil.rmtree(upload_dir, ignore_errors=True)
+		if isinstance(e, PoolBusy):
+			raise queue_full(str(e))
+		if isinstance(e, ValueError):
+			raise HTTPException(status_code=400, detail=str(e))
+		if isinstance(e, Exception):
+			# e.g. BrokenProcessPool or TesseractNotFoundError from a worker
+			logger.exception("OCR failed for ingest %s", ingest_id)
+			raise HTTPException(status_code=500, detail=f"OCR failed: {type(e).__name__}: {e}")
+		raise
+	await asyncio.to_thread(upload_cache.store, digest, ingest_id)
 
 	return result
+
+@app.get("/ocr/stats")
+def ocr_stats():
+	return {**ocr_pool.stats(), "cache": upload_cache.stats()}
@@ -0,0 +1,84 @@
+# OCR work units; these run inside pool worker processes, so they take paths and return plain data
+import time
+import pytesseract
+from PIL import Image
+
+def image_blocks(image):
+	"""Words with bounding boxes and confidence from Tesseract."""
+	ocr_data = pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT)
+	blocks = []
+	for i in range(len(ocr_data['text'])):
+		if ocr_data['text'][i].strip():
+			blocks.append({
+				'text': ocr_data['text'][i],
+				'left': ocr_data['left'][i],
+				'top': ocr_data['top'][i],
+				'width': ocr_data['width'][i],
+				'height': ocr_data['height'][i],
+				'conf': ocr_data['conf'][i]
+			})
+	return blocks
+
+def ocr_page(image, page, rasterize_ms=0.0):
+	start = time.perf_counter()
+	blocks = image_blocks(image)
+	return {
+		'page': page,
+		'width': image.width,
+		'height': image.height,
+		'blocks': blocks,
+		'timing_ms': {'rasterize': rasterize_ms, 'ocr': (time.perf_counter() - start) * 1000},
+	}
+
+def ocr_image(file_path):
+	"""OCR a single image file as page 1. Unreadable input raises ValueError."""
+	start = time.perf_counter()
+	try:
+		image = Image.open(file_path)
+		image.load()
+	except Exception as e:
+		raise ValueError(f"Invalid image/PDF: {e}")
+	return ocr_page(image, 1, (time.perf_counter() - start) * 1000)
+
+def pdf_page_count(file_path):
+	try:
+		from pdf2image import pdfinfo_from_path
+		return int(pdfinfo_from_path(file_path)['Pages'])
+	except Exception as e:
+		raise ValueError(f"Invalid image/PDF: {e}")
+
+def ocr_pdf_page(file_path, page, dpi=200):
+	"""Rasterize only `page` (1-based) of a PDF and OCR it; other pages are never decoded here."""
+	from pdf2image import convert_from_path
+	start = time.perf_counter()
+	try:
+		image = convert_from_path(file_path, dpi=dpi, first_page=page, last_page=page, thread_count=1)[0]
+	except Exception as e:
+		raise ValueError(f"Invalid image/PDF (page {page}): {e}")
+	return ocr_page(image, page, (time.perf_counter() - start) * 1000)
+
+def assemble_pages(pages):
+	"""
+	Join per-page results into raw_text plus flat blocks.
+
+	Words are space-separated and pages newline-separated. Every block gets
+	its `page` and the character `offset` of its text in raw_text; every page
+	gets the `offset`/`length` of its span.
+	"""
+	parts, blocks, offset = [], [], 0
+	for n, page in enumerate(sorted(pages, key=lambda p: p['page'])):
+		if n:
+			parts.append("\n")
+			offset += 1
+		page['offset'] = offset
+		for i, block in enumerate(page['blocks']):
+			if i:
+				parts.append(" ")
+				offset += 1
+			block['page'] = page['page']
+			block['offset'] = offset
+			parts.append(block['text'])
+			offset += len(block['text'])
+			blocks.append(block)
+		page['length'] = offset - page['offset']
+	return "".join(parts), blocks
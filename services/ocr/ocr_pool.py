@@ -0,0 +1,118 @@
+# Bounded process pool for CPU-bound OCR with admission control
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+class PoolBusy(Exception):
+	"""Raised when the pool's queue is full; the caller should answer 429."""
+
+class Reservation:
+	"""Job units held by one upload; grows once the upload's job count is known."""
+
+	def __init__(self, pool):
+		self.pool = pool
+		self.jobs = 0
+
+	def grow(self, jobs):
+		"""Reserve `jobs` more job units; raises PoolBusy if they do not fit."""
+		if jobs <= 0:
+			return
+		self.pool.admit(jobs, held=self.jobs)
+		self.pool.pending += jobs
+		self.jobs += jobs
+
+class OCRPool:
+	"""
+	Runs OCR jobs on `workers` processes so Tesseract never blocks the event loop.
+
+	Admission counts OCR jobs, not uploads: at most `workers + max_queue` jobs
+	are reserved at once, and uploads that do not fit raise PoolBusy instead of
+	queueing without bound. An upload reserves one job up front and grows its
+	reservation once it knows how many it needs (e.g. one per PDF page); an
+	upload larger than the whole capacity is only admitted when nothing else is
+	in flight. The executor is created on first use and rebuilt if a worker dies.
+	"""
+
+	def __init__(self, workers=None, max_queue=None):
+		self.workers = workers or os.cpu_count() or 1
+		self.max_queue = 4 * self.workers if max_queue is None else max_queue
+		self._executor = None
+		# Reserved job units across all uploads in flight
+		self.pending = 0
+		self.jobs = 0
+		self.completed = 0
+		self.rejected = 0
+
+	@property
+	def capacity(self):
+		return self.workers + self.max_queue
+
+	def busy(self):
+		return self.pending >= self.capacity
+
+	def admit(self, jobs=1, held=0):
+		"""Raise PoolBusy (and count the rejection) unless `jobs` more job units fit.
+
+		`held` is what the caller already reserves; with no other upload in flight
+		the request is let through even past capacity, so huge PDFs still run.
+		"""
+		others = self.pending - held
+		if others > 0 and self.pending + jobs > self.capacity:
+			self.rejected += 1
+			raise PoolBusy(f"OCR queue full ({self.pending}/{self.capacity} jobs reserved, {jobs} more requested), retry later")
+
+	def _get_executor(self):
+		if self._executor is None:
+			self._executor = ProcessPoolExecutor(max_workers=self.workers)
+		return self._executor
+
+	@asynccontextmanager
+	async def slot(self, jobs=1):
+		"""Reserve `jobs` job units for the block (yields the Reservation); raises PoolBusy if they do not fit."""
+		# `pending` is only touched from the event loop thread, so no lock is needed
+		reservation = Reservation(self)
+		reservation.grow(jobs)
+		try:
+			yield reservation
+		finally:
+			self.pending -= reservation.jobs
+			self.completed += 1
+
+	async def run(self, fn, *args):
+		"""Run one job on the pool (caller should hold a slot)."""
+		executor = self._get_executor()
+		self.jobs += 1
+		try:
+			return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+		except BrokenProcessPool:
+			# A worker crashed (e.g. OOM on a huge scan); start a fresh pool for later jobs
+			if self._executor is executor:
+				self._executor = None
+				executor.shutdown(wait=False)
+			raise
+		finally:
+			self.jobs -= 1
+
+	async def submit(self, fn, *args):
+		"""Admit and run a single-job upload."""
+		async with self.slot():
+			return await self.run(fn, *args)
+
+	def stats(self):
+		return {
+			"workers": self.workers,
+			"max_queue": self.max_queue,
+			"pending": self.pending,
+			"jobs": self.jobs,
+			"running": min(self.jobs, self.workers),
+			"queued": max(0, self.jobs - self.workers),
+			"completed": self.completed,
+			"rejected": self.rejected,
+		}
+
+	def shutdown(self):
+		if self._executor is not None:
+			self._executor.shutdown(wait=False, cancel_futures=True)
+			self._executor = None
@@ -1,6 +1,6 @@
 import os
-import uuid
 import shutil
+import pytest
 from fastapi.testclient import TestClient
 from services.ocr.main import app
 from PIL import Image, ImageDraw
@@ -11,11 +11,30 @@ def create_sample_image(path):
     d.text((10,10), "Paracetamol 500mg", fill=(0,0,0))
     img.save(path)
 
-def test_ocr_upload():
+@pytest.fixture
+def upload_root(tmp_path, monkeypatch):
+    """Point the service's uploads directory and result cache at tmp_path."""
+    from services.ocr import main
+    from upload_cache import UploadCache
+    monkeypatch.setattr(main, "UPLOAD_ROOT", str(tmp_path))
+    monkeypatch.setattr(main, "upload_cache", UploadCache(str(tmp_path), max_bytes=1 << 20))
+    return tmp_path
+
+def fake_ocr_image(path):
+    return {"page": 1, "blocks": [{"text": "Paracetamol", "bbox": [10, 10, 80, 20]}, {"text": "500mg", "bbox": [90, 10, 130, 20]}]}
+
+def test_ocr_upload(upload_root, tmp_path_factory, monkeypatch):
+    from services.ocr import main
+    calls = []
+
+    async def run_inline(fn, *args):
+        calls.append(fn)
+        return fn(*args)
+
+    monkeypatch.setattr(main, "ocr_image", fake_ocr_image)
+    monkeypatch.setattr(main.ocr_pool, "run", run_inline)
     client = TestClient(app)
-    sample_dir = 'data/uploads/test-sample/'
-    os.makedirs(sample_dir, exist_ok=True)
-    img_path = os.path.join(sample_dir, 'sample_rx.png')
+    img_path = tmp_path_factory.mktemp("sample") / "sample_rx.png"
     create_sample_image(img_path)
     with open(img_path, "rb") as f:
         response = client.post("/ocr/upload", files={"file": ("sample_rx.png", f, "image/png")})
@@ -25,6 +44,118 @@ def test_ocr_upload():
     assert 'raw_text' in data and 'Paracetamol' in data['raw_text']
     assert 'blocks' in data and isinstance(data['blocks'], list)
     assert 'timestamp' in data
-    # Cleanup
-    shutil.rmtree(os.path.join('data/uploads', data['ingest_id']), ignore_errors=True)
-    shutil.rmtree(sample_dir, ignore_errors=True)
+    # Same bytes again: served from the result cache without a new OCR run
+    with open(img_path, "rb") as f:
+        again = client.post("/ocr/upload", files={"file": ("sample_rx.png", f, "image/png")}).json()
+    assert again['cached'] and again['cached_from'] == data['ingest_id']
+    # The returned ingest_id is the original one, which still exists on disk
+    assert again['raw_text'] == data['raw_text'] and again['ingest_id'] == data['ingest_id']
+    assert (upload_root / again['ingest_id'] / "ocr_result.json").exists()
+    assert calls == [fake_ocr_image]
+    assert sorted(os.listdir(upload_root)) == sorted([".index", data['ingest_id']])
+
+def test_ocr_upload_too_large(upload_root, monkeypatch):
+    from services.ocr import main
+    monkeypatch.setattr(main, "MAX_UPLOAD_BYTES", 1024)
+    response = TestClient(app).post("/ocr/upload", files={"file": ("big.png", b"x" * 4096, "image/png")})
+    assert response.status_code == 413
+    assert os.listdir(upload_root) == [".index"]
+
+def test_ocr_failure_removes_upload_dir(upload_root, monkeypatch):
+    from concurrent.futures.process import BrokenProcessPool
+    from services.ocr import main
+    client = TestClient(app)
+    for error, status in [(ValueError("not an image"), 400), (BrokenProcessPool("worker died"), 500)]:
+        async def failing_run(fn, *args):
+            raise error
+        monkeypatch.setattr(main.ocr_pool, "run", failing_run)
+        response = client.post("/ocr/upload", files={"file": ("rx.png", b"not really a png", "image/png")})
+        assert response.status_code == status
+        assert os.listdir(upload_root) == [".index"]
+    assert "BrokenProcessPool" in response.json()["detail"]
+
+def test_ocr_pool_backpressure():
+    import asyncio
+    import time
+    from ocr_pool import OCRPool, PoolBusy
+    pool = OCRPool(workers=1, max_queue=1)
+
+    async def run():
+        jobs = [asyncio.ensure_future(pool.submit(time.sleep, 0.3)) for _ in range(2)]
+        await asyncio.sleep(0)
+        assert pool.stats()["running"] == 1 and pool.stats()["queued"] == 1
+        with pytest.raises(PoolBusy):
+            await pool.submit(time.sleep, 0)
+        await asyncio.gather(*jobs)
+
+    try:
+        asyncio.run(run())
+    finally:
+        pool.shutdown()
+    assert pool.stats()["rejected"] == 1 and pool.stats()["completed"] == 2
+
+def test_ocr_pool_counts_pdf_page_jobs():
+    import asyncio
+    from ocr_pool import OCRPool, PoolBusy
+    pool = OCRPool(workers=1, max_queue=2)
+
+    async def run():
+        async with pool.slot() as pdf:
+            pdf.grow(2)  # a 3-page PDF fills the whole capacity
+            assert pool.pending == 3
+            with pytest.raises(PoolBusy, match="jobs reserved"):
+                async with pool.slot():
+                    pass
+        assert pool.pending == 0
+        async with pool.slot() as image:
+            # Pages that no longer fit next to another upload are refused
+            async with pool.slot() as pdf:
+                with pytest.raises(PoolBusy):
+                    pdf.grow(9)
+                assert pdf.jobs == 1 and pool.pending == 2
+        # Alone, an upload may reserve past capacity
+        async with pool.slot(jobs=10):
+            assert pool.pending == 10
+        assert pool.pending == 0
+
+    asyncio.run(run())
+    assert pool.stats()["rejected"] == 2
+
+def test_assemble_pages_offsets():
+    from ocr_engine import assemble_pages
+    pages = [
+        {"page": 2, "blocks": [{"text": "twice"}, {"text": "daily"}]},
+        {"page": 1, "blocks": [{"text": "Paracetamol"}, {"text": "500mg"}]},
+    ]
+    raw_text, blocks = assemble_pages(pages)
+    assert raw_text == "Paracetamol 500mg\ntwice daily"
+    assert [(b["page"], b["offset"]) for b in blocks] == [(1, 0), (1, 12), (2, 18), (2, 24)]
+    assert [(p["page"], p["offset"], p["length"]) for p in pages] == [(2, 18, 11), (1, 0, 17)]
+
+def test_upload_cache_hit_and_eviction(tmp_path):
+    import json
+    from upload_cache import UploadCache, file_digest
+    cache = UploadCache(str(tmp_path), max_bytes=10_000)
+
+    def finish(ingest_id, payload):
+        path = tmp_path / ingest_id
+        path.mkdir()
+        (path / "rx.png").write_bytes(payload)
+        (path / "ocr_result.json").write_text(json.dumps({"ingest_id": ingest_id, "raw_text": ingest_id}))
+        cache.store(file_digest(str(path / "rx.png")), ingest_id)
+        return file_digest(str(path / "rx.png"))
+
+    first = finish("a", b"x" * 4000)
+    assert cache.lookup(first)["ingest_id"] == "a"
+    assert cache.lookup("0" * 64) is None
+    os.utime(tmp_path / "a" / "ocr_result.json", (0, 0))  # make "a" the least recently used
+    finish("b", b"y" * 4000)
+    finish("c", b"z" * 4000)  # over 10 KB: "a" is evicted, its index entry with it
+    assert not (tmp_path / "a").exists() and cache.lookup(first) is None
+    assert (tmp_path / "b").exists() and (tmp_path / "c").exists()
+    assert cache.stats()["evictions"] == 1 and cache.stats()["hits"] == 1
+    # An index entry whose upload directory disappeared is dropped on lookup
+    second = file_digest(str(tmp_path / "b" / "rx.png"))
+    shutil.rmtree(tmp_path / "b")
+    assert cache.lookup(second) is None
+    assert not (tmp_path / ".index" / second).exists()
@@ -0,0 +1,150 @@
+# Content-addressed OCR result cache over the uploads directory, with size-bounded LRU eviction
+import hashlib
+import json
+import os
+import shutil
+import time
+
+RESULT_FILE = "ocr_result.json"
+DIGEST_FILE = ".sha256"
+INDEX_DIR = ".index"
+# Upload directories without a result yet are in flight; leave them alone this long
+IN_FLIGHT_GRACE_S = 3600
+
+def file_digest(path, chunk_size=1 << 20):
+	digest = hashlib.sha256()
+	with open(path, "rb") as f:
+		for block in iter(lambda: f.read(chunk_size), b""):
+			digest.update(block)
+	return digest.hexdigest()
+
+def _atomic_write(path, text):
+	tmp = f"{path}.{os.getpid()}.tmp"
+	with open(tmp, "w") as f:
+		f.write(text)
+	os.replace(tmp, path)
+
+class UploadCache:
+	"""
+	Maps sha256(upload bytes) -> ingest directory under `root`.
+
+	Layout stays data/uploads/<ingest_id>/{<file>, ocr_result.json}; each
+	directory also records its digest in `.sha256`, and `.index/<digest>`
+	holds the ingest_id, so lookups are a single file read and survive
+	restarts. Reading a cached result touches it, and `evict()` removes the
+	least recently used directories until the tree fits in `max_bytes`.
+	"""
+
+	def __init__(self, root, max_bytes):
+		self.root = root
+		self.max_bytes = max_bytes
+		self.index_dir = os.path.join(root, INDEX_DIR)
+		os.makedirs(self.index_dir, exist_ok=True)
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+
+	def _index_path(self, digest):
+		return os.path.join(self.index_dir, digest)
+
+	def lookup(self, digest):
+		"""Cached OCR result for these bytes, or None."""
+		try:
+			with open(self._index_path(digest)) as f:
+				ingest_id = f.read().strip()
+			result_path = os.path.join(self.root, ingest_id, RESULT_FILE)
+			try:
+				with open(result_path) as f:
+					result = json.load(f)
+			except FileNotFoundError:
+				# The upload directory was removed behind the index's back; drop the dangling entry
+				os.remove(self._index_path(digest))
+				raise
+			os.utime(result_path)
+		except (OSError, ValueError):
+			self.misses += 1
+			return None
+		self.hits += 1
+		return result
+
+	def store(self, digest, ingest_id):
+		"""Record a finished upload (its ocr_result.json must exist), then enforce the size bound."""
+		_atomic_write(os.path.join(self.root, ingest_id, DIGEST_FILE), digest)
+		_atomic_write(self._index_path(digest), ingest_id)
+		self.evict(keep=ingest_id)
+
+	def _entries(self):
+		# (last used, size, ingest_id, has result) per upload directory
+		entries = []
+		now = time.time()
+		for ingest_id in os.listdir(self.root):
+			path = os.path.join(self.root, ingest_id)
+			if ingest_id == INDEX_DIR or not os.path.isdir(path):
+				continue
+			size, last_used = 0, os.path.getmtime(path)
+			for dirpath, _, files in os.walk(path):
+				for name in files:
+					try:
+						stat = os.stat(os.path.join(dirpath, name))
+					except OSError:
+						continue
+					size += stat.st_size
+					last_used = max(last_used, stat.st_mtime)
+			has_result = os.path.exists(os.path.join(path, RESULT_FILE))
+			if has_result or now - last_used > IN_FLIGHT_GRACE_S:
+				entries.append((last_used, size, ingest_id))
+		return entries
+
+	def evict(self, keep=None):
+		entries = sorted(self._entries())
+		total = sum(size for _, size, _ in entries)
+		for _, size, ingest_id in entries:
+			if total <= self.max_bytes:
+				break
+			if ingest_id == keep:
+				continue
+			self._remove(ingest_id)
+			total -= size
+			self.evictions += 1
+		return total
+
+	def _remove(self, ingest_id):
+		path = os.path.join(self.root, ingest_id)
+		try:
+			with open(os.path.join(path, DIGEST_FILE)) as f:
+				digest = f.read().strip()
+			with open(self._index_path(digest)) as f:
+				if f.read().strip() == ingest_id:
+					os.remove(self._index_path(digest))
+		except OSError:
+			pass
+		shutil.rmtree(path, ignore_errors=True)
+
+	def backfill(self):
+		"""Index finished uploads written before the cache existed (hashing their upload file)."""
+		indexed = 0
+		for ingest_id in os.listdir(self.root):
+			path = os.path.join(self.root, ingest_id)
+			if ingest_id == INDEX_DIR or not os.path.isdir(path):
+				continue
+			if os.path.exists(os.path.join(path, DIGEST_FILE)) or not os.path.exists(os.path.join(path, RESULT_FILE)):
+				continue
+			uploads = [n for n in os.listdir(path) if n not in (RESULT_FILE, DIGEST_FILE)]
+			if len(uploads) != 1:
+				continue
+			digest = file_digest(os.path.join(path, uploads[0]))
+			_atomic_write(os.path.join(path, DIGEST_FILE), digest)
+			if not os.path.exists(self._index_path(digest)):
+				_atomic_write(self._index_path(digest), ingest_id)
+				indexed += 1
+		return indexed
+
+	def stats(self):
+		lookups = self.hits + self.misses
+		return {
+			"hits": self.hits,
+			"misses": self.misses,
+			"hit_rate": self.hits / lookups if lookups else 0.0,
+			"evictions": self.evictions,
+			"max_bytes": self.max_bytes,
+		}
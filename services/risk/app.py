@@ -1,5 +1,19 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from .router_risk import router as risk_router
+from .services.http_pool import get_http_pool
+from .config_store import get_config_store
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Parse and validate the risk config once at startup rather than per request
+    get_config_store().get()
+    yield
+    # Release pooled upstream connections on shutdown
+    await get_http_pool().aclose()
+
 
-app = FastAPI(title="suRxit Clinical-Risk Engine")
+app = FastAPI(title="suRxit Clinical-Risk Engine", lifespan=lifespan)
 app.include_router(risk_router)
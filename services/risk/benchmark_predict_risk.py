@@ -0,0 +1,186 @@
+"""
+Benchmark /predict/risk latency against local stub upstreams.
+
+Runs the Risk-Engine in-process and points every service client at a stub
+FastAPI app served by uvicorn on localhost, then reports p50/p99 latency with
+one short-lived HTTP client per call ("before") and with the shared keep-alive
+pool ("after").
+
+With --evidence it instead compares evidence-path retrieval: one pair at a
+time ("seq", the old loop), bounded concurrent fan-out ("fanout") and the KG
+batch endpoint ("batch"), with each stub evidence call taking --evidence-ms.
+--upstream-ms adds latency to every stub call, which shows stages overlapping
+in the dependency graph (the total tracks the critical path, not the sum).
+The per-prescription result cache is off unless --cache is given, since every
+request re-submits the same prescription.
+
+Usage (from the repo root):
+    python -m services.risk.benchmark_predict_risk --requests 200 --drugs 10
+    python -m services.risk.benchmark_predict_risk --evidence --evidence-ms 5 --drugs 10
+    python -m services.risk.benchmark_predict_risk --upstream-ms 20 --requests 20
+    python -m services.risk.benchmark_predict_risk --upstream-ms 20 --requests 20 --cache
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import threading
+import time
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+STUB_PORT = _free_port()
+STUB_URL = f"http://127.0.0.1:{STUB_PORT}"
+for _var in ("KG_URL", "FEATUREGEN_URL", "GNN_DDI_URL", "RECOMMENDER_URL", "NER_URL", "STANDARDIZER_URL"):
+    os.environ[_var] = STUB_URL
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+
+from services.risk import router_risk
+from services.risk.app import app
+from services.risk.router_risk import oauth2_scheme
+from services.risk.result_cache import ResultCache, get_result_cache, set_result_cache
+from services.risk.services.http_pool import HTTPClientPool, set_http_pool
+
+stub = FastAPI()
+EVIDENCE_DELAY_S = 0.0
+UPSTREAM_DELAY_S = 0.0
+
+
+@stub.middleware("http")
+async def upstream_latency(request, call_next):
+    await asyncio.sleep(UPSTREAM_DELAY_S)
+    return await call_next(request)
+
+
+@stub.get("/patient/history")
+async def stub_history(patient_id: str):
+    return {"allergies": [], "conditions": []}
+
+
+@stub.get("/features")
+async def stub_features(patient_id: str, drug_id: str):
+    return {"features": [0.1, 0.2]}
+
+
+@stub.get("/adr")
+async def stub_adr(patient_id: str, drug_id: str):
+    return {"risk": 0.1}
+
+
+@stub.get("/evidence-paths")
+async def stub_evidence(drug1_id: str, drug2_id: str):
+    await asyncio.sleep(EVIDENCE_DELAY_S)
+    return [[drug1_id, "CYP3A4", drug2_id]]
+
+
+@stub.post("/evidence-paths/batch")
+async def stub_evidence_batch(body: dict):
+    await asyncio.sleep(EVIDENCE_DELAY_S)
+    return {"paths": [[[a, "CYP3A4", b]] for a, b in body["pairs"]]}
+
+
+@stub.post("/predict")
+async def stub_ddi(body: dict):
+    return {"risk": 0.4}
+
+
+@stub.post("/predict/batch")
+async def stub_ddi_batch(body: dict):
+    n = len(body["drugs"])
+    return {"drugs": body["drugs"], "probabilities": [[0.4] * n for _ in range(n)], "missing": []}
+
+
+@stub.post("/recommend")
+async def stub_recommend(body: dict):
+    return [{"drug_id": "alt1"}]
+
+
+def start_stub_server():
+    config = uvicorn.Config(stub, host="127.0.0.1", port=STUB_PORT, log_level="warning")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+async def run(label, pool, n_requests, n_drugs, warmup):
+    set_http_pool(pool)
+    payload = {
+        "patient_id": "bench-patient",
+        "prescription": [{"drug_id": f"D{i:03d}", "name": f"Drug{i}"} for i in range(n_drugs)],
+    }
+    transport = httpx.ASGITransport(app=app)
+    latencies, evidence = [], []
+    async with httpx.AsyncClient(transport=transport, base_url="http://risk") as client:
+        for i in range(warmup + n_requests):
+            start = time.perf_counter()
+            resp = await client.post("/predict/risk", json=payload)
+            elapsed = (time.perf_counter() - start) * 1000
+            resp.raise_for_status()
+            if i >= warmup:
+                latencies.append(elapsed)
+                timings = dict(e.split(";dur=") for e in resp.headers["server-timing"].split(", "))
+                evidence.append(float(timings.get("evidence", 0)))
+                critical_path = resp.headers.get("x-critical-path", "cache")
+    await pool.aclose()
+    print(
+        f"{label:<8} p50={percentile(latencies, 50):8.2f} ms  "
+        f"p99={percentile(latencies, 99):8.2f} ms  "
+        f"mean={statistics.mean(latencies):8.2f} ms  "
+        f"evidence stage mean={statistics.mean(evidence):8.2f} ms  "
+        f"critical path: {critical_path}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--drugs", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--evidence", action="store_true", help="Compare evidence-path retrieval strategies")
+    parser.add_argument("--evidence-ms", type=float, default=0.0, help="Stub latency per evidence call")
+    parser.add_argument("--cache", action="store_true", help="Keep the result cache on (repeats become hits)")
+    parser.add_argument("--upstream-ms", type=float, default=0.0, help="Stub latency added to every upstream call")
+    args = parser.parse_args()
+
+    global EVIDENCE_DELAY_S, UPSTREAM_DELAY_S
+    EVIDENCE_DELAY_S = args.evidence_ms / 1000
+    UPSTREAM_DELAY_S = args.upstream_ms / 1000
+
+    app.dependency_overrides[oauth2_scheme] = lambda: "bench-token"
+    if not args.cache:
+        set_result_cache(ResultCache(ttl=0))
+    server = start_stub_server()
+    print(f"/predict/risk, {args.drugs} drugs, {args.requests} requests")
+    if args.evidence:
+        fanout = router_risk.EVIDENCE_CONCURRENCY
+        for label, concurrency, batch in (("seq", 1, False), ("fanout", fanout, False), ("batch", fanout, True)):
+            router_risk.EVIDENCE_CONCURRENCY, router_risk.EVIDENCE_BATCH = concurrency, batch
+            asyncio.run(run(label, HTTPClientPool(), args.requests, args.drugs, args.warmup))
+    else:
+        asyncio.run(run("before", HTTPClientPool(pooled=False), args.requests, args.drugs, args.warmup))
+        asyncio.run(run("after", HTTPClientPool(), args.requests, args.drugs, args.warmup))
+    if args.cache:
+        print("result cache:", get_result_cache().stats())
+    server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
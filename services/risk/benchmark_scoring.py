@@ -0,0 +1,80 @@
+"""
+Micro-benchmark for the risk scoring step of /predict/risk.
+
+Times the previous per-drug scan over every DDI pair ("loop", O(n³)) against
+the vectorized `scoring.score_prescription` ("numpy") on synthetic
+prescriptions, including building the per-pair DDI summary both ways.
+
+Usage (from the repo root):
+    python -m services.risk.benchmark_scoring --drugs 5 50 500
+"""
+import argparse
+import random
+import time
+
+from services.risk.scoring import score_prescription
+
+
+def synthetic(n_drugs, seed=0):
+    rng = random.Random(seed)
+    drug_ids = [f"D{i:04d}" for i in range(n_drugs)]
+    probs = [[rng.random() for _ in drug_ids] for _ in drug_ids]
+    ddi_matrix = {"drugs": drug_ids, "probabilities": probs, "missing": []}
+    adr = [rng.random() for _ in drug_ids]
+    return drug_ids, ddi_matrix, adr
+
+
+def score_loop(drug_ids, ddi_matrix, adr_risks, weights):
+    # The scoring loop predict_risk used before scoring.py
+    prescription = [{"drug_id": d} for d in drug_ids]
+    row = {drug_id: i for i, drug_id in enumerate(ddi_matrix["drugs"])}
+    probs = ddi_matrix["probabilities"]
+    ddi_pairs = [(prescription[i], prescription[j]) for i in range(len(prescription)) for j in range(i + 1, len(prescription))]
+    ddi_results = []
+    for a, b in ddi_pairs:
+        i, j = row.get(a['drug_id']), row.get(b['drug_id'])
+        risk = probs[i][j] if i is not None and j is not None else 0.0
+        ddi_results.append({"drug1_id": a['drug_id'], "drug2_id": b['drug_id'], "risk": risk})
+    risk_score = 0.0
+    contributors = []
+    for drug, adr_risk in zip(prescription, adr_risks):
+        ddi_risk = 0.0
+        for pair, ddi in zip(ddi_pairs, ddi_results):
+            if drug['drug_id'] in [pair[0]['drug_id'], pair[1]['drug_id']]:
+                ddi_risk += ddi.get('risk', 0)
+        score = weights.get('ddi_weight', 0.5) * ddi_risk + weights.get('adr_weight', 0.5) * adr_risk
+        risk_score += score
+        contributors.append({"drug_id": drug['drug_id'], "ddi": ddi_risk, "adr": adr_risk, "score": score})
+    return {"risk_score": min(1.0, risk_score / max(1, len(prescription))), "contributors": contributors, "ddi_summary": ddi_results}
+
+
+def best_of(fn, args, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn(*args)
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--drugs", type=int, nargs="+", default=[5, 50, 500])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--loop-max", type=int, default=500, help="Skip the O(n³) loop above this many drugs")
+    args = parser.parse_args()
+
+    weights = {"ddi_weight": 0.5, "adr_weight": 0.5}
+    for n in args.drugs:
+        inputs = (*synthetic(n), weights)
+        numpy_ms, scored = best_of(score_prescription, inputs, args.repeats)
+        line = f"{n:>4} drugs: numpy={numpy_ms:10.2f} ms"
+        if n <= args.loop_max:
+            loop_ms, expected = best_of(score_loop, inputs, 1 if n > 100 else args.repeats)
+            drift = abs(scored["risk_score"] - expected["risk_score"])
+            line += f"  loop={loop_ms:10.2f} ms  speedup={loop_ms / numpy_ms:8.1f}x  |Δscore|={drift:.1e}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+# In-memory risk weights/thresholds with mtime-based hot reload
+#
+# risk_weights.yaml and risk_thresholds.yaml are parsed once and kept as an
+# immutable RiskConfig. get() re-stats the files (cheap) and reloads only when
+# one changed; an invalid edit is logged and the last good config stays live.
+# update() validates, writes both files and swaps the reference in one step,
+# so a request always scores with one consistent weights/thresholds pair.
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+
+import yaml
+
+logger = logging.getLogger(__name__)
+
+CONFIG_DIR = os.getenv("RISK_CONFIG_DIR", os.path.join(os.path.dirname(__file__), "config"))
+WEIGHTS_FILE = "risk_weights.yaml"
+THRESHOLDS_FILE = "risk_thresholds.yaml"
+THRESHOLD_LEVELS = ("low", "moderate", "high", "critical")
+
+
+@dataclass(frozen=True)
+class RiskConfig:
+    weights: dict
+    thresholds: dict
+    version: str
+    loaded_at: float = field(default_factory=time.time)
+
+    def as_dict(self):
+        return {"weights": self.weights, "thresholds": self.thresholds, "version": self.version, "loaded_at": self.loaded_at}
+
+
+def _number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def validate_config(weights, thresholds):
+    """Raise ValueError unless weights are non-negative numbers and thresholds ascend within [0, 1]."""
+    if not isinstance(weights, dict) or not isinstance(thresholds, dict):
+        raise ValueError("weights and thresholds must be mappings")
+    for key, value in weights.items():
+        if not _number(value) or value < 0:
+            raise ValueError(f"weight {key!r} must be a non-negative number")
+    previous = None
+    for level in THRESHOLD_LEVELS:
+        value = thresholds.get(level)
+        if value is None:
+            continue
+        if not _number(value) or not 0 <= value <= 1:
+            raise ValueError(f"threshold {level!r} must be a number in [0, 1]")
+        if previous is not None and value < previous:
+            raise ValueError(f"thresholds must ascend ({' <= '.join(THRESHOLD_LEVELS)})")
+        previous = value
+
+
+def config_version(weights, thresholds):
+    """Content hash, so identical configs share a version across restarts and replicas."""
+    canonical = json.dumps({"weights": weights, "thresholds": thresholds}, sort_keys=True)
+    return hashlib.sha256(canonical.encode()).hexdigest()[:12]
+
+
+def _atomic_write_yaml(path, data):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        yaml.safe_dump(data, f, sort_keys=False)
+    os.replace(tmp, path)
+
+
+class ConfigStore:
+    def __init__(self, config_dir=CONFIG_DIR):
+        self.config_dir = config_dir
+        self.paths = (os.path.join(config_dir, WEIGHTS_FILE), os.path.join(config_dir, THRESHOLDS_FILE))
+        self._config = None
+        self._stamp = None
+        self._lock = threading.Lock()
+        self.reloads = 0
+
+    def _file_stamp(self):
+        return tuple((s.st_mtime_ns, s.st_size) for s in map(os.stat, self.paths))
+
+    def _read(self):
+        loaded = []
+        for path in self.paths:
+            with open(path) as f:
+                loaded.append(yaml.safe_load(f) or {})
+        weights, thresholds = loaded
+        validate_config(weights, thresholds)
+        return RiskConfig(weights, thresholds, config_version(weights, thresholds))
+
+    def get(self):
+        """Current config, reloaded first if either file changed on disk."""
+        config = self._config
+        try:
+            stamp = self._file_stamp()
+        except OSError:
+            if config is None:
+                raise
+            return config
+        if config is not None and stamp == self._stamp:
+            return config
+        with self._lock:
+            if self._config is not None and stamp == self._stamp:
+                return self._config
+            try:
+                fresh = self._read()
+            except (OSError, ValueError, yaml.YAMLError) as e:
+                if self._config is None:
+                    raise
+                logger.warning("Keeping risk config %s; reload failed: %s", self._config.version, e)
+                self._stamp = stamp
+                return self._config
+            self._config, self._stamp = fresh, stamp
+            self.reloads += 1
+            return fresh
+
+    def update(self, weights=None, thresholds=None):
+        """Validate and persist a new config (omitted parts keep their current value), then swap it in."""
+        with self._lock:
+            current = self._config or self._read()
+            weights = current.weights if weights is None else weights
+            thresholds = current.thresholds if thresholds is None else thresholds
+            validate_config(weights, thresholds)
+            _atomic_write_yaml(self.paths[0], weights)
+            _atomic_write_yaml(self.paths[1], thresholds)
+            self._config = RiskConfig(weights, thresholds, config_version(weights, thresholds))
+            self._stamp = self._file_stamp()
+            return self._config
+
+
+_store = ConfigStore()
+
+
+def get_config_store():
+    return _store
+
+
+def set_config_store(store):
+    global _store
+    _store = store
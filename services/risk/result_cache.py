@@ -0,0 +1,133 @@
+# Per-prescription /predict/risk result cache
+#
+# Keyed by sha256 of (patient id, the prescription's (drug id, name) pairs in
+# order, risk config version): the response echoes drug names and follows
+# prescription order, so only an identical submission may reuse it, and a
+# config change makes old entries unreachable. Each entry also remembers a
+# fingerprint of the patient history it was computed from; the history is
+# re-fetched on every request (one cheap KG call) and a mismatch is treated as
+# a miss, so allergy/condition changes are never served stale. Entries expire
+# after a TTL and the least recently used are evicted past max_entries.
+import copy
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+DEFAULT_TTL = float(os.getenv("RISK_RESULT_CACHE_TTL", "300"))
+DEFAULT_MAX_ENTRIES = int(os.getenv("RISK_RESULT_CACHE_SIZE", "1024"))
+
+
+def prescription_key(patient_id, prescription, config_version):
+    drugs = [(d.get('drug_id'), d.get('name')) for d in prescription]
+    canonical = json.dumps([patient_id, drugs, config_version])
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def history_fingerprint(history):
+    return hashlib.sha256(json.dumps(history, sort_keys=True, default=str).encode()).hexdigest()
+
+
+@dataclass
+class CacheEntry:
+    patient_id: str
+    config_version: str
+    history: str
+    result: dict
+    expires: float
+
+
+class ResultCache:
+    def __init__(self, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        # Only touched from the event loop thread, so no lock is needed
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.expired = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self):
+        return self.ttl > 0 and self.max_entries > 0
+
+    def candidate(self, key):
+        """Unexpired entry for this key (not yet checked against the current history), else None."""
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires <= time.monotonic():
+            del self._entries[key]
+            self.expired += 1
+            entry = None
+        if entry is None:
+            self.misses += 1
+        return entry
+
+    def confirm(self, key, entry, history):
+        """A copy of the candidate's result if it was computed from this same patient history, else None."""
+        if entry.history != history_fingerprint(history):
+            # The patient's history changed since this result was computed
+            self._entries.pop(key, None)
+            self.stale += 1
+            self.misses += 1
+            return None
+        if key in self._entries:
+            self._entries.move_to_end(key)
+        self.hits += 1
+        # Callers get their own copy; the cached result must not be mutated
+        return copy.deepcopy(entry.result)
+
+    def put(self, key, patient_id, config_version, history, result):
+        if not self.enabled:
+            return
+        # A new config version makes older entries unreachable; drop them now
+        outdated = [k for k, e in self._entries.items() if e.config_version != config_version]
+        for k in outdated:
+            del self._entries[k]
+        self._entries[key] = CacheEntry(patient_id, config_version, history_fingerprint(history), result, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate_patient(self, patient_id):
+        keys = [k for k, e in self._entries.items() if e.patient_id == patient_id]
+        for k in keys:
+            del self._entries[k]
+        self.invalidations += len(keys)
+        return len(keys)
+
+    def clear(self):
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "stale": self.stale,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "ttl": self.ttl,
+            "max_entries": self.max_entries,
+        }
+
+
+_cache = ResultCache()
+
+
+def get_result_cache():
+    return _cache
+
+
+def set_result_cache(cache):
+    global _cache
+    _cache = cache
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from fastapi.security import OAuth2PasswordBearer
 
 from .services.dfi_client import DFIClient
@@ -9,96 +9,180 @@ from .services.recommender_client import RecommenderClient
 from .services.kg_client import KGClient
 from .services.ner_client import NERClient
 from .services.standardizer_client import StandardizerClient
+from .services.http_pool import get_http_pool
 from .models.audit import log_audit
-import yaml
-import os
+from .scoring import score_prescription
+from .config_store import get_config_store
+from .timing import StageTimer
+from .stage_graph import Stage, StageGraph, StageTimeout, stage_deadline
+from .result_cache import get_result_cache, prescription_key
 import asyncio
+import os
 
 router = APIRouter()
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+# Evidence-path lookups in flight per request, and whether to try the KG batch endpoint first
+EVIDENCE_CONCURRENCY = int(os.getenv("RISK_EVIDENCE_CONCURRENCY", "8"))
+EVIDENCE_BATCH = os.getenv("RISK_EVIDENCE_BATCH", "0").lower() in ("1", "true", "yes")
+
+
+async def fetch_evidence_paths(kg, drug_id_pairs, concurrency=None, batch=None):
+    """Evidence paths per (drug1_id, drug2_id) pair, in pair order."""
+    concurrency = EVIDENCE_CONCURRENCY if concurrency is None else concurrency
+    batch = EVIDENCE_BATCH if batch is None else batch
+    if not drug_id_pairs:
+        return []
+    if batch:
+        paths = await kg.get_evidence_paths_batch(drug_id_pairs)
+        if paths is not None:
+            return paths
+    # Per-pair lookups, at most `concurrency` at a time
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def lookup(drug1_id, drug2_id):
+        async with semaphore:
+            return await kg.get_evidence_paths(drug1_id, drug2_id)
+
+    return await asyncio.gather(*(lookup(a, b) for a, b in drug_id_pairs))
 
-def load_config():
-    with open(os.path.join(os.path.dirname(__file__), 'config/risk_weights.yaml')) as f:
-        weights = yaml.safe_load(f)
-    with open(os.path.join(os.path.dirname(__file__), 'config/risk_thresholds.yaml')) as f:
-        thresholds = yaml.safe_load(f)
-    return weights, thresholds
 
 @router.post("/predict/risk")
-async def predict_risk(request: dict, token: str = Depends(oauth2_scheme)):
+async def predict_risk(request: dict, response: Response, token: str = Depends(oauth2_scheme)):
     # --- 1. Aggregate Inputs ---
     patient_id = request.get('patient_id')
     prescription = request.get('prescription', [])
-    # Init clients
-    kg = KGClient()
-    featuregen = FeatureGenClient()
-    gnn_ddi = GNNDdiClient()
+    # Init clients (sharing the process-wide keep-alive pool)
+    pool = get_http_pool()
+    kg = KGClient(http_client=pool.client("kg"))
+    featuregen = FeatureGenClient(http_client=pool.client("featuregen"))
+    gnn_ddi = GNNDdiClient(http_client=pool.client("gnn_ddi"))
     dfi = DFIClient()
     medlm = MedLMClient()
-    recommender = RecommenderClient()
-    standardizer = StandardizerClient()
+    recommender = RecommenderClient(http_client=pool.client("recommender"))
+    standardizer = StandardizerClient(http_client=pool.client("standardizer"))
+    # In-memory config; reloaded only when the YAML files change
+    config = get_config_store().get()
+    weights, thresholds = config.weights, config.thresholds
+    drug_ids = [d['drug_id'] for d in prescription]
+    ddi_pairs = []
+    for i in range(len(prescription)):
+        for j in range(i+1, len(prescription)):
+            ddi_pairs.append((prescription[i], prescription[j]))
 
+    # Re-submitted prescriptions are answered from the result cache. Only a
+    # potential hit fetches the history up front (to check it is unchanged);
+    # a plain miss fetches it inside the graph, in parallel with other stages.
+    timer = StageTimer()
+    cache = get_result_cache()
+    cache_key = prescription_key(patient_id, prescription, config.version)
+    prefetched_history = None
+    entry = cache.candidate(cache_key) if cache.enabled else None
+    if entry is not None:
+        with timer.stage("cache"):
+            try:
+                prefetched_history = await asyncio.wait_for(kg.get_patient_history(patient_id), stage_deadline("history"))
+            except asyncio.TimeoutError:
+                raise HTTPException(status_code=504, detail=str(StageTimeout("history", stage_deadline("history"))))
+            cached = cache.confirm(cache_key, entry, prefetched_history)
+        if cached is not None:
+            log_audit({
+                "patient_id": patient_id,
+                "prescription": prescription,
+                **{k: v for k, v in cached.items() if k != "ddi_summary"},
+                "critical_path": ["cache"],
+                "cache": "HIT"
+            })
+            response.headers["X-Cache"] = "HIT"
+            response.headers["Server-Timing"] = timer.server_timing()
+            return cached
+
+    # Stages run as a dependency graph: each starts once its inputs are ready,
+    # so e.g. DFI, remedies and evidence lookups overlap with DDI scoring.
     # a. Patient history (allergies, conditions)
-    patient_history = await kg.get_patient_history(patient_id)
-    allergies = set(patient_history.get('allergies', []))
-    conditions = set(patient_history.get('conditions', []))
+    async def history_stage(inputs):
+        if prefetched_history is not None:
+            return prefetched_history
+        return await kg.get_patient_history(patient_id)
 
     # b. KG-feature-vector for each drug
-    feature_tasks = [featuregen.get_features(patient_id, d['drug_id']) for d in prescription]
-    features = await asyncio.gather(*feature_tasks)
+    async def features_stage(inputs):
+        return await asyncio.gather(*(featuregen.get_features(patient_id, drug_id) for drug_id in drug_ids))
 
-    # c. DDI for each pair
-    ddi_tasks = []
-    ddi_pairs = []
-    for i in range(len(prescription)):
-        for j in range(i+1, len(prescription)):
-            ddi_tasks.append(gnn_ddi.get_ddi(prescription[i]['drug_id'], prescription[j]['drug_id']))
-            ddi_pairs.append((prescription[i], prescription[j]))
-    ddi_results = await asyncio.gather(*ddi_tasks) if ddi_tasks else []
+    # c. DDI for each pair (one batched call for the whole prescription)
+    async def ddi_stage(inputs):
+        return await gnn_ddi.get_ddi_matrix(drug_ids) if ddi_pairs else {}
 
     # d. ADR flags
-    adr_tasks = [kg.get_adr_flags(patient_id, d['drug_id']) for d in prescription]
-    adr_results = await asyncio.gather(*adr_tasks)
+    async def adr_stage(inputs):
+        return await asyncio.gather(*(kg.get_adr_flags(patient_id, drug_id) for drug_id in drug_ids))
 
     # e. DFI for each drug
-    dfi_tasks = [dfi.get_dfi(d['drug_id']) for d in prescription]
-    dfi_results = await asyncio.gather(*dfi_tasks)
+    async def dfi_stage(inputs):
+        return await asyncio.gather(*(dfi.get_dfi(drug_id) for drug_id in drug_ids))
 
     # f. Home-remedy suggestions
-    remedy_tasks = [medlm.get_home_remedies(d['name']) for d in prescription]
-    remedy_results = await asyncio.gather(*remedy_tasks)
-
-    # --- 2. Risk Scoring Engine ---
-    weights, thresholds = load_config()
-    # Example: sum normalized DDI/ADR risk (stub logic)
-    risk_score = 0.0
-    contributors = []
-    for i, (drug, feat, adr) in enumerate(zip(prescription, features, adr_results)):
-        ddi_risk = 0.0
-        for j, (pair, ddi) in enumerate(zip(ddi_pairs, ddi_results)):
-            if drug['drug_id'] in [pair[0]['drug_id'], pair[1]['drug_id']]:
-                ddi_risk += ddi.get('risk', 0)
-        adr_risk = adr.get('risk', 0)
-        score = weights.get('ddi_weight', 0.5) * ddi_risk + weights.get('adr_weight', 0.5) * adr_risk
-        risk_score += score
-        contributors.append({"drug_id": drug['drug_id'], "ddi": ddi_risk, "adr": adr_risk, "score": score})
-
-    # Normalize risk_score
-    risk_score = min(1.0, risk_score / max(1, len(prescription)))
-
-    # --- 3. Risk Classification ---
-    if any(a in allergies for a in [d['drug_id'] for d in prescription]):
-        level = 'CRITICAL'
-    elif risk_score >= thresholds.get('critical', 0.9):
-        level = 'CRITICAL'
-    elif risk_score >= thresholds.get('high', 0.7):
-        level = 'HIGH'
-    elif risk_score >= thresholds.get('moderate', 0.3):
-        level = 'MODERATE'
-    else:
-        level = 'LOW'
+    async def remedies_stage(inputs):
+        return await asyncio.gather(*(medlm.get_home_remedies(d['name']) for d in prescription))
+
+    # --- 2. Risk Scoring Engine + 3. Risk Classification ---
+    async def scoring_stage(inputs):
+        # Weighted DDI/ADR contributions per drug, vectorized over the pair matrix
+        scored = score_prescription(drug_ids, inputs['ddi'], [adr.get('risk', 0) for adr in inputs['adr']], weights)
+        risk_score = scored['risk_score']
+        allergies = set(inputs['history'].get('allergies', []))
+        if any(a in allergies for a in drug_ids):
+            level = 'CRITICAL'
+        elif risk_score >= thresholds.get('critical', 0.9):
+            level = 'CRITICAL'
+        elif risk_score >= thresholds.get('high', 0.7):
+            level = 'HIGH'
+        elif risk_score >= thresholds.get('moderate', 0.3):
+            level = 'MODERATE'
+        else:
+            level = 'LOW'
+        return {**scored, "level": level}
+
+    # --- 6. Recommendations ---
+    async def recommendations_stage(inputs):
+        recommendations = []
+        if inputs['scoring']['level'] in ('HIGH', 'CRITICAL'):
+            rec_results = await asyncio.gather(*(recommender.get_alternatives(drug_id, inputs['history']) for drug_id in drug_ids))
+            for recs in rec_results:
+                recommendations.extend(recs[:3])
+        return recommendations
+
+    # --- 7. Explainability & Evidence ---
+    # Pairs are looked up concurrently (bounded), or in one KG batch call if enabled
+    async def evidence_stage(inputs):
+        pair_paths = await fetch_evidence_paths(kg, [(a['drug_id'], b['drug_id']) for a, b in ddi_pairs])
+        return [path for paths in pair_paths for path in paths[:3]]
+
+    # Stages needed for a correct risk level fail the request on timeout;
+    # advisory ones degrade to empty results and are listed in degraded_stages.
+    graph = StageGraph([
+        Stage("history", history_stage),
+        Stage("features", features_stage, fallback=[]),
+        Stage("ddi", ddi_stage),
+        Stage("adr", adr_stage),
+        Stage("dfi", dfi_stage, fallback=[[] for _ in prescription]),
+        Stage("remedies", remedies_stage, fallback=[[] for _ in prescription]),
+        Stage("scoring", scoring_stage, deps=("history", "ddi", "adr")),
+        Stage("recommendations", recommendations_stage, deps=("history", "scoring"), fallback=[]),
+        Stage("evidence", evidence_stage, fallback=[]),
+    ])
+    try:
+        results, trace = await graph.run(timer)
+    except StageTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    scored = results['scoring']
+    risk_score, level = scored['risk_score'], scored['level']
+    contributors = scored['contributors']
+    ddi_results = scored['ddi_summary']
+    dfi_results, remedy_results = results['dfi'], results['remedies']
+    recommendations, evidence_paths = results['recommendations'], results['evidence']
+    degraded_stages = [name for name, stage in trace['stages'].items() if stage['status'] == 'degraded']
 
     # --- 4. DFI Caution Module ---
     dfi_cautions = []
@@ -126,20 +210,6 @@ async def predict_risk(request: dict, token: str = Depends(oauth2_scheme)):
                 "confidence": r.get('confidence', 1.0)
             })
 
-    # --- 6. Recommendations ---
-    recommendations = []
-    if level in ('HIGH', 'CRITICAL'):
-        rec_tasks = [recommender.get_alternatives(d['drug_id'], patient_history) for d in prescription]
-        rec_results = await asyncio.gather(*rec_tasks)
-        for recs in rec_results:
-            recommendations.extend(recs[:3])
-
-    # --- 7. Explainability & Evidence ---
-    evidence_paths = []
-    for pair in ddi_pairs:
-        paths = await kg.get_evidence_paths(pair[0]['drug_id'], pair[1]['drug_id'])
-        evidence_paths.extend(paths[:3])
-
     # --- 8. Alert Trigger ---
     if level in ('HIGH', 'CRITICAL') or dfi_flag:
         # TODO: emit RISK_ALERT event (Kafka/Redis pub-sub)
@@ -155,10 +225,17 @@ async def predict_risk(request: dict, token: str = Depends(oauth2_scheme)):
         "home_remedies": home_remedies,
         "recommendations": recommendations,
         "evidence_paths": evidence_paths,
-        "contributors": contributors
+        "contributors": contributors,
+        "config_version": config.version,
+        "critical_path": trace['critical_path'],
+        "degraded_stages": degraded_stages,
+        "cache": "MISS"
     })
 
-    return {
+    response.headers["Server-Timing"] = timer.server_timing()
+    response.headers["X-Critical-Path"] = " > ".join(trace['critical_path'])
+    response.headers["X-Cache"] = "MISS"
+    result = {
         "risk_score": risk_score,
         "level": level,
         "ddi_summary": ddi_results,
@@ -166,20 +243,41 @@ async def predict_risk(request: dict, token: str = Depends(oauth2_scheme)):
         "home_remedies": home_remedies,
         "recommendations": recommendations,
         "evidence_paths": evidence_paths,
-        "contributors": contributors
+        "contributors": contributors,
+        "config_version": config.version,
+        "degraded_stages": degraded_stages
     }
+    # Degraded results are incomplete; only cache full ones
+    if not degraded_stages:
+        cache.put(cache_key, patient_id, config.version, results['history'], result)
+    return result
 
-@router.get("/risk/{patient_id}")
-async def get_risk_history(patient_id: str, token: str = Depends(oauth2_scheme)):
-    # TODO: fetch historical risk records
-    return {"msg": f"History for {patient_id} not yet implemented"}
-
+# Registered before /risk/{patient_id} so "config" is not taken as a patient id
 @router.get("/risk/config")
 async def get_config(token: str = Depends(oauth2_scheme)):
-    # TODO: return config
-    return {"msg": "Config not yet implemented"}
+    return get_config_store().get().as_dict()
 
 @router.put("/risk/config")
 async def update_config(config: dict, token: str = Depends(oauth2_scheme)):
-    # TODO: update config
-    return {"msg": "Config update not yet implemented"}
+    # Body: {"weights": {...}, "thresholds": {...}}; either part may be omitted
+    try:
+        updated = get_config_store().update(config.get('weights'), config.get('thresholds'))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # Results scored with the old config are keyed by its version; drop them now
+    get_result_cache().clear()
+    return updated.as_dict()
+
+@router.get("/risk/cache/stats")
+async def get_cache_stats(token: str = Depends(oauth2_scheme)):
+    return get_result_cache().stats()
+
+@router.delete("/risk/cache/{patient_id}")
+async def invalidate_patient_cache(patient_id: str, token: str = Depends(oauth2_scheme)):
+    # For callers that change a patient's history and want it reflected before the TTL
+    return {"patient_id": patient_id, "invalidated": get_result_cache().invalidate_patient(patient_id)}
+
+@router.get("/risk/{patient_id}")
+async def get_risk_history(patient_id: str, token: str = Depends(oauth2_scheme)):
+    # TODO: fetch historical risk records
+    return {"msg": f"History for {patient_id} not yet implemented"}
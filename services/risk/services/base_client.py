@@ -0,0 +1,24 @@
+# Base class for HTTP service clients
+import httpx
+
+
+class ServiceClient:
+    def __init__(self, base_url, http_client=None):
+        self.base_url = base_url
+        # Shared pooled client (see http_pool.py); None means one client per call
+        self.http_client = http_client
+
+    async def _request(self, method, path, **kwargs):
+        if self.http_client is not None:
+            resp = await self.http_client.request(method, f"{self.base_url}{path}", **kwargs)
+        else:
+            async with httpx.AsyncClient() as client:
+                resp = await client.request(method, f"{self.base_url}{path}", **kwargs)
+        resp.raise_for_status()
+        return resp.json()
+
+    async def _get(self, path, **kwargs):
+        return await self._request("GET", path, **kwargs)
+
+    async def _post(self, path, **kwargs):
+        return await self._request("POST", path, **kwargs)
@@ -1,12 +1,10 @@
 # FeatureGen client
-import httpx
+from .base_client import ServiceClient
+from .http_pool import UPSTREAMS
 
-class FeatureGenClient:
-    def __init__(self, base_url="http://featuregen:8000"):
-        self.base_url = base_url
+class FeatureGenClient(ServiceClient):
+    def __init__(self, base_url=UPSTREAMS["featuregen"], http_client=None):
+        super().__init__(base_url, http_client)
 
     async def get_features(self, patient_id, drug_id):
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(f"{self.base_url}/features", params={"patient_id": patient_id, "drug_id": drug_id})
-            resp.raise_for_status()
-            return resp.json()
+        return await self._get("/features", params={"patient_id": patient_id, "drug_id": drug_id})
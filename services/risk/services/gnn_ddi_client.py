@@ -1,12 +1,14 @@
 # GNN-DDI client
-import httpx
+from .base_client import ServiceClient
+from .http_pool import UPSTREAMS
 
-class GNNDdiClient:
-    def __init__(self, base_url="http://gnn-ddi:8000"):
-        self.base_url = base_url
+class GNNDdiClient(ServiceClient):
+    def __init__(self, base_url=UPSTREAMS["gnn_ddi"], http_client=None):
+        super().__init__(base_url, http_client)
 
     async def get_ddi(self, drug1_id, drug2_id):
-        async with httpx.AsyncClient() as client:
-            resp = await client.post(f"{self.base_url}/predict", json={"drug1_id": drug1_id, "drug2_id": drug2_id})
-            resp.raise_for_status()
-            return resp.json()
+        return await self._post("/predict", json={"drug1_id": drug1_id, "drug2_id": drug2_id})
+
+    async def get_ddi_matrix(self, drug_ids):
+        # One call for the whole prescription: {"drugs", "probabilities", "missing"}
+        return await self._post("/predict/batch", json={"drugs": list(drug_ids)})
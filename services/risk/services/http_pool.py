@@ -0,0 +1,85 @@
+# Shared HTTP connection pool for Risk-Engine service clients
+#
+# One keep-alive httpx.AsyncClient per upstream, created lazily and closed by
+# the app lifespan. Limits/timeouts can be tuned per upstream via env vars,
+# e.g. RISK_HTTP_KG_MAX_CONNECTIONS=50 or RISK_HTTP_GNN_DDI_TIMEOUT=2.5.
+import importlib.util
+import os
+
+import httpx
+
+UPSTREAMS = {
+    "kg": os.getenv("KG_URL", "http://kg:8000"),
+    "featuregen": os.getenv("FEATUREGEN_URL", "http://featuregen:8000"),
+    "gnn_ddi": os.getenv("GNN_DDI_URL", "http://gnn-ddi:8000"),
+    "recommender": os.getenv("RECOMMENDER_URL", "http://recommender:8000"),
+    "ner": os.getenv("NER_URL", "http://ner:8000"),
+    "standardizer": os.getenv("STANDARDIZER_URL", "http://standardizer:8000"),
+}
+
+DEFAULT_MAX_CONNECTIONS = 20
+DEFAULT_MAX_KEEPALIVE = 10
+DEFAULT_KEEPALIVE_EXPIRY = 30.0
+DEFAULT_TIMEOUT = 5.0
+DEFAULT_CONNECT_TIMEOUT = 2.0
+
+
+def _http2_available():
+    return importlib.util.find_spec("h2") is not None
+
+
+def _env(upstream, key, default, cast):
+    value = os.getenv(f"RISK_HTTP_{upstream.upper()}_{key}", os.getenv(f"RISK_HTTP_{key}"))
+    return cast(value) if value is not None else default
+
+
+class HTTPClientPool:
+    def __init__(self, pooled=True):
+        # pooled=False hands out no shared client, so every call falls back to
+        # a short-lived client (the pre-pool behaviour; handy for comparisons).
+        self.pooled = pooled
+        self._clients = {}
+
+    def limits(self, upstream):
+        return httpx.Limits(
+            max_connections=_env(upstream, "MAX_CONNECTIONS", DEFAULT_MAX_CONNECTIONS, int),
+            max_keepalive_connections=_env(upstream, "MAX_KEEPALIVE", DEFAULT_MAX_KEEPALIVE, int),
+            keepalive_expiry=_env(upstream, "KEEPALIVE_EXPIRY", DEFAULT_KEEPALIVE_EXPIRY, float),
+        )
+
+    def timeout(self, upstream):
+        return httpx.Timeout(
+            _env(upstream, "TIMEOUT", DEFAULT_TIMEOUT, float),
+            connect=_env(upstream, "CONNECT_TIMEOUT", DEFAULT_CONNECT_TIMEOUT, float),
+        )
+
+    def client(self, upstream):
+        if not self.pooled:
+            return None
+        client = self._clients.get(upstream)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                limits=self.limits(upstream),
+                timeout=self.timeout(upstream),
+                http2=_http2_available(),
+            )
+            self._clients[upstream] = client
+        return client
+
+    async def aclose(self):
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            await client.aclose()
+
+
+_pool = HTTPClientPool()
+
+
+def get_http_pool():
+    return _pool
+
+
+def set_http_pool(pool):
+    global _pool
+    _pool = pool
+    return pool
@@ -1,30 +1,35 @@
 # KG (Knowledge Graph) client
 import httpx
 
-class KGClient:
-    def __init__(self, base_url="http://kg:8000"):
-        self.base_url = base_url
+from .base_client import ServiceClient
+from .http_pool import UPSTREAMS
+
+class KGClient(ServiceClient):
+    def __init__(self, base_url=UPSTREAMS["kg"], http_client=None):
+        super().__init__(base_url, http_client)
 
     async def get_patient_history(self, patient_id):
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(f"{self.base_url}/patient/history", params={"patient_id": patient_id})
-            resp.raise_for_status()
-            return resp.json()
+        return await self._get("/patient/history", params={"patient_id": patient_id})
 
     async def get_adr_flags(self, patient_id, drug_id):
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(f"{self.base_url}/adr", params={"patient_id": patient_id, "drug_id": drug_id})
-            resp.raise_for_status()
-            return resp.json()
+        return await self._get("/adr", params={"patient_id": patient_id, "drug_id": drug_id})
 
     async def get_dfi(self, drug_id):
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(f"{self.base_url}/dfi", params={"drug_id": drug_id})
-            resp.raise_for_status()
-            return resp.json()
+        return await self._get("/dfi", params={"drug_id": drug_id})
 
     async def get_evidence_paths(self, drug1_id, drug2_id):
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(f"{self.base_url}/evidence-paths", params={"drug1_id": drug1_id, "drug2_id": drug2_id})
-            resp.raise_for_status()
-            return resp.json()
+        return await self._get("/evidence-paths", params={"drug1_id": drug1_id, "drug2_id": drug2_id})
+
+    async def get_evidence_paths_batch(self, pairs):
+        """
+        Evidence paths for many (drug1_id, drug2_id) pairs in one call:
+        POST /evidence-paths/batch {"pairs": [[d1, d2], ...]} -> {"paths": [[...], ...]}
+        in pair order. Returns None if the KG does not offer the endpoint.
+        """
+        try:
+            result = await self._post("/evidence-paths/batch", json={"pairs": [list(p) for p in pairs]})
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code in (404, 405, 501):
+                return None
+            raise
+        return result["paths"]
@@ -1,12 +1,10 @@
 # NER client
-import httpx
+from .base_client import ServiceClient
+from .http_pool import UPSTREAMS
 
-class NERClient:
-    def __init__(self, base_url="http://ner:8000"):
-        self.base_url = base_url
+class NERClient(ServiceClient):
+    def __init__(self, base_url=UPSTREAMS["ner"], http_client=None):
+        super().__init__(base_url, http_client)
 
     async def extract_entities(self, text):
-        async with httpx.AsyncClient() as client:
-            resp = await client.post(f"{self.base_url}/extract", json={"text": text})
-            resp.raise_for_status()
-            return resp.json()
+        return await self._post("/extract", json={"text": text})
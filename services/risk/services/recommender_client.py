@@ -1,12 +1,10 @@
 # Recommender client
-import httpx
+from .base_client import ServiceClient
+from .http_pool import UPSTREAMS
 
-class RecommenderClient:
-    def __init__(self, base_url="http://recommender:8000"):
-        self.base_url = base_url
+class RecommenderClient(ServiceClient):
+    def __init__(self, base_url=UPSTREAMS["recommender"], http_client=None):
+        super().__init__(base_url, http_client)
 
     async def get_alternatives(self, drug_id, patient_profile):
-        async with httpx.AsyncClient() as client:
-            resp = await client.post(f"{self.base_url}/recommend", json={"drug_id": drug_id, "profile": patient_profile})
-            resp.raise_for_status()
-            return resp.json()
+        return await self._post("/recommend", json={"drug_id": drug_id, "profile": patient_profile})
@@ -1,12 +1,10 @@
 # Standardizer client
-import httpx
+from .base_client import ServiceClient
+from .http_pool import UPSTREAMS
 
-class StandardizerClient:
-    def __init__(self, base_url="http://standardizer:8000"):
-        self.base_url = base_url
+class StandardizerClient(ServiceClient):
+    def __init__(self, base_url=UPSTREAMS["standardizer"], http_client=None):
+        super().__init__(base_url, http_client)
 
     async def standardize(self, drug_name):
-        async with httpx.AsyncClient() as client:
-            resp = await client.post(f"{self.base_url}/standardize", json={"drug_name": drug_name})
-            resp.raise_for_status()
-            return resp.json()
+        return await self._post("/standardize", json={"drug_name": drug_name})
@@ -0,0 +1,125 @@
+# Dependency-graph scheduler for the /predict/risk stages
+#
+# Each stage starts as soon as the stages it depends on have finished, instead
+# of waiting at a fixed sequence of gather() barriers. Every stage runs under
+# its own deadline; a stage with a fallback degrades to it on timeout, one
+# without fails the whole run with StageTimeout. The critical path (the chain
+# of stages that determined the total latency) is read back from the timings.
+import asyncio
+import os
+from dataclasses import dataclass
+
+from .timing import StageTimer
+
+DEFAULT_DEADLINE = float(os.getenv("RISK_STAGE_DEADLINE", "10"))
+_NO_FALLBACK = object()
+
+
+class StageTimeout(Exception):
+    """A stage without a fallback missed its deadline."""
+
+    def __init__(self, stage, deadline):
+        super().__init__(f"Stage {stage!r} exceeded its {deadline:g}s deadline")
+        self.stage = stage
+        self.deadline = deadline
+
+
+def stage_deadline(name, default=DEFAULT_DEADLINE):
+    """Seconds allowed for a stage; override with RISK_STAGE_DEADLINE_<NAME>, e.g. RISK_STAGE_DEADLINE_EVIDENCE=2."""
+    return float(os.getenv(f"RISK_STAGE_DEADLINE_{name.upper()}", default))
+
+
+@dataclass
+class Stage:
+    name: str
+    # async fn(inputs) -> result, where inputs maps each dependency's name to its result
+    fn: object
+    deps: tuple = ()
+    deadline: float = None
+    fallback: object = _NO_FALLBACK
+
+    def __post_init__(self):
+        if self.deadline is None:
+            self.deadline = stage_deadline(self.name)
+
+
+class StageGraph:
+    def __init__(self, stages):
+        self.stages = {stage.name: stage for stage in stages}
+        for stage in stages:
+            unknown = set(stage.deps) - set(self.stages)
+            if unknown:
+                raise ValueError(f"Stage {stage.name!r} depends on unknown stages {sorted(unknown)}")
+        self._check_acyclic()
+
+    def _check_acyclic(self):
+        state = {}
+
+        def visit(name):
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "visiting":
+                raise ValueError(f"Stage graph has a cycle through {name!r}")
+            state[name] = "visiting"
+            for dep in self.stages[name].deps:
+                visit(dep)
+            state[name] = "done"
+
+        for name in self.stages:
+            visit(name)
+
+    async def run(self, timer=None):
+        """
+        Run every stage; returns (results, trace).
+
+        trace = {"stages": {name: {"start", "end", "status", "deps"}},
+        "critical_path": [names]}, times in ms on the timer's clock.
+        """
+        timer = timer or StageTimer()
+        status = {}
+        tasks = {}
+
+        async def run_stage(stage):
+            inputs = {dep: await tasks[dep] for dep in stage.deps}
+            with timer.stage(stage.name):
+                try:
+                    result = await asyncio.wait_for(stage.fn(inputs), stage.deadline)
+                except asyncio.TimeoutError:
+                    if stage.fallback is _NO_FALLBACK:
+                        status[stage.name] = "timeout"
+                        raise StageTimeout(stage.name, stage.deadline) from None
+                    status[stage.name] = "degraded"
+                    return stage.fallback
+            status[stage.name] = "ok"
+            return result
+
+        for stage in self.stages.values():
+            tasks[stage.name] = asyncio.ensure_future(run_stage(stage))
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+        results = {name: task.result() for name, task in tasks.items()}
+        return results, self.trace(timer, status)
+
+    def trace(self, timer, status):
+        stages = {
+            name: {"start": start, "end": end, "status": status.get(name, "ok"), "deps": list(self.stages[name].deps)}
+            for name, (start, end) in timer.spans.items() if name in self.stages
+        }
+        return {"stages": stages, "critical_path": critical_path(stages)}
+
+
+def critical_path(stages):
+    """Walk back from the stage that finished last through the dependency that finished last."""
+    if not stages:
+        return []
+    name = max(stages, key=lambda n: stages[n]["end"])
+    path = [name]
+    while stages[name]["deps"]:
+        name = max(stages[name]["deps"], key=lambda n: stages[n]["end"])
+        path.append(name)
+    return path[::-1]
@@ -34,8 +34,8 @@ async def dummy_get_evidence_paths(self, drug1_id, drug2_id):
 async def dummy_get_alternatives(self, drug_id, patient_profile):
     return [{"drug_id": "alt1"}]
 
-async def dummy_get_ddi(self, drug1_id, drug2_id):
-    return {"risk": 1.0}
+async def dummy_get_ddi_matrix(self, drug_ids):
+    return {"drugs": list(drug_ids), "probabilities": [[1.0] * len(drug_ids) for _ in drug_ids], "missing": []}
 
 # Patch all clients globally for all tests
 router_risk.KGClient.get_patient_history = dummy_get_patient_history
@@ -45,7 +45,12 @@ router_risk.FeatureGenClient.get_features = dummy_get_features
 router_risk.DFIClient.get_dfi = dummy_get_dfi
 router_risk.MedLMClient.get_home_remedies = dummy_get_home_remedies
 router_risk.RecommenderClient.get_alternatives = dummy_get_alternatives
-router_risk.GNNDdiClient.get_ddi = dummy_get_ddi
+router_risk.GNNDdiClient.get_ddi_matrix = dummy_get_ddi_matrix
+
+# Tests patch upstream clients between requests; keep the per-prescription
+# result cache off except where it is under test
+from services.risk.result_cache import ResultCache, set_result_cache
+set_result_cache(ResultCache(ttl=0))
 
 client = TestClient(app)
 
@@ -91,18 +96,273 @@ def test_home_remedies_present(sample_prescription):
 
 # --- Test: Alert trigger for high risk or DFI ---
 def test_alert_trigger(sample_prescription):
-    # Patch GNNDdiClient.get_ddi and DFIClient.get_dfi to trigger alert
-    orig_ddi = router_risk.GNNDdiClient.get_ddi
+    # Patch GNNDdiClient.get_ddi_matrix and DFIClient.get_dfi to trigger alert
+    orig_ddi = router_risk.GNNDdiClient.get_ddi_matrix
     orig_dfi = router_risk.DFIClient.get_dfi
-    async def high_ddi(self, d1, d2):
-        return {"risk": 1.0}
+    async def high_ddi(self, drug_ids):
+        return {"drugs": list(drug_ids), "probabilities": [[1.0] * len(drug_ids) for _ in drug_ids], "missing": []}
     async def dfi_caution(self, drug_id):
         return [{"food_item": "milk", "advice": "limit", "type": "limit", "reason": "absorption"}]
-    router_risk.GNNDdiClient.get_ddi = high_ddi
+    router_risk.GNNDdiClient.get_ddi_matrix = high_ddi
     router_risk.DFIClient.get_dfi = dfi_caution
     response = client.post("/predict/risk", json=sample_prescription)
-    router_risk.GNNDdiClient.get_ddi = orig_ddi
+    router_risk.GNNDdiClient.get_ddi_matrix = orig_ddi
     router_risk.DFIClient.get_dfi = orig_dfi
     assert response.status_code == 200
     data = response.json()
     assert data["level"] in ("HIGH", "CRITICAL") or data["dfi_cautions"]
+
+# --- Test: shared HTTP pool hands out one keep-alive client per upstream ---
+def test_http_pool_reuses_clients():
+    import asyncio
+    from services.risk.services.http_pool import HTTPClientPool
+    pool = HTTPClientPool()
+    kg_client = pool.client("kg")
+    assert pool.client("kg") is kg_client
+    assert pool.client("featuregen") is not kg_client
+    asyncio.run(pool.aclose())
+    assert kg_client.is_closed
+    assert HTTPClientPool(pooled=False).client("kg") is None
+
+# --- Test: service clients send requests through the injected client ---
+def test_service_client_uses_injected_http_client():
+    import asyncio
+    import httpx
+    from services.risk.services.kg_client import KGClient
+    seen = []
+    def handler(request):
+        seen.append(str(request.url))
+        return httpx.Response(200, json=[{"food_item": "grapefruit"}])
+    async def call():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http_client:
+            return await KGClient(base_url="http://kg-test", http_client=http_client).get_dfi("drugA")
+    dfi = asyncio.run(call())
+    assert dfi == [{"food_item": "grapefruit"}]
+    assert seen == ["http://kg-test/dfi?drug_id=drugA"]
+
+# --- Test: batched DDI matrix is expanded per pair, unknown drugs score 0 ---
+def test_ddi_summary_from_matrix():
+    from services.risk.scoring import ddi_summary, pair_risk_matrix
+    drug_ids = ["drugA", "drugB", "drugX"]
+    matrix = {"drugs": ["drugA", "drugB"], "probabilities": [[0.9, 0.7], [0.7, 0.8]], "missing": ["drugX"]}
+    results = ddi_summary(drug_ids, pair_risk_matrix(drug_ids, matrix))
+    assert results == [
+        {"drug1_id": "drugA", "drug2_id": "drugB", "risk": 0.7},
+        {"drug1_id": "drugA", "drug2_id": "drugX", "risk": 0.0},
+        {"drug1_id": "drugB", "drug2_id": "drugX", "risk": 0.0},
+    ]
+
+# --- Test: vectorized scoring matches the per-pair loop, including repeated drugs ---
+def test_score_prescription_matches_pair_loop():
+    import random
+    from services.risk.scoring import score_prescription
+    rng = random.Random(7)
+    known = [f"D{i}" for i in range(6)]
+    probs = [[rng.random() for _ in known] for _ in known]
+    matrix = {"drugs": known, "probabilities": probs, "missing": ["DX"]}
+    drug_ids = ["D0", "D3", "DX", "D3", "D5", "D1", "D0"]
+    adr = [rng.random() for _ in drug_ids]
+    weights = {"ddi_weight": 0.6, "adr_weight": 0.4}
+    row = {d: i for i, d in enumerate(known)}
+    pairs = [(i, j) for i in range(len(drug_ids)) for j in range(i + 1, len(drug_ids))]
+    pair_risk = [probs[row[drug_ids[i]]][row[drug_ids[j]]] if drug_ids[i] in row and drug_ids[j] in row else 0.0 for i, j in pairs]
+    expected = []
+    for drug_id, adr_risk in zip(drug_ids, adr):
+        ddi = sum(r for (i, j), r in zip(pairs, pair_risk) if drug_id in (drug_ids[i], drug_ids[j]))
+        expected.append(0.6 * ddi + 0.4 * adr_risk)
+    scored = score_prescription(drug_ids, matrix, adr, weights)
+    assert [c["score"] for c in scored["contributors"]] == pytest.approx(expected)
+    assert scored["risk_score"] == pytest.approx(min(1.0, sum(expected) / len(drug_ids)))
+    assert [d["risk"] for d in scored["ddi_summary"]] == pytest.approx(pair_risk)
+    assert score_prescription(["D0"], {}, [0.5], weights)["ddi_summary"] == []
+
+# --- Test: risk config is cached, reloaded on file change, and swapped by PUT ---
+def test_config_store_reload_and_update(tmp_path):
+    import os
+    from services.risk.config_store import ConfigStore
+    (tmp_path / "risk_weights.yaml").write_text("ddi_weight: 1.0\nadr_weight: 0.0\n")
+    (tmp_path / "risk_thresholds.yaml").write_text("low: 0.0\nmoderate: 0.2\nhigh: 0.5\ncritical: 0.8\n")
+    store = ConfigStore(str(tmp_path))
+    first = store.get()
+    assert store.get() is first and store.reloads == 1
+    weights_path = tmp_path / "risk_weights.yaml"
+    weights_path.write_text("ddi_weight: 0.7\nadr_weight: 0.3\n")
+    stat = os.stat(weights_path)
+    os.utime(weights_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))  # same size; make the edit visible
+    second = store.get()
+    assert second.weights["ddi_weight"] == 0.7 and second.version != first.version
+    # A broken edit on disk keeps the last good config live
+    (tmp_path / "risk_thresholds.yaml").write_text("high: 0.9\ncritical: 0.1\n")
+    assert store.get() is second
+    with pytest.raises(ValueError):
+        store.update(thresholds={"moderate": 0.6, "high": 0.4})
+    updated = store.update(thresholds={"low": 0.0, "moderate": 0.3, "high": 0.6, "critical": 0.9})
+    assert store.get() is updated and ConfigStore(str(tmp_path)).get().version == updated.version
+
+def test_config_endpoints_and_version_stamp(tmp_path, sample_prescription):
+    import os
+    import shutil
+    from services.risk import config_store
+    for name in ("risk_weights.yaml", "risk_thresholds.yaml"):
+        shutil.copy(os.path.join(os.path.dirname(config_store.__file__), "config", name), tmp_path / name)
+    original = config_store.get_config_store()
+    config_store.set_config_store(config_store.ConfigStore(str(tmp_path)))
+    try:
+        version = client.get("/risk/config").json()["version"]
+        assert client.post("/predict/risk", json=sample_prescription).json()["config_version"] == version
+        bad = client.put("/risk/config", json={"weights": {"ddi_weight": -1}})
+        assert bad.status_code == 400
+        resp = client.put("/risk/config", json={"weights": {"ddi_weight": 0.0, "adr_weight": 0.0}})
+        assert resp.status_code == 200 and resp.json()["version"] != version
+        data = client.post("/predict/risk", json=sample_prescription).json()
+        assert data["config_version"] == resp.json()["version"] and data["level"] == "LOW"
+    finally:
+        config_store.set_config_store(original)
+
+# --- Test: evidence paths fan out under a bound and keep pair order ---
+def test_fetch_evidence_paths_bounded():
+    import asyncio
+    import json
+    import httpx
+    in_flight, peak = 0, 0
+
+    class FakeKG:
+        async def get_evidence_paths(self, drug1_id, drug2_id):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return [[drug1_id, "CYP3A4", drug2_id]]
+
+        async def get_evidence_paths_batch(self, pairs):
+            raise AssertionError("batch endpoint not enabled")
+
+    pairs = [(f"D{i}", f"D{i + 1}") for i in range(10)]
+    paths = asyncio.run(router_risk.fetch_evidence_paths(FakeKG(), pairs, concurrency=3, batch=False))
+    assert paths == [[[a, "CYP3A4", b]] for a, b in pairs]
+    assert peak == 3
+
+    # Batch endpoint: one call for all pairs; a KG without it (404) falls back to per-pair
+    # lookups (KGClient.get_evidence_paths is patched above)
+    status = 200
+    def handler(request):
+        assert request.url.path == "/evidence-paths/batch"
+        return httpx.Response(status, json={"paths": [[["path"]] for _ in json.loads(request.content)["pairs"]]})
+    async def call():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http_client:
+            kg = router_risk.KGClient(base_url="http://kg-test", http_client=http_client)
+            return await router_risk.fetch_evidence_paths(kg, pairs[:2], batch=True)
+    assert asyncio.run(call()) == [[["path"]], [["path"]]]
+    status = 404
+    assert asyncio.run(call()) == [["evidence_path1", "evidence_path2"]] * 2
+
+# --- Test: per-stage timings are reported in Server-Timing ---
+def test_predict_risk_server_timing(sample_prescription):
+    response = client.post("/predict/risk", json=sample_prescription)
+    stages = [entry.split(";")[0] for entry in response.headers["server-timing"].split(", ")]
+    assert {"history", "ddi", "scoring", "evidence", "total"} <= set(stages)
+
+# --- Test: stage graph starts stages when their inputs are ready, with deadlines ---
+def test_stage_graph_overlap_deadlines_and_critical_path():
+    import asyncio
+    import time
+    from services.risk.stage_graph import Stage, StageGraph, StageTimeout
+
+    def sleeper(seconds, value):
+        async def fn(inputs):
+            await asyncio.sleep(seconds)
+            return value if not inputs else (value, sorted(inputs))
+        return fn
+
+    graph = StageGraph([
+        Stage("a", sleeper(0.05, "a")),
+        Stage("b", sleeper(0.10, "b")),
+        Stage("c", sleeper(0.05, "c"), deps=("a", "b")),
+        Stage("slow", sleeper(1.0, "slow"), deadline=0.05, fallback="fallback"),
+    ])
+    start = time.perf_counter()
+    results, trace = asyncio.run(graph.run())
+    elapsed = time.perf_counter() - start
+    assert elapsed < 0.3  # a, b and slow overlap; c waits only for b
+    assert results["c"] == ("c", ["a", "b"]) and results["slow"] == "fallback"
+    assert trace["stages"]["slow"]["status"] == "degraded"
+    assert trace["stages"]["c"]["start"] >= trace["stages"]["b"]["end"]
+    assert trace["critical_path"] == ["b", "c"]
+
+    strict = StageGraph([Stage("a", sleeper(1.0, "a"), deadline=0.05), Stage("b", sleeper(0.01, "b"), deps=("a",))])
+    with pytest.raises(StageTimeout):
+        asyncio.run(strict.run())
+    with pytest.raises(ValueError):
+        StageGraph([Stage("a", sleeper(0, "a"), deps=("b",)), Stage("b", sleeper(0, "b"), deps=("a",))])
+
+def test_predict_risk_degrades_slow_advisory_stage(sample_prescription, monkeypatch):
+    import asyncio
+    async def slow_dfi(self, drug_id):
+        await asyncio.sleep(1.0)
+        return [{"food_item": "grapefruit"}]
+    monkeypatch.setattr(router_risk.DFIClient, "get_dfi", slow_dfi)
+    monkeypatch.setenv("RISK_STAGE_DEADLINE_DFI", "0.05")
+    response = client.post("/predict/risk", json=sample_prescription)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["degraded_stages"] == ["dfi"] and data["dfi_cautions"] == []
+    assert data["level"] in ("HIGH", "CRITICAL")
+    assert response.headers["x-critical-path"]
+
+# --- Test: re-submitted prescriptions hit the result cache until history or config changes ---
+def test_result_cache_hits_and_invalidation(sample_prescription, monkeypatch):
+    from services.risk import result_cache
+    cache = ResultCache(ttl=60, max_entries=8)
+    monkeypatch.setattr(result_cache, "_cache", cache)
+    history = {"allergies": [], "conditions": []}
+    async def current_history(self, patient_id):
+        return history
+    monkeypatch.setattr(router_risk.KGClient, "get_patient_history", current_history)
+
+    audited = []
+    monkeypatch.setattr(router_risk, "log_audit", audited.append)
+
+    first = client.post("/predict/risk", json=sample_prescription)
+    second = client.post("/predict/risk", json=sample_prescription)
+    assert first.headers["x-cache"] == "MISS" and second.headers["x-cache"] == "HIT"
+    assert second.json() == first.json()
+    # Hits are audited too
+    assert [a["cache"] for a in audited] == ["MISS", "HIT"]
+    assert audited[1]["level"] == audited[0]["level"] and audited[1]["prescription"] == sample_prescription["prescription"]
+    # Reordered or renamed drugs change the per-drug response fields, so they are not hits
+    reordered = dict(sample_prescription, prescription=sample_prescription["prescription"][::-1])
+    assert client.post("/predict/risk", json=reordered).headers["x-cache"] == "MISS"
+    renamed = dict(sample_prescription, prescription=[dict(d, name=d["name"] + " XR") for d in sample_prescription["prescription"]])
+    assert client.post("/predict/risk", json=renamed).headers["x-cache"] == "MISS"
+
+    # New allergy: the cached result was computed from a different history
+    history = {"allergies": ["drugA"], "conditions": []}
+    third = client.post("/predict/risk", json=sample_prescription)
+    assert third.headers["x-cache"] == "MISS" and third.json()["level"] == "CRITICAL"
+
+    assert client.delete("/risk/cache/patient123").json()["invalidated"] == 3
+    assert client.post("/predict/risk", json=sample_prescription).headers["x-cache"] == "MISS"
+    stats = client.get("/risk/cache/stats").json()
+    assert stats["hits"] == 1 and stats["misses"] == 5 and stats["stale"] == 1 and stats["invalidations"] == 3
+
+def test_result_cache_ttl_and_config_version():
+    import time
+    from services.risk.result_cache import prescription_key
+    history = {"allergies": []}
+    a, b = {"drug_id": "a", "name": "A"}, {"drug_id": "b", "name": "B"}
+    assert prescription_key("p", [a, b], "v1") == prescription_key("p", [dict(a), dict(b)], "v1")
+    assert prescription_key("p", [a, b], "v1") != prescription_key("p", [b, a], "v1")
+    assert prescription_key("p", [a, b], "v1") != prescription_key("p", [a, dict(b, name="B2")], "v1")
+    assert prescription_key("p", [a, b], "v1") != prescription_key("p", [a, b], "v2")
+    cache = ResultCache(ttl=0.05, max_entries=2)
+    cache.put("k1", "p", "v1", history, {"level": "LOW"})
+    hit = cache.confirm("k1", cache.candidate("k1"), history)
+    assert hit == {"level": "LOW"}
+    hit["level"] = "HIGH"  # callers get a copy, not the stored result
+    assert cache.confirm("k1", cache.candidate("k1"), history) == {"level": "LOW"}
+    time.sleep(0.06)
+    assert cache.candidate("k1") is None and cache.stats()["expired"] == 1
+    cache.put("k1", "p", "v1", history, {})
+    cache.put("k2", "p", "v2", history, {})  # new config version drops v1 entries
+    assert cache.candidate("k1") is None and cache.stats()["entries"] == 1
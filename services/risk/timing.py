@@ -0,0 +1,30 @@
+# Per-stage wall-clock timing for /predict/risk, reported as a Server-Timing header
+import time
+from contextlib import contextmanager
+
+
+class StageTimer:
+    def __init__(self):
+        self._origin = time.perf_counter()
+        # name -> (start, end) in ms since the timer was created
+        self.spans = {}
+
+    def now(self):
+        return (time.perf_counter() - self._origin) * 1000
+
+    @contextmanager
+    def stage(self, name):
+        start = self.now()
+        try:
+            yield
+        finally:
+            self.spans[name] = (start, self.now())
+
+    def durations(self):
+        return {name: end - start for name, (start, end) in self.spans.items()}
+
+    def server_timing(self):
+        """Server-Timing header value, e.g. "history;dur=3.1, ddi;dur=12.0, total;dur=20.4"."""
+        entries = [f"{name};dur={ms:.1f}" for name, ms in self.durations().items()]
+        entries.append(f"total;dur={self.now():.1f}")
+        return ", ".join(entries)
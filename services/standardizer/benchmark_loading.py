@@ -0,0 +1,61 @@
+"""
+Startup cost of loading canonical dictionaries.
+
+Writes a synthetic nodes_drug.csv (ids, names, semicolon-separated synonyms)
+and times the original row-by-row iterrows() loader, the vectorized CSV
+loader, and a warm start from the binary snapshot, plus building the match
+indexes from the loaded dictionaries.
+
+Usage:
+	python benchmark_loading.py --rows 200000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmark_standardize import synthetic_names
+from dictionaries import load_dictionaries
+from matcher import build_indexes
+
+def legacy_load(data_dir):
+	# The pre-snapshot loader: pandas iterrows over every row
+	df = pd.read_csv(os.path.join(data_dir, "nodes_drug.csv"))
+	return {"DRUG": {str(row["name"]): str(row["id"]) for _, row in df.iterrows()}}
+
+def timed(fn, *args):
+	start = time.perf_counter()
+	result = fn(*args)
+	return result, (time.perf_counter() - start) * 1000
+
+def main():
+	parser = argparse.ArgumentParser()
+	parser.add_argument("--rows", type=int, default=200000)
+	args = parser.parse_args()
+
+	names = synthetic_names(args.rows + args.rows // 2)
+	canonical, extra = names[:args.rows], names[args.rows:]
+	with tempfile.TemporaryDirectory() as tmp:
+		data_dir, snapshot_dir = os.path.join(tmp, "data"), os.path.join(tmp, "snapshots")
+		os.makedirs(data_dir)
+		pd.DataFrame({
+			"id": [f"DB{i:06d}" for i in range(args.rows)],
+			"name": canonical,
+			"synonyms": [extra[i // 2] if i % 2 == 0 and i // 2 < len(extra) else "" for i in range(args.rows)],
+		}).to_csv(os.path.join(data_dir, "nodes_drug.csv"), index=False)
+
+		_, legacy_ms = timed(legacy_load, data_dir)
+		(_, _, cold), cold_ms = timed(load_dictionaries, data_dir, snapshot_dir)
+		(canonical_map, synonyms, warm), warm_ms = timed(load_dictionaries, data_dir, snapshot_dir)
+		_, index_ms = timed(build_indexes, canonical_map, synonyms)
+
+	print(f"{args.rows} canonical names")
+	print(f"{'iterrows loader':<28} {legacy_ms:9.0f} ms")
+	print(f"{'vectorized CSV (' + cold['source'] + ')':<28} {cold_ms:9.0f} ms  (includes writing the snapshot)")
+	print(f"{'binary ' + warm['source']:<28} {warm_ms:9.0f} ms")
+	print(f"{'build match indexes':<28} {index_ms:9.0f} ms")
+
+if __name__ == "__main__":
+	main()
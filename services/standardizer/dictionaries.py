@@ -0,0 +1,139 @@
+# Canonical dictionary loading: vectorized CSV parsing plus a binary snapshot keyed by file hashes
+import glob
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+
+NAME_COLUMNS = ['name', 'drug', 'allergy', 'food', 'sideeffect', 'patient']
+ID_COLUMNS = ['id', 'drug_id', 'allergy_id', 'food_id', 'sideeffect_id', 'patient_id']
+SNAPSHOT_VERSION = 1
+# Fields stored per entity type; each is a list of strings
+FIELDS = ("names", "ids", "synonyms", "synonym_ids")
+
+def node_files(data_dir):
+	return sorted(glob.glob(os.path.join(data_dir, 'nodes_*.csv')))
+
+def node_type(fname):
+	return fname.split('nodes_')[-1].split('.')[0].upper()
+
+def files_fingerprint(paths):
+	"""sha256 over every file's name and content; changes whenever any CSV changes."""
+	digest = hashlib.sha256(f"v{SNAPSHOT_VERSION}".encode())
+	for path in paths:
+		digest.update(os.path.basename(path).encode() + b"\0")
+		with open(path, 'rb') as f:
+			for block in iter(lambda: f.read(1 << 20), b""):
+				digest.update(block)
+	return digest.hexdigest()
+
+def read_node_table(fname):
+	"""Parse one nodes_*.csv column-wise: ({name: id}, {synonym: id}), or None if columns are missing."""
+	columns = pd.read_csv(fname, nrows=0).columns
+	# Expect columns: id, name (or similar), optional semicolon-separated synonyms
+	name_col = next((c for c in columns if c.lower() in NAME_COLUMNS), None)
+	id_col = next((c for c in columns if c.lower() in ID_COLUMNS), None)
+	syn_col = next((c for c in columns if c.lower() == 'synonyms'), None)
+	if not (name_col and id_col):
+		return None
+	usecols = [c for c in (name_col, id_col, syn_col) if c]
+	df = pd.read_csv(fname, usecols=usecols, dtype=str, keep_default_na=False)
+	canonical = dict(zip(df[name_col], df[id_col]))
+	synonyms = {}
+	if syn_col:
+		exploded = df[[id_col]].assign(synonym=df[syn_col].str.split(';')).explode('synonym')
+		exploded['synonym'] = exploded['synonym'].str.strip()
+		exploded = exploded[exploded['synonym'] != ''].drop_duplicates('synonym')
+		synonyms = dict(zip(exploded['synonym'], exploded[id_col]))
+	return canonical, synonyms
+
+def load_from_csv(paths):
+	canonical, synonyms = {}, {}
+	for fname in paths:
+		table = read_node_table(fname)
+		if table is not None:
+			canonical[node_type(fname)], synonyms[node_type(fname)] = table
+	return canonical, synonyms
+
+def _encode_strings(values):
+	# String table: NUL-separated UTF-8 in a flat uint8 array (mmap-able, decoded with one split)
+	return np.frombuffer("\0".join(values).encode("utf-8"), dtype=np.uint8)
+
+def _decode_strings(blob, count):
+	if count == 0:
+		return []
+	return bytes(blob).decode("utf-8").split("\0")
+
+def write_snapshot(snapshot_dir, fingerprint, canonical, synonyms):
+	"""Write the dictionaries to <snapshot_dir>/<fingerprint>/ atomically and drop older snapshots."""
+	os.makedirs(snapshot_dir, exist_ok=True)
+	target = os.path.join(snapshot_dir, fingerprint)
+	tmp = tempfile.mkdtemp(prefix=".tmp-", dir=snapshot_dir)
+	try:
+		manifest = {"version": SNAPSHOT_VERSION, "fingerprint": fingerprint, "types": {}}
+		for typ, names in canonical.items():
+			syns = synonyms.get(typ, {})
+			fields = {
+				"names": list(names.keys()), "ids": list(names.values()),
+				"synonyms": list(syns.keys()), "synonym_ids": list(syns.values()),
+			}
+			for field, values in fields.items():
+				np.save(os.path.join(tmp, f"{typ}.{field}.npy"), _encode_strings(values))
+			manifest["types"][typ] = {field: len(values) for field, values in fields.items()}
+		with open(os.path.join(tmp, "manifest.json"), "w") as f:
+			json.dump(manifest, f)
+		if not os.path.exists(target):
+			os.replace(tmp, target)
+	finally:
+		shutil.rmtree(tmp, ignore_errors=True)
+	for entry in os.listdir(snapshot_dir):
+		path = os.path.join(snapshot_dir, entry)
+		if entry != fingerprint and os.path.isdir(path) and not entry.startswith(".tmp-"):
+			shutil.rmtree(path, ignore_errors=True)
+	return target
+
+def read_snapshot(snapshot_dir, fingerprint):
+	"""Load a snapshot written by write_snapshot; None if it is missing or unreadable."""
+	path = os.path.join(snapshot_dir, fingerprint)
+	try:
+		with open(os.path.join(path, "manifest.json")) as f:
+			manifest = json.load(f)
+		if manifest.get("version") != SNAPSHOT_VERSION or manifest.get("fingerprint") != fingerprint:
+			return None
+		canonical, synonyms = {}, {}
+		for typ, counts in manifest["types"].items():
+			values = {
+				field: _decode_strings(np.load(os.path.join(path, f"{typ}.{field}.npy"), mmap_mode="r"), counts[field])
+				for field in FIELDS
+			}
+			canonical[typ] = dict(zip(values["names"], values["ids"]))
+			synonyms[typ] = dict(zip(values["synonyms"], values["synonym_ids"]))
+		return canonical, synonyms
+	except (OSError, ValueError, KeyError):
+		return None
+
+def load_dictionaries(data_dir, snapshot_dir=None):
+	"""
+	Load {type: {name: id}} and {type: {synonym: id}} from data_dir/nodes_*.csv.
+
+	With a snapshot_dir, a snapshot matching the current file hashes is used
+	instead of parsing the CSVs, and a fresh one is written after parsing.
+	Returns (canonical, synonyms, info) where info has the fingerprint and source.
+	"""
+	paths = node_files(data_dir)
+	fingerprint = files_fingerprint(paths)
+	if snapshot_dir and paths:
+		cached = read_snapshot(snapshot_dir, fingerprint)
+		if cached is not None:
+			return (*cached, {"fingerprint": fingerprint, "source": "snapshot"})
+	canonical, synonyms = load_from_csv(paths)
+	if snapshot_dir and paths:
+		try:
+			write_snapshot(snapshot_dir, fingerprint, canonical, synonyms)
+		except OSError:
+			# Read-only deployments still work; they just parse CSVs on every start
+			pass
+	return canonical, synonyms, {"fingerprint": fingerprint, "source": "csv"}
@@ -1,15 +1,24 @@
 # Standardizer Service main.py
 import os
-import glob
-import pandas as pd
+import threading
+import time
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 from typing import List, Dict, Any
-from rapidfuzz import process, fuzz
+from dictionaries import load_dictionaries
+from matcher import MATCH_THRESHOLD, TierCounter, build_indexes
 
-app = FastAPI(title="Standardizer Service", description="Maps entity names to canonical IDs using fuzzy string matching on manual CSVs.")
+@asynccontextmanager
+async def lifespan(app):
+	# Load dictionaries before serving traffic rather than on the first request
+	get_dictionaries()
+	yield
+
+app = FastAPI(title="Standardizer Service", description="Maps entity names to canonical IDs using fuzzy string matching on manual CSVs.", lifespan=lifespan)
 
 DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../data/manual'))
+SNAPSHOT_DIR = os.getenv("STANDARDIZER_SNAPSHOT_DIR", os.path.abspath(os.path.join(os.path.dirname(__file__), '../../models/standardizer')))
 
 class EntityIn(BaseModel):
 	text: str
@@ -28,39 +37,85 @@ class StandardizeRequest(BaseModel):
 class StandardizeResponse(BaseModel):
 	results: List[StandardizedEntity]
 
-def load_canonical_dicts():
-	# Load all relevant CSVs into a dict: {type: {name: id}}
-	mapping = {}
-	for fname in glob.glob(os.path.join(DATA_DIR, 'nodes_*.csv')):
-		typ = fname.split('nodes_')[-1].split('.')[0].upper()
-		df = pd.read_csv(fname)
-		# Expect columns: id, name (or similar)
-		name_col = next((c for c in df.columns if c.lower() in ['name', 'drug', 'allergy', 'food', 'sideeffect', 'patient']), None)
-		id_col = next((c for c in df.columns if c.lower() in ['id', 'drug_id', 'allergy_id', 'food_id', 'sideeffect_id', 'patient_id']), None)
-		if name_col and id_col:
-			mapping[typ] = {str(row[name_col]): str(row[id_col]) for _, row in df.iterrows()}
-	return mapping
-
-CANONICAL_DICTS = load_canonical_dicts()
+class Dictionaries:
+	"""One loaded generation of canonical dictionaries and the match indexes built from them."""
 
-@app.post("/standardize", response_model=StandardizeResponse)
-async def standardize_entities(req: StandardizeRequest):
-	results = []
-	for ent in req.entities:
-		typ = ent.type.upper()
-		candidates = CANONICAL_DICTS.get(typ, {})
-		canonical_id = None
-		score = 0.0
-		manual_review_flag = True
-		if candidates:
-			match, score, _ = process.extractOne(ent.text, candidates.keys(), scorer=fuzz.ratio)
-			canonical_id = candidates[match] if score > 80 else None
-			manual_review_flag = score <= 80
-		results.append(StandardizedEntity(
+	def __init__(self, canonical: Dict[str, Dict[str, str]], synonyms: Dict[str, Dict[str, str]], info: Dict[str, Any]):
+		self.canonical = canonical
+		# Per-type exact/synonym lookup tables and fuzzy choice arrays, built once rather than per entity
+		self.indexes = build_indexes(canonical, synonyms)
+		self.info = {
+			**info,
+			"loaded_at": time.time(),
+			"types": {typ: len(names) for typ, names in canonical.items()},
+		}
+
+def load_canonical_dicts() -> Dictionaries:
+	# Reuses the binary snapshot in SNAPSHOT_DIR when the CSV hashes match
+	return Dictionaries(*load_dictionaries(DATA_DIR, SNAPSHOT_DIR))
+
+_dictionaries = None
+_dictionaries_lock = threading.Lock()
+
+def get_dictionaries() -> Dictionaries:
+	global _dictionaries
+	if _dictionaries is None:
+		with _dictionaries_lock:
+			if _dictionaries is None:
+				_dictionaries = load_canonical_dicts()
+	return _dictionaries
+
+def reload_dictionaries() -> Dictionaries:
+	"""Build the new generation fully, then swap the reference; requests in flight keep the old one."""
+	global _dictionaries
+	with _dictionaries_lock:
+		fresh = load_canonical_dicts()
+		_dictionaries = fresh
+	return fresh
+
+TIER_COUNTS = TierCounter()
+
+def standardize_batch(entities: List[EntityIn]) -> List[StandardizedEntity]:
+	"""Match all entities of a request: exact/synonym lookup first, then one batched cdist call per type."""
+	by_type = {}
+	for i, ent in enumerate(entities):
+		by_type.setdefault(ent.type.upper(), []).append(i)
+	indexes = get_dictionaries().indexes
+	matches = [(None, None, 0.0, "unmatched")] * len(entities)
+	for typ, rows in by_type.items():
+		index = indexes.get(typ)
+		if index is None:
+			continue
+		for i, match in zip(rows, index.match([entities[i].text for i in rows])):
+			matches[i] = match
+	TIER_COUNTS.add(tier for *_, tier in matches)
+	return [
+		StandardizedEntity(
 			text=ent.text,
 			type=ent.type,
 			canonical_id=canonical_id or '',
 			score=score,
-			manual_review_flag=manual_review_flag
-		))
-	return {"results": results}
+			manual_review_flag=score <= MATCH_THRESHOLD
+		)
+		for ent, (_, canonical_id, score, _) in zip(entities, matches)
+	]
+
+@app.post("/standardize", response_model=StandardizeResponse)
+def standardize_entities(req: StandardizeRequest):
+	# Sync handler: the CPU-bound scoring runs in FastAPI's threadpool, off the event loop
+	return {"results": standardize_batch(req.entities)}
+
+
+@app.get("/standardize/stats")
+def standardize_stats():
+	# How many entities each tier resolved; fuzzy_avoided = share answered by exact/synonym lookup
+	return TIER_COUNTS.snapshot()
+
+@app.post("/reload")
+def reload():
+	"""Re-read nodes_*.csv (or their snapshot) and atomically swap in the new dictionaries."""
+	try:
+		fresh = reload_dictionaries()
+	except Exception as e:
+		raise HTTPException(status_code=400, detail=f"Dictionary reload failed: {e}")
+	return fresh.info
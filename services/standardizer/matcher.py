@@ -0,0 +1,188 @@
+# Exact/synonym lookup, then batched fuzzy matching against per-type canonical name arrays
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter
+import numpy as np
+from rapidfuzz import process, fuzz
+from ngram_index import NgramIndex
+
+MATCH_THRESHOLD = 80
+TIERS = ("exact", "synonym", "fuzzy", "unmatched")
+# Salt/hydrate words dropped for the fallback exact lookup ("Metformin HCl" -> "metformin")
+SALT_FORMS = {
+	"hcl", "hydrochloride", "dihydrochloride", "hydrobromide", "hbr", "sodium", "potassium", "calcium",
+	"magnesium", "sulfate", "sulphate", "bisulfate", "mesylate", "besylate", "maleate", "fumarate",
+	"citrate", "phosphate", "acetate", "tartrate", "bitartrate", "succinate", "tosylate", "lactate",
+	"gluconate", "nitrate", "bromide", "chloride", "hyclate", "monohydrate", "dihydrate", "trihydrate",
+	"anhydrous", "hemihydrate",
+}
+# Entity types whose names get salt-form normalization
+SALT_TYPES = {"DRUG"}
+NON_WORD = re.compile(r"[\W_]+")
+# Candidates retrieved per entity from the trigram index before fuzz scoring; 0 scores every name
+CANDIDATE_TOP_N = int(os.getenv("STANDARDIZER_CANDIDATE_TOP_N", "100"))
+# Upper bound on the score matrix computed at once (queries x choices), ~64 MB of float32
+MAX_CELLS = 16_000_000
+
+def normalize_name(text: str, strip_salts: bool = False) -> str:
+	"""Case-fold, strip accents and punctuation, collapse whitespace; optionally drop salt forms."""
+	if not text.isascii():
+		text = unicodedata.normalize("NFKD", text)
+		text = "".join(c for c in text if not unicodedata.combining(c))
+	words = NON_WORD.sub(" ", text.casefold()).split()
+	if strip_salts:
+		# Keep the name as-is if it is nothing but salt words (e.g. "Sodium chloride")
+		words = [w for w in words if w not in SALT_FORMS] or words
+	return " ".join(words)
+
+class TierCounter:
+	"""Thread-safe counts of which tier resolved each entity."""
+
+	def __init__(self):
+		self._lock = threading.Lock()
+		self._counts = Counter()
+
+	def add(self, tiers):
+		with self._lock:
+			self._counts.update(tiers)
+
+	def snapshot(self):
+		with self._lock:
+			counts = {tier: self._counts[tier] for tier in TIERS}
+		total = sum(counts.values())
+		looked_up = counts["exact"] + counts["synonym"]
+		return {"tiers": counts, "total": total, "fuzzy_avoided": looked_up / total if total else 0.0}
+
+class ChoiceIndex:
+	"""Canonical names and ids for one entity type, materialized once at load time."""
+
+	def __init__(self, mapping: dict, synonyms: dict = None, strip_salts: bool = False, top_n: int = None):
+		self.names = list(mapping.keys())
+		self.ids = list(mapping.values())
+		self.strip_salts = strip_salts
+		self.top_n = CANDIDATE_TOP_N if top_n is None else top_n
+		# Small vocabularies are cheaper to brute-force than to prune
+		self.ngrams = NgramIndex(self.names) if 0 < self.top_n < len(self.names) else None
+		# normalized name (salt kept) -> (canonical name, id, tier); canonical names win over synonyms
+		self.lookup = {}
+		# salt-stripped name -> entry, or None when the stripped form is shared by
+		# different ids ("Diclofenac sodium" / "Diclofenac potassium")
+		self.salt_lookup = {}
+		id_to_name = {canonical_id: name for name, canonical_id in mapping.items()}
+		entries = [(name, (name, canonical_id, "exact")) for name, canonical_id in mapping.items()]
+		entries += [
+			(synonym, (id_to_name.get(canonical_id, synonym), canonical_id, "synonym"))
+			for synonym, canonical_id in (synonyms or {}).items()
+		]
+		for text, entry in entries:
+			self.lookup.setdefault(normalize_name(text), entry)
+			if strip_salts:
+				key = normalize_name(text, strip_salts=True)
+				known = self.salt_lookup.setdefault(key, entry)
+				if known is not None and known[1] != entry[1]:
+					self.salt_lookup[key] = None
+		self.lookup.pop("", None)
+		self.salt_lookup.pop("", None)
+
+	def exact(self, text):
+		"""Exact/synonym hit for text, or None. Salt-stripped forms only count when they name a single id."""
+		hit = self.lookup.get(normalize_name(text))
+		if hit is None and self.strip_salts:
+			hit = self.salt_lookup.get(normalize_name(text, strip_salts=True))
+		return hit
+
+	def __len__(self):
+		return len(self.names)
+
+	def scores(self, texts):
+		"""Yield (row offset, score matrix) for `texts` in chunks of at most MAX_CELLS cells."""
+		rows = max(1, MAX_CELLS // max(len(self.names), 1))
+		for start in range(0, len(texts), rows):
+			yield start, process.cdist(
+				texts[start:start + rows], self.names, scorer=fuzz.ratio, dtype=np.float32, workers=-1
+			)
+
+	def fuzzy_match(self, texts, threshold=MATCH_THRESHOLD):
+		"""Best fuzz.ratio match per text: list of (name, canonical_id, score, tier)."""
+		if not self.names or not texts:
+			return [(None, None, 0.0, "unmatched")] * len(texts)
+		if self.ngrams is not None:
+			best = self.best_candidates(list(texts))
+		else:
+			best = []
+			for _, matrix in self.scores(list(texts)):
+				cols = matrix.argmax(axis=1)
+				best.extend(zip(cols.tolist(), matrix[np.arange(len(cols)), cols].tolist()))
+		results = []
+		for col, score in best:
+			if col is None:
+				results.append((None, None, 0.0, "unmatched"))
+			elif score > threshold:
+				results.append((self.names[col], self.ids[col], score, "fuzzy"))
+			else:
+				results.append((self.names[col], None, score, "unmatched"))
+		return results
+
+	def best_candidates(self, texts):
+		"""
+		(column, score) of the best name per text among its trigram-index top-N.
+
+		Candidate sets are gathered for a chunk of texts, and the chunk is scored
+		with one batched cdist against the union of their candidates; each row
+		then takes its argmax over its own candidate columns only.
+		"""
+		candidate_sets = [self.ngrams.candidates(text, self.top_n) for text in texts]
+		best = [(None, 0.0)] * len(texts)
+		start = 0
+		while start < len(texts):
+			# Grow the chunk while the score matrix stays within MAX_CELLS
+			union = np.empty(0, dtype=np.int32)
+			end = start
+			while end < len(texts):
+				grown = np.union1d(union, candidate_sets[end])
+				if end > start and (end + 1 - start) * len(grown) > MAX_CELLS:
+					break
+				union, end = grown, end + 1
+			if len(union):
+				matrix = process.cdist(
+					texts[start:end], [self.names[c] for c in union], scorer=fuzz.ratio, dtype=np.float32, workers=-1
+				)
+				for row, candidates in enumerate(candidate_sets[start:end]):
+					if len(candidates) == 0:
+						continue
+					cols = np.searchsorted(union, candidates)
+					k = int(matrix[row, cols].argmax())
+					best[start + row] = (int(candidates[k]), float(matrix[row, cols[k]]))
+			start = end
+		return best
+
+	def match(self, texts, threshold=MATCH_THRESHOLD):
+		"""
+		Best canonical match for every text: list of (name, canonical_id, score, tier).
+		Normalized exact and synonym hits score 100; the rest are fuzzy-matched
+		(against trigram-index candidates for large vocabularies, otherwise in
+		one batched cdist), and canonical_id is None when the best score does
+		not exceed `threshold`.
+		"""
+		results = [None] * len(texts)
+		misses = []
+		for i, text in enumerate(texts):
+			hit = self.exact(text)
+			if hit is not None:
+				name, canonical_id, tier = hit
+				results[i] = (name, canonical_id, 100.0, tier)
+			else:
+				misses.append(i)
+		for i, result in zip(misses, self.fuzzy_match([texts[i] for i in misses], threshold)):
+			results[i] = result
+		return results
+
+def build_indexes(mapping: dict, synonyms: dict = None) -> dict:
+	"""{type: {name: id}} (+ {type: {synonym: id}}) -> {type: ChoiceIndex}"""
+	synonyms = synonyms or {}
+	return {
+		typ: ChoiceIndex(names, synonyms.get(typ), strip_salts=typ in SALT_TYPES)
+		for typ, names in mapping.items()
+	}
@@ -0,0 +1,51 @@
+# Character n-gram inverted index for retrieving fuzzy-match candidates
+import numpy as np
+
+def ngrams(text: str, n: int = 3) -> set:
+	"""Case-folded character n-grams, padded so word edges form their own grams."""
+	padded = " " * (n - 1) + text.casefold() + " "
+	return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+class NgramIndex:
+	"""
+	Posting lists (CSR layout) from each n-gram to the names containing it.
+
+	`candidates(text, top_n)` ranks names by Dice overlap of n-gram sets,
+	2·|shared| / (|grams(text)| + |grams(name)|), and returns the ids of the
+	best `top_n` in ascending order, so only those need exact fuzz scoring.
+	"""
+
+	def __init__(self, names, n: int = 3):
+		self.n = n
+		self.gram_ids = {}
+		gram_rows, name_cols = [], []
+		self.sizes = np.empty(len(names), dtype=np.int32)
+		for i, name in enumerate(names):
+			grams = ngrams(name, n)
+			self.sizes[i] = len(grams)
+			for gram in grams:
+				gram_rows.append(self.gram_ids.setdefault(gram, len(self.gram_ids)))
+				name_cols.append(i)
+		gram_rows = np.asarray(gram_rows, dtype=np.int64)
+		order = np.argsort(gram_rows, kind="stable")
+		self.postings = np.asarray(name_cols, dtype=np.int32)[order]
+		self.offsets = np.zeros(len(self.gram_ids) + 1, dtype=np.int64)
+		np.cumsum(np.bincount(gram_rows, minlength=len(self.gram_ids)), out=self.offsets[1:])
+
+	def candidates(self, text: str, top_n: int) -> np.ndarray:
+		grams = ngrams(text, self.n)
+		known = [self.gram_ids[g] for g in grams if g in self.gram_ids]
+		if not known:
+			return np.empty(0, dtype=np.int32)
+		hits = np.concatenate([self.postings[self.offsets[g]:self.offsets[g + 1]] for g in known])
+		if len(hits) * 8 < len(self.sizes):
+			# Sparse hits: sorting them beats an O(vocabulary) dense count
+			ids, shared = np.unique(hits, return_counts=True)
+		else:
+			counts = np.bincount(hits, minlength=len(self.sizes))
+			ids = np.flatnonzero(counts)
+			shared = counts[ids]
+		if len(ids) > top_n:
+			dice = shared / (len(grams) + self.sizes[ids])
+			ids = np.sort(ids[np.argpartition(-dice, top_n - 1)[:top_n]])
+		return ids
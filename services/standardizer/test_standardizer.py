@@ -17,3 +17,91 @@ def test_standardize_entities():
     found_match = any(r['canonical_id'] and not r['manual_review_flag'] for r in data['results'])
     found_flag = any(r['manual_review_flag'] for r in data['results'])
     assert found_match or found_flag
+
+def test_choice_index_matches_extract_one():
+    from rapidfuzz import process, fuzz
+    from matcher import ChoiceIndex
+    mapping = {"Paracetamol": "D1", "Ibuprofen": "D2", "Warfarin": "D3", "Aspirin": "D4"}
+    index = ChoiceIndex(mapping)
+    texts = ["Paracetamo", "Ibuprofen 200", "Warfarine", "zzz"]
+    for text, (name, canonical_id, score, _) in zip(texts, index.match(texts)):
+        best, expected, _ = process.extractOne(text, list(mapping), scorer=fuzz.ratio)
+        assert name == best
+        assert abs(score - expected) < 1e-4
+        assert canonical_id == (mapping[best] if expected > 80 else None)
+
+
+def test_exact_and_synonym_tiers():
+    from matcher import ChoiceIndex
+    index = ChoiceIndex(
+        {"Metformin": "D1", "Acetaminophen": "D2"},
+        synonyms={"Paracetamol": "D2", "Tylenol": "D2"},
+        strip_salts=True,
+    )
+    results = index.match(["metformin hydrochloride", "Metformin HCl.", "PARACETAMOL", "tylenol", "Metforminn"])
+    assert [(r[1], r[3]) for r in results] == [
+        ("D1", "exact"), ("D1", "exact"), ("D2", "synonym"), ("D2", "synonym"), ("D1", "fuzzy"),
+    ]
+    assert results[2][0] == "Acetaminophen"
+
+def test_salt_variants_keep_their_own_ids():
+    from matcher import ChoiceIndex
+    index = ChoiceIndex(
+        {"Diclofenac potassium": "D1", "Diclofenac sodium": "D2", "Metformin": "D3", "Metoprolol tartrate": "D4", "Metoprolol succinate": "D5"},
+        strip_salts=True,
+    )
+    results = index.match(["Diclofenac sodium", "diclofenac POTASSIUM", "Metoprolol Succinate", "Metformin HCl"])
+    assert [(r[1], r[2], r[3]) for r in results] == [
+        ("D2", 100.0, "exact"), ("D1", 100.0, "exact"), ("D5", 100.0, "exact"), ("D3", 100.0, "exact"),
+    ]
+    # The bare name is ambiguous between salts, so it is not an exact hit
+    assert index.match(["Diclofenac"])[0][3] != "exact"
+
+def test_dictionary_snapshot_roundtrip(tmp_path):
+    from dictionaries import load_dictionaries
+    data_dir, snapshot_dir = tmp_path / "data", tmp_path / "snapshots"
+    data_dir.mkdir()
+    csv = data_dir / "nodes_drug.csv"
+    csv.write_text("id,name,synonyms\nD1,Acetaminophen,Paracetamol;Tylenol\nD2,Ibuprofen,\n")
+    canonical, synonyms, info = load_dictionaries(str(data_dir), str(snapshot_dir))
+    assert info["source"] == "csv"
+    assert canonical == {"DRUG": {"Acetaminophen": "D1", "Ibuprofen": "D2"}}
+    assert synonyms == {"DRUG": {"Paracetamol": "D1", "Tylenol": "D1"}}
+    assert load_dictionaries(str(data_dir), str(snapshot_dir)) == (canonical, synonyms, {**info, "source": "snapshot"})
+    # Editing a CSV changes the hash: parsed again, and the stale snapshot is dropped
+    csv.write_text("id,name\nD3,Warfarin\n")
+    canonical, _, fresh = load_dictionaries(str(data_dir), str(snapshot_dir))
+    assert fresh["source"] == "csv" and fresh["fingerprint"] != info["fingerprint"]
+    assert canonical == {"DRUG": {"Warfarin": "D3"}}
+    assert [p.name for p in snapshot_dir.iterdir()] == [fresh["fingerprint"]]
+
+def test_reload_swaps_dictionaries(tmp_path, monkeypatch):
+    from services.standardizer import main
+    (tmp_path / "nodes_drug.csv").write_text("id,name\nD1,Warfarin\n")
+    monkeypatch.setattr(main, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(main, "SNAPSHOT_DIR", str(tmp_path / "snapshots"))
+    monkeypatch.setattr(main, "_dictionaries", None)
+    client = TestClient(main.app)
+    response = client.post("/reload")
+    assert response.status_code == 200
+    assert response.json()["types"] == {"DRUG": 1}
+    result = client.post("/standardize", json={"entities": [{"text": "warfarin", "type": "DRUG"}]}).json()
+    assert result["results"][0]["canonical_id"] == "D1"
+
+def test_candidate_index_matches_brute_force(monkeypatch):
+    import matcher
+    from matcher import ChoiceIndex
+    mapping = {name: f"D{i}" for i, name in enumerate(
+        ["Warfarin", "Metformin", "Metoprolol", "Methotrexate", "Amoxicillin", "Ampicillin", "Atorvastatin", "Rosuvastatin"]
+    )}
+    brute = ChoiceIndex(mapping, top_n=0)
+    pruned = ChoiceIndex(mapping, top_n=3)
+    assert brute.ngrams is None and pruned.ngrams is not None
+    texts = ["Metoprolool", "amoxicilin", "Atorvastatine", "Warfrin", "qqqq"]
+    expected = brute.fuzzy_match(texts)
+    calls = []
+    cdist = matcher.process.cdist
+    monkeypatch.setattr(matcher.process, "cdist", lambda *a, **kw: calls.append(a) or cdist(*a, **kw))
+    assert [r[1] for r in pruned.fuzzy_match(texts)] == [r[1] for r in expected]
+    # All entities' candidate sets are scored in one batched cdist
+    assert len(calls) == 1 and len(calls[0][0]) == len(texts)